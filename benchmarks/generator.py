@@ -0,0 +1,114 @@
+"""
+Генератор синтетических операций для бенчмарков.
+
+Записи похожи на sources/operations.json: обе валюты, карты разных
+типов и счета, часть операций без поля "from", а также доля
+некорректных записей (отменённые, без обязательных полей, с пустыми
+значениями, с неверной датой, суммой или номером карты).
+
+Пример запуска из корневой папки проекта:
+    python benchmarks/generator.py operations_1M.json --count 1000000
+"""
+import argparse
+import json
+import random
+from typing import Iterator, Optional
+
+CARDS = ("Maestro", "MasterCard", "Visa Classic", "Visa Platinum", "Visa Gold", "МИР")
+DESCRIPTIONS = ("Перевод организации", "Перевод с карты на карту", "Перевод со счета на счет",
+                "Перевод с карты на счет", "Открытие вклада")
+CURRENCIES = ({"name": "руб.", "code": "RUB"}, {"name": "USD", "code": "USD"})
+RECORD_SIZE = 330  # примерный размер одной записи в байтах (для генерации по размеру файла)
+
+
+def generate_operations(count: int, seed: int = 0, invalid_share: float = 0.2) -> Iterator[dict]:
+    """
+    Генерирует count операций
+
+    :param count: количество операций
+    :param seed: начальное значение генератора случайных чисел
+    :param invalid_share: доля некорректных операций
+    """
+    rnd = random.Random(seed)
+    for number in range(count):
+        pay = _valid_operation(rnd, number)
+        if rnd.random() < invalid_share:
+            _spoil(rnd, pay)
+        yield pay
+
+
+def write_operations(path: str, count: Optional[int] = None, size: Optional[int] = None,
+                     seed: int = 0, invalid_share: float = 0.2) -> None:
+    """
+    Записывает JSON-массив операций: count штук или примерно size байт
+    """
+    if count is None:
+        count = max(size // RECORD_SIZE, 1)
+
+    with open(path, "wt", encoding="utf-8") as file:
+        file.write("[")
+        for number, pay in enumerate(generate_operations(count, seed, invalid_share)):
+            file.write(",\n" if number else "\n")
+            file.write(json.dumps(pay, ensure_ascii=False, indent=2))
+        file.write("\n]\n")
+
+
+def _valid_operation(rnd: random.Random, number: int) -> dict:
+    pay = {
+        "id": rnd.randrange(1, 10 ** 9),
+        "state": "EXECUTED",
+        "date": f"{rnd.randrange(2017, 2020)}-{rnd.randrange(1, 13):02}-{rnd.randrange(1, 29):02}T"
+                f"{rnd.randrange(24):02}:{rnd.randrange(60):02}:{rnd.randrange(60):02}."
+                f"{rnd.randrange(10 ** 6):06}",
+        "operationAmount": {
+            "amount": f"{rnd.randrange(100, 10 ** 7) / 100:.2f}",
+            "currency": dict(rnd.choice(CURRENCIES)),
+        },
+        "description": rnd.choice(DESCRIPTIONS),
+    }
+    if number % 10:
+        pay["from"] = _account(rnd)
+    pay["to"] = _account(rnd, card=rnd.random() < 0.3)
+    return pay
+
+
+def _account(rnd: random.Random, card: bool = True) -> str:
+    if card and rnd.random() < 0.7:
+        return f"{rnd.choice(CARDS)} {rnd.randrange(10 ** 15, 10 ** 16)}"
+    return f"Счет {rnd.randrange(10 ** 19, 10 ** 20)}"
+
+
+def _spoil(rnd: random.Random, pay: dict) -> None:
+    """Делает операцию некорректной одним из способов"""
+    kind = rnd.randrange(8)
+    if kind == 0:
+        pay["state"] = "CANCELED"
+    elif kind == 1:
+        del pay["state"]
+    elif kind == 2:
+        del pay[rnd.choice(("date", "operationAmount", "description", "to"))]
+    elif kind == 3:
+        pay["description"] = ""
+    elif kind == 4:
+        pay["date"] = pay["date"].replace("T", " ")
+    elif kind == 5:
+        pay["date"] = pay["date"][:8] + "32" + pay["date"][10:]
+    elif kind == 6:
+        pay["operationAmount"]["amount"] = "сто"
+    else:
+        pay["to"] = pay["to"][:-1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", help="куда записать файл")
+    parser.add_argument("--count", type=int, default=1000, help="количество операций")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--invalid-share", type=float, default=0.2, help="доля некорректных операций")
+    args = parser.parse_args()
+
+    write_operations(args.path, args.count, seed=args.seed, invalid_share=args.invalid_share)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Сравнение загрузчиков файла с операциями: json.load целиком
+и потоковый разбор scr.json_stream.iter_json_array.
+
+Каждый загрузчик запускается в отдельном процессе, чтобы пиковое
+потребление памяти (max RSS) не смешивалось между замерами.
+
+Пример запуска из корневой папки проекта:
+    python benchmarks/loader_bench.py --size 1G --size 10G
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from generator import write_operations
+
+PARAMETERS = {"id", "date", "state", "operationAmount", "description", "to"}
+LOADERS = ("json.load", "iter_json_array")
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(size: str) -> int:
+    """Переводит размер вида 512M / 1G в байты"""
+    unit = UNITS.get(size[-1].upper())
+    return int(size[:-1]) * unit if unit else int(size)
+
+
+def run_loader(loader: str, path: str) -> dict:
+    """Разбирает файл выбранным способом и считает подходящие платежи"""
+    from scr.json_stream import iter_json_array
+    from scr.utils import check_payment
+
+    start = time.perf_counter()
+    if loader == "json.load":
+        with open(path, "rt", encoding="utf-8") as json_file:
+            payments = json.load(json_file)
+    else:
+        payments = iter_json_array(path)
+    valid = sum(1 for pay in payments if check_payment(pay, PARAMETERS))
+
+    return {
+        "loader": loader,
+        "valid": valid,
+        "seconds": round(time.perf_counter() - start, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def measure(loader: str, path: str) -> dict:
+    """Запускает загрузчик в отдельном процессе"""
+    result = subprocess.run([sys.executable, __file__, "--run", loader, path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"loader": loader, "error": result.stderr.strip().splitlines()[-1:] or result.returncode}
+
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", action="append", default=[], help="размер файла, например 1G")
+    parser.add_argument("--file", action="append", default=[], help="готовый файл с операциями")
+    parser.add_argument("--run", nargs=2, metavar=("LOADER", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_loader(*args.run)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = list(args.file)
+        for size in args.size or ["64M"]:
+            path = os.path.join(tmp_dir, f"operations_{size}.json")
+            write_operations(path, size=parse_size(size))
+            files.append(path)
+
+        for path in files:
+            for loader in LOADERS:
+                result = measure(loader, path)
+                result["file_mb"] = round(os.path.getsize(path) / (1 << 20), 1)
+                print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Масштабирование параллельной загрузки scr.parallel.get_payments_parallel
+по количеству процессов (1, 2, 4, 8, 16) на синтетическом файле операций.
+
+Пример запуска из корневой папки проекта:
+    python benchmarks/parallel_bench.py --size 1G --workers 1 2 4 8 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from generator import write_operations
+from loader_bench import PARAMETERS, parse_size
+from scr.parallel import get_payments_parallel
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="256M", help="размер файла, например 1G")
+    parser.add_argument("--file", help="готовый файл с операциями")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--count", type=int, default=5, help="сколько последних платежей выбирать")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp_dir, "operations.json")
+            write_operations(path, size=parse_size(args.size))
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = list(get_payments_parallel(path, PARAMETERS, args.count, workers=workers))
+            seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            print(json.dumps({
+                "workers": workers,
+                "seconds": round(seconds, 3),
+                "speedup": round(baseline / seconds, 2),
+                "file_mb": round(os.path.getsize(path) / (1 << 20), 1),
+                "latest_ids": [checked.pay["id"] for checked in result],
+            }))
+
+
+if __name__ == "__main__":
+    main()
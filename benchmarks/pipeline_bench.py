@@ -0,0 +1,199 @@
+"""
+Бенчмарк этапов обработки операций:
+загрузка -> check_payment -> сортировка (reformat_date) -> create_payment
+-> show_payment -> hide, удаление повторов id (в памяти и с базой на диске),
+а также весь путь show-pays целиком.
+
+Для каждого размера генерируется файл операций (benchmarks/generator.py),
+каждый этап замеряется в отдельном процессе: время, скорость (записей
+в секунду), пиковое потребление памяти (max RSS) и его прирост за этап.
+Результаты сохраняются в JSON вместе с хешем коммита, чтобы сравнивать
+их между коммитами.
+
+Пример запуска из корневой папки проекта:
+    python benchmarks/pipeline_bench.py --count 1000 100000 1000000 --output bench.json
+    python benchmarks/pipeline_bench.py --count 100000 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from operator import itemgetter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from generator import write_operations
+from loader_bench import PARAMETERS
+STAGES = ("json_load", "load", "check_payment", "sort", "create_payment",
+          "show_payment", "show_payments", "hide", "latest", "dedup", "dedup_disk")
+
+
+def prepare(stage: str, path: str):
+    """
+    Готовит входные данные этапа (в замер не входит)
+    """
+    import scr.utils as utils
+    from scr.json_stream import iter_json_array
+
+    if stage in ("json_load", "load", "latest"):
+        return path
+
+    operations = list(iter_json_array(path))
+    if stage == "check_payment":
+        return operations
+
+    valid = [pay for pay in operations if utils.check_payment(pay, PARAMETERS)]
+    if stage in ("sort", "create_payment", "dedup", "dedup_disk"):
+        return valid
+
+    payments = [utils.create_payment(pay) for pay in valid]
+    payments = [pay for pay in payments if pay.operation_amount_pay and pay.to_pay]
+    if stage in ("show_payment", "show_payments"):
+        return payments
+
+    numbers = [pay.to_pay[1] for pay in payments]
+    numbers += [pay.from_pay[1] for pay in payments if pay.from_pay]
+    return numbers
+
+
+def run_stage(stage: str, data) -> int:
+    """
+    Выполняет этап и возвращает количество обработанных записей
+    """
+    import scr.utils as utils
+    from scr.json_stream import iter_json_array
+
+    if stage == "json_load":
+        with open(data, "rt", encoding="utf-8") as json_file:
+            return len(json.load(json_file))
+    if stage == "load":
+        return sum(1 for _ in iter_json_array(data))
+    if stage == "check_payment":
+        for pay in data:
+            utils.check_payment(pay, PARAMETERS)
+    elif stage == "sort":
+        sorted(data, key=utils.reformat_date, reverse=True)
+    elif stage == "create_payment":
+        for pay in data:
+            utils.create_payment(pay)
+    elif stage in ("show_payment", "show_payments"):
+        # stdout восстанавливается и при исключении внутри этапа
+        with open(os.devnull, "w", encoding="utf-8") as devnull, redirect_stdout(devnull):
+            if stage == "show_payment":
+                for pay in data:
+                    utils.show_payment(pay)
+            else:
+                utils.show_payments(data, colour=True)
+    elif stage == "hide":
+        for number in data:
+            utils.hide(number)
+    elif stage in ("dedup", "dedup_disk"):
+        from scr.dedup import unique
+        # dedup_disk: все id сразу в фильтре Блума и временной базе на диске
+        threshold = 0 if stage == "dedup_disk" else len(data)
+        for _ in unique(data, key=itemgetter("id"), threshold=threshold):
+            pass
+    elif stage == "latest":
+        list(utils.get_latest_checked_payments(data, PARAMETERS, 5))
+        return sum(1 for _ in iter_json_array(data))
+
+    return len(data)
+
+
+def measure_stage(stage: str, path: str) -> dict:
+    """Замер этапа внутри процесса-исполнителя"""
+    data = prepare(stage, path)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    records = run_stage(stage, data)
+    seconds = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "stage": stage,
+        "records": records,
+        "seconds": round(seconds, 4),
+        "records_per_second": round(records / seconds) if seconds else None,
+        "peak_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+    }
+
+
+def measure(stage: str, path: str) -> dict:
+    """Запускает замер этапа в отдельном процессе"""
+    result = subprocess.run([sys.executable, __file__, "--run", stage, path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"stage": stage, "error": (result.stderr.strip().splitlines() or ["killed"])[-1]}
+
+    return json.loads(result.stdout)
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """Выводит отношение времени к результатам из сохранённого файла"""
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+
+    previous = {(item["stage"], item["operations"]): item for item in baseline["results"]}
+    for item in results:
+        old = previous.get((item["stage"], item["operations"]))
+        if old and old.get("seconds") and item.get("seconds"):
+            print(f"{item['stage']:>15} {item['operations']:>10}: "
+                  f"{old['seconds']:.4f}s -> {item['seconds']:.4f}s "
+                  f"(x{old['seconds'] / item['seconds']:.2f})")
+
+
+def git_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                            capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, nargs="+", default=[1000, 100000],
+                        help="количество операций в файле (1000 ... 50000000)")
+    parser.add_argument("--stage", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--invalid-share", type=float, default=0.2)
+    parser.add_argument("--output", help="куда сохранить результаты в JSON")
+    parser.add_argument("--compare", help="файл с результатами для сравнения")
+    parser.add_argument("--run", nargs=2, metavar=("STAGE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(measure_stage(*args.run)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in args.count:
+            path = os.path.join(tmp_dir, f"operations_{count}.json")
+            write_operations(path, count, invalid_share=args.invalid_share)
+            for stage in args.stage:
+                result = dict(measure(stage, path), operations=count)
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import re
+from decimal import ROUND_HALF_EVEN, Decimal, InvalidOperation, localcontext
+from typing import Optional
+
+MINOR_DIGITS = 2            # знаков после точки: копейки/центы
+MINOR_UNITS = 10 ** MINOR_DIGITS
+MAX_EXPONENT = 308          # порядок самой большой суммы: как у float, большие суммы отклоняются
+
+# Сумма вида "41096.24", "-5", "100.5", ".5" (с пробелами по краям, как у float)
+AMOUNT = re.compile(r"\s*([+-]?)(\d*)(?:\.(\d*))?\s*")
+
+
+def to_minor(amount) -> Optional[int]:
+    """
+    Проверяет сумму платежа и за один проход переводит её в целое
+    число копеек/центов, без промежуточного float. Возвращает None,
+    если сумма некорректна.
+
+    Принимает строки (как float: "41096.24", "100", " -5.5", "1e3")
+    и числа (int, float; bool — нет). Если знаков после точки больше
+    двух или сумма записана с экспонентой, она точно (по десятичной
+    записи, а не по двоичному значению float) округляется к ближайшему
+    чётному: "0.165" -> 0.16, "2.675" -> 2.68. Знак у нулевой суммы
+    не сохраняется: "-0.001" -> 0 (выводится как 0.00). Бесконечность,
+    NaN и суммы от 1e309 некорректны
+
+    :param amount: сумма платежа
+    """
+    kind = type(amount)
+    if kind is str:
+        match = AMOUNT.fullmatch(amount)
+        if match is not None:
+            sign, whole, fraction = match.groups()
+            fraction = fraction or ""
+            if (whole or fraction) and len(fraction) <= MINOR_DIGITS:
+                minor = int(whole or "0") * MINOR_UNITS + int(fraction.ljust(MINOR_DIGITS, "0"))
+                return -minor if sign == "-" else minor
+    elif kind is int:
+        return amount * MINOR_UNITS
+    elif kind is float:
+        amount = repr(amount)
+    else:
+        return None
+
+    # Редкие формы записи: экспонента, разделители разрядов, больше двух
+    # знаков. Decimal разбирает строку точно, без промежуточного float
+    try:
+        value = Decimal(amount)
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or value.adjusted() > MAX_EXPONENT:
+        return None
+
+    # Точности контекста должно хватить на все цифры суммы в копейках
+    with localcontext() as context:
+        context.prec = max(context.prec, value.adjusted() + MINOR_DIGITS + 2)
+        return int(value.scaleb(MINOR_DIGITS).quantize(Decimal(1), rounding=ROUND_HALF_EVEN))
+
+
+def parse_minor(amount: str) -> Optional[int]:
+    """
+    Переводит сумму с двумя знаками после точки ("41096.24")
+    в целое число копеек/центов
+    """
+    whole, _, fraction = amount.partition(".")
+    if len(fraction) != 2 or not fraction.isdigit() or not whole.lstrip("-").isdigit():
+        return None
+
+    return int(whole + fraction)
+
+
+def format_minor(minor: int) -> str:
+    """
+    Обратное преобразование для parse_minor
+    """
+    sign = "-" if minor < 0 else ""
+    whole, fraction = divmod(abs(minor), MINOR_UNITS)
+    return f"{sign}{whole}.{fraction:02}"
@@ -0,0 +1,274 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from class_payment.payment import Payment
+
+EPOCH = datetime(1970, 1, 1)            # начало отсчёта для дат в микросекундах
+ONE_MICROSECOND = timedelta(microseconds=1)
+NAIVE = -1 << 31                        # смещение часового пояса у даты без пояса
+NUMBER_BYTES = 10                       # номер до 20 цифр, упакованный по две цифры в байт
+NO_CODE = -1                            # код отсутствующего значения (нет поля отправителя)
+INT64_MIN, INT64_MAX = -1 << 63, (1 << 63) - 1
+
+# Колонки PaymentBatch и типы их элементов (коды array; номера хранятся в bytearray)
+COLUMNS = {"ids": "q", "dates": "q", "offsets": "i", "amounts": "q", "states": "b", "currencies": "i",
+           "descriptions": "i", "from_types": "i", "from_numbers": "B", "to_types": "i",
+           "to_numbers": "B"}
+
+
+def to_microseconds(date: datetime) -> int:
+    """
+    Дата в микросекундах от EPOCH. Дата с часовым поясом переводится
+    в UTC, поэтому такие числа упорядочены так же, как сами даты
+    """
+    offset = date.utcoffset()
+    if offset is not None:
+        date = date.replace(tzinfo=None) - offset
+    return (date - EPOCH) // ONE_MICROSECOND
+
+
+def pack_date(date: datetime) -> tuple:
+    """
+    Дата в виде двух чисел: местное время в микросекундах от EPOCH
+    и смещение часового пояса в секундах (NAIVE, если пояса нет)
+    """
+    offset = date.utcoffset()
+    if offset is None:
+        return (date - EPOCH) // ONE_MICROSECOND, NAIVE
+    return (date.replace(tzinfo=None) - EPOCH) // ONE_MICROSECOND, offset // timedelta(seconds=1)
+
+
+def unpack_date(microseconds: int, offset: int) -> datetime:
+    """
+    Обратное преобразование для pack_date
+    """
+    date = EPOCH + microseconds * ONE_MICROSECOND
+    if offset != NAIVE:
+        date = date.replace(tzinfo=timezone(timedelta(seconds=offset)))
+    return date
+
+
+class PaymentBatch:
+    """
+    Колоночное хранилище платежей.
+
+    Каждая характеристика платежа хранится в отдельном компактном
+    массиве: id, дата (местное время в микросекундах от EPOCH) и сумма
+    (в копейках/центах) как int64, смещение часового пояса даты, состояние, валюта, описание и тип карты/счёта как коды
+    в таблицах уникальных значений, номера карт и счетов упакованными
+    по две цифры в байт. Один платёж занимает несколько десятков байт
+    вместо нескольких сотен у отдельного объекта Payment.
+
+    Доступ к отдельному платежу (batch[i]) возвращает обычный объект
+    Payment с тем же набором свойств.
+    """
+
+    def __init__(self) -> None:
+        self.__ids = array("q")
+        self.__dates = array("q")
+        self.__offsets = array("i")
+        self.__amounts = array("q")
+        self.__states = array("b")
+        self.__currencies = array("i")
+        self.__descriptions = array("i")
+        self.__from_types = array("i")
+        self.__from_numbers = bytearray()
+        self.__to_types = array("i")
+        self.__to_numbers = bytearray()
+
+        # Таблицы уникальных значений: код -> строка и строка -> код
+        self.__values = {"state": [], "currency": [], "description": [], "card": []}
+        self.__codes = {name: {} for name in self.__values}
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    def __iter__(self) -> Iterator[Payment]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> Payment:
+        """
+        Собирает объект Payment из значений колонок
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("PaymentBatch index out of range")
+
+        return Payment.from_values(
+            self.__ids[index],
+            self.__values["state"][self.__states[index]],
+            unpack_date(self.__dates[index], self.__offsets[index]),
+            self.__amounts[index],
+            self.__values["currency"][self.__currencies[index]],
+            self.__values["description"][self.__descriptions[index]],
+            self.__account(self.__from_types, self.__from_numbers, index),
+            self.__account(self.__to_types, self.__to_numbers, index))
+
+    def __repr__(self) -> str:
+        return f"PaymentBatch(len={len(self)}, nbytes={self.nbytes})"
+
+    @classmethod
+    def from_payments(cls, payments: Iterable[Payment]) -> "PaymentBatch":
+        batch = cls()
+        batch.extend(payments)
+        return batch
+
+    @classmethod
+    def from_columns(cls, columns: dict, tables: dict) -> "PaymentBatch":
+        """
+        Создаёт набор из готовых колонок (см. columns и tables).
+        Колонками могут быть и memoryview, например, над mmap файла —
+        тогда данные не копируются, но добавлять платежи нельзя
+
+        :param columns: название колонки (COLUMNS) -> массив значений
+        :param tables: таблицы уникальных значений (состояния, валюты, описания, типы карт)
+        """
+        batch = cls()
+        batch.__ids = columns["ids"]
+        batch.__dates = columns["dates"]
+        batch.__offsets = columns["offsets"]
+        batch.__amounts = columns["amounts"]
+        batch.__states = columns["states"]
+        batch.__currencies = columns["currencies"]
+        batch.__descriptions = columns["descriptions"]
+        batch.__from_types = columns["from_types"]
+        batch.__from_numbers = columns["from_numbers"]
+        batch.__to_types = columns["to_types"]
+        batch.__to_numbers = columns["to_numbers"]
+
+        batch.__values = {name: list(values) for name, values in tables.items()}
+        batch.__codes = {name: {value: code for code, value in enumerate(values)}
+                         for name, values in batch.__values.items()}
+        return batch
+
+    @property
+    def columns(self) -> dict:
+        """
+        Колонки набора: название (COLUMNS) -> массив значений
+        """
+        return {"ids": self.__ids, "dates": self.__dates, "offsets": self.__offsets,
+                "amounts": self.__amounts,
+                "states": self.__states, "currencies": self.__currencies,
+                "descriptions": self.__descriptions, "from_types": self.__from_types,
+                "from_numbers": self.__from_numbers, "to_types": self.__to_types,
+                "to_numbers": self.__to_numbers}
+
+    @property
+    def tables(self) -> dict:
+        """
+        Таблицы уникальных значений: название -> список строк (код — индекс строки)
+        """
+        return {name: list(values) for name, values in self.__values.items()}
+
+    def take(self, indexes: Iterable[int]) -> "PaymentBatch":
+        """
+        Возвращает новый набор из платежей с номерами indexes
+        (в том же порядке), например, для сортировки набора
+        """
+        indexes = list(indexes)
+        columns = {}
+        for name, column in self.columns.items():
+            if name.endswith("_numbers"):
+                columns[name] = bytearray().join(
+                    column[index * NUMBER_BYTES:(index + 1) * NUMBER_BYTES] for index in indexes)
+            else:
+                columns[name] = array(COLUMNS[name], map(column.__getitem__, indexes))
+
+        return self.from_columns(columns, self.__values)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Размер данных колонок в байтах (без таблиц уникальных значений)
+        """
+        columns = (self.__ids, self.__dates, self.__offsets, self.__amounts, self.__states,
+                   self.__currencies, self.__descriptions, self.__from_types, self.__to_types)
+        return sum(column.itemsize * len(column) for column in columns) \
+            + len(self.__from_numbers) + len(self.__to_numbers)
+
+    def extend(self, payments: Iterable[Payment]) -> None:
+        for payment in payments:
+            self.append(payment)
+
+    def append(self, payment: Payment) -> None:
+        """
+        Добавляет платёж в конец колонок.
+
+        Платёж должен содержать все обязательные характеристики
+        (поле отправителя может отсутствовать)
+
+        :raises ValueError: если у платежа нет обязательной характеристики
+        или номер карты/счёта не из цифр 0-9
+        :raises OverflowError: если id или сумма не помещаются в int64
+        (колонки при этом не меняются)
+        """
+        if not all((payment.id_pay,
+                    payment.state_pay,
+                    payment.date_pay,
+                    payment.amount_pay is not None,
+                    payment.description_pay,
+                    payment.to_pay)):
+            raise ValueError(f"Payment {payment.id_pay} is incomplete")
+        if not (INT64_MIN <= payment.id_pay <= INT64_MAX and INT64_MIN <= payment.amount_pay <= INT64_MAX):
+            raise OverflowError(f"Payment {payment.id_pay} does not fit into int64 columns")
+
+        pay_from = payment.from_pay
+        # Значения, которые могут не преобразоваться, готовятся до изменения
+        # колонок, чтобы колонки всегда оставались одной длины
+        date, offset = pack_date(payment.date_pay)
+        from_number = pack_number(pay_from[1] if pay_from else "")
+        to_number = pack_number(payment.to_pay[1])
+
+        self.__ids.append(payment.id_pay)
+        self.__dates.append(date)
+        self.__offsets.append(offset)
+        self.__amounts.append(payment.amount_pay)
+        self.__states.append(self.__code("state", payment.state_pay))
+        self.__currencies.append(self.__code("currency", payment.currency_pay))
+        self.__descriptions.append(self.__code("description", payment.description_pay))
+        self.__from_types.append(self.__code("card", pay_from[0]) if pay_from else NO_CODE)
+        self.__from_numbers += from_number
+        self.__to_types.append(self.__code("card", payment.to_pay[0]))
+        self.__to_numbers += to_number
+
+    def __code(self, name: str, value: str) -> int:
+        """
+        Возвращает код строки в таблице уникальных значений,
+        добавляя строку в таблицу при первой встрече
+        """
+        codes = self.__codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.__values[name])
+            self.__values[name].append(value)
+        return code
+
+    def __account(self, types: array, numbers: bytearray, index: int) -> Optional[tuple]:
+        """
+        Восстанавливает тип карты/счёта и номер: ("Visa Gold", "5999414228426353")
+        """
+        code = types[index]
+        if code == NO_CODE:
+            return None
+
+        start = index * NUMBER_BYTES
+        number = unpack_number(numbers[start:start + NUMBER_BYTES])
+        return self.__values["card"][code], number
+
+
+def pack_number(number: str) -> bytes:
+    """
+    Упаковывает номер карты/счёта (до 20 цифр) по две цифры в байт.
+    Недостающие слева разряды заполняются полубайтом 0xF
+    """
+    return bytes.fromhex(number.rjust(NUMBER_BYTES * 2, "f"))
+
+
+def unpack_number(data: bytes) -> str:
+    """
+    Обратное преобразование для pack_number
+    """
+    return data.hex().lstrip("f")
@@ -0,0 +1,94 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from class_payment.payment import Payment
+
+
+class LazyPayment(Payment):
+    """
+    Платёж, который хранит исходный словарь платежа (или его байты
+    из файла операций) и разбирает каждую характеристику только
+    при первом обращении к ней, запоминая результат.
+
+    Характеристики проверяются теми же сеттерами Payment, что и
+    в utils.create_payment, поэтому значения совпадают; но если нужны
+    только id и дата (подсчёт, список), остальные поля не разбираются
+    """
+
+    __slots__ = ("__pay", "__date", "__loaded")
+
+    def __init__(self, pay: dict | bytes, date: Optional[datetime] = None) -> None:
+        """
+        :param pay: словарь платежа или его JSON в байтах (например, запись
+        из файла операций по смещению из индекса)
+        :param date: уже разобранная дата платежа; если не передана,
+        дата берётся из словаря
+        """
+        super().__init__()
+        self.__pay = pay
+        self.__date = date
+        self.__loaded = 0
+
+    def __str__(self) -> str:
+        return f"Payment {self.id_pay}, more detailed information is closed."
+
+    def __repr__(self) -> str:
+        return super(LazyPayment, self.load()).__repr__()
+
+    def load(self) -> "LazyPayment":
+        """
+        Разбирает все ещё не разобранные характеристики
+        """
+        for name in ("id_pay", "state_pay", "date_pay", "operation_amount_pay",
+                     "description_pay", "from_pay", "to_pay"):
+            getattr(self, name)
+        return self
+
+    def __value(self, key: str):
+        if type(self.__pay) is not dict:
+            self.__pay = json.loads(bytes(self.__pay))
+        if key == "date" and self.__date is not None:
+            return self.__date
+        return self.__pay.get(key)
+
+    def __field(name: str, key: str, bit: int) -> property:
+        """
+        Свойство Payment, которое при первом чтении устанавливается
+        сеттером Payment из значения key исходного словаря
+        """
+        parent = getattr(Payment, name)
+
+        def get(self):
+            if not self.__loaded & bit:
+                self.__loaded |= bit
+                parent.fset(self, self.__value(key))
+            return parent.fget(self)
+
+        def set(self, value) -> None:
+            # Некорректное значение сеттер не устанавливает — остаётся значение из словаря
+            get(self)
+            parent.fset(self, value)
+
+        return property(get, set, doc=parent.__doc__)
+
+    id_pay = __field("id_pay", "id", 1)
+    state_pay = __field("state_pay", "state", 2)
+    date_pay = __field("date_pay", "date", 4)
+    operation_amount_pay = __field("operation_amount_pay", "operationAmount", 8)
+    description_pay = __field("description_pay", "description", 16)
+    from_pay = __field("from_pay", "from", 32)
+    to_pay = __field("to_pay", "to", 64)
+
+    @property
+    def amount_pay(self) -> int:
+        """Сумма платежа в копейках/центах"""
+        self.operation_amount_pay
+        return super().amount_pay
+
+    @property
+    def currency_pay(self) -> str:
+        self.operation_amount_pay
+        return super().currency_pay
+
+    del __field
@@ -1,3 +1,4 @@
+from class_payment.amount import format_minor, to_minor
 from datetime import datetime
 
 
@@ -6,15 +7,40 @@ class Payment:
 
     AMOUNT_DIGITS = [16, 20]    # корректное количество цифр в номере банковской карты и счёта
 
+    # Атрибуты хранятся в слотах, а не в __dict__ экземпляра:
+    # объект платежа занимает в памяти в несколько раз меньше места
+    __slots__ = ("__id_pay", "__state_pay", "__date_pay", "__amount_pay", "__currency_pay",
+                 "__description_pay", "__from_pay", "__to_pay")
+
     def __init__(self) -> None:
         self.__id_pay = None
         self.__state_pay = None
         self.__date_pay = None
-        self.__operation_amount_pay = None
+        self.__amount_pay = None
+        self.__currency_pay = None
         self.__description_pay = None
         self.__from_pay = None
         self.__to_pay = None
 
+    @classmethod
+    def from_values(cls, id_pay: int, state_pay: str, date_pay: datetime, amount_pay: int,
+                    currency_pay: str, description_pay: str, from_pay: tuple | None,
+                    to_pay: tuple) -> "Payment":
+        """
+        Создаёт платёж из уже проверенных и приведённых к нужному виду значений
+        (см. scr.validation), не повторяя проверки сеттеров
+        """
+        payment = cls.__new__(cls)
+        payment.__id_pay = id_pay
+        payment.__state_pay = state_pay
+        payment.__date_pay = date_pay
+        payment.__amount_pay = amount_pay
+        payment.__currency_pay = currency_pay
+        payment.__description_pay = description_pay
+        payment.__from_pay = from_pay
+        payment.__to_pay = to_pay
+        return payment
+
     def __str__(self) -> str:
         return f"Payment {self.__id_pay}, more detailed information is closed."
 
@@ -23,7 +49,7 @@ class Payment:
             f"id_pay={self.__id_pay}," \
             f"state_pay=\"{self.__state_pay}\"," \
             f"date_pay=\"{self.__date_pay}\"," \
-            f"operation_amount_pay={self.__operation_amount_pay}," \
+            f"operation_amount_pay={self.operation_amount_pay}," \
             f"description_pay=\"{self.__description_pay}\"," \
             f"from_pay=\"{self.__from_pay}\"," \
             f"to_pay=\"{self.__to_pay}\")"
@@ -63,13 +89,16 @@ class Payment:
         return self.__date_pay
 
     @date_pay.setter
-    def date_pay(self, date: str) -> None:
+    def date_pay(self, date: str | datetime) -> None:
         """
         Устанавливает дату платежа в формате datatime.
+        Уже разобранная дата (datetime) устанавливается без повторного разбора.
 
         Проверка: является ли дата корректной
         """
-        if type(date) is str:
+        if type(date) is datetime:
+            self.__date_pay = date
+        elif type(date) is str:
             for_date = " ".join(date.split("T"))
 
             try:
@@ -79,42 +108,54 @@ class Payment:
 
     @property
     def operation_amount_pay(self) -> tuple:
-        return self.__operation_amount_pay
+        """
+        Сумма (строкой с двумя знаками после точки) и валюта платежа;
+        сумма форматируется только при обращении
+        """
+        if self.__amount_pay is None:
+            return None
+        return format_minor(self.__amount_pay), self.__currency_pay
 
     @operation_amount_pay.setter
     def operation_amount_pay(self, operation_amount: dict) -> None:
         """
-        Устанавливает сумму и валюту платежа в формате кортежа.
+        Устанавливает сумму (целым числом копеек/центов) и валюту платежа.
 
         Проверки:
         существуют ли значения суммы и валюты платежа;
         является ли формат валюты платежа строкой;
         корректна ли сумма платежа
         """
-        if type(operation_amount) is dict:
-            amount = operation_amount.get('amount')
-            currency = operation_amount.get('currency')
-            currency_name = currency.get('name') if currency else None
+        amount = self.parse_amount(operation_amount)
+        if amount is not None:
+            self.__amount_pay, self.__currency_pay = amount
+
+    @property
+    def amount_pay(self) -> int:
+        """Сумма платежа в копейках/центах"""
+        return self.__amount_pay
 
-            if amount and currency_name:
-                if self.__check_amount(amount) and type(currency_name) is str:
-                    amount_format_float = f"{float(amount):.2f}"
-                    self.__operation_amount_pay = (amount_format_float, currency_name)
+    @property
+    def currency_pay(self) -> str:
+        return self.__currency_pay
 
     @staticmethod
-    def __check_amount(amount: str) -> bool:
+    def parse_amount(operation_amount: dict) -> tuple | None:
         """
-        Проверяет корректность суммы платежа через попытку
-        приведения формата к типу float
+        Возвращает сумму платежа в копейках/центах и валюту
+        в формате кортежа или None, если они некорректны
         """
-        if type(amount) is bool:
-            return False
-        try:
-            float(amount)
-        except ValueError:
-            return False
+        if type(operation_amount) is dict:
+            amount = operation_amount.get('amount')
+            currency = operation_amount.get('currency')
+            currency_name = currency.get('name') if currency else None
 
-        return True
+            if amount and currency_name and type(currency_name) is str:
+                minor = to_minor(amount)
+                if minor is not None:
+                    return minor, currency_name
+
+        return None
 
     @property
     def description_pay(self) -> str:
@@ -145,23 +186,36 @@ class Payment:
         является ли эта информация строкой;
         корректен ли номер карты/счёта
         """
-        if type(from_pay) is str:
-            card_sep = from_pay.rsplit(" ", 1)
+        account = self.parse_account(from_pay)
+        if account is not None:
+            self.__from_pay = account
+
+    @classmethod
+    def parse_account(cls, account: str) -> tuple | None:
+        """
+        Возвращает тип банковской карты (или счёт) и номер в формате
+        кортежа или None, если номер некорректен
+        """
+        if type(account) is str:
+            card_sep = account.rsplit(" ", 1)
             if len(card_sep) == 2:
                 card, number = card_sep
-                if self.__check_card(card, number):
-                    self.__from_pay = (card, number)
+                if cls.__check_card(card, number):
+                    return card, number
 
-    def __check_card(self, card: str, number: str) -> bool:
+        return None
+
+    @classmethod
+    def __check_card(cls, card: str, number: str) -> bool:
         """
         Проверяет, состоит ли номер карты/счёта только из цифр и
         соответствует ли количество цифр в номере обязательному для карты/счёта
         """
         if not number.isdigit():
             return False
-        elif len(number) not in self.AMOUNT_DIGITS:
+        elif len(number) not in cls.AMOUNT_DIGITS:
             return False
-        elif card.lower() == "счет" and len(number) != self.AMOUNT_DIGITS[-1]:
+        elif card.lower() == "счет" and len(number) != cls.AMOUNT_DIGITS[-1]:
             return False
 
         return True
@@ -181,9 +235,6 @@ class Payment:
         является ли эта информация строкой;
         корректен ли номер карты/счёта
         """
-        if type(to_pay) is str:
-            card_sep = to_pay.rsplit(" ", 1)
-            if len(card_sep) == 2:
-                card, number = card_sep
-                if self.__check_card(card, number):
-                    self.__to_pay = (card, number)
\ No newline at end of file
+        account = self.parse_account(to_pay)
+        if account is not None:
+            self.__to_pay = account
\ No newline at end of file
@@ -1,41 +1,425 @@
+import argparse
 import os
 import sys
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Модули обработки (scr.*), typing и datetime импортируются в функциях команд,
+# которым они нужны: команду запускают из скриптов тысячи раз в день, и --help
+# или пустой файл операций не должны тратить время на импорт asyncio, http.server и т. п.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from datetime import datetime
+    from class_payment.payment import Payment
+    from scr.query import Query
+    from scr.utils import CheckedPayment
 
-import scr.utils as utils
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 PATH = "sources/operations.json"  # путь к файлу с операциями от корневой папки проекта
 COUNT_TRANSFERS = 5
+EMPTY_SOURCE_SIZE = 64  # файл не больше этого размера проверяется на пустой массив без разбора
 OBLIGATION_PARAMETERS_PAY = {"id", "date", "state", "operationAmount", "description", "to"}
 
+# Значения ключей командной строки (те же, что scr.profiling.PROFILE_ENV и PROFILE_FORMATS,
+# scr.aggregate.GROUPS, scr.accounts.ROLES, scr.dedup.POLICIES, scr.decoder.DECODER_ENV
+# и BACKENDS, — совпадение проверяется в тестах), чтобы разбор аргументов
+# не импортировал модули обработки
+PROFILE_ENV = "SHOW_PAYS_PROFILE"
+PROFILE_FORMATS = ("json", "prometheus")
+GROUPS = ("currency", "description", "month", "card", "to_card")
+ROLES = ("from", "to")
+DEDUP_POLICIES = ("first", "latest")
+DECODER_ENV = "SHOW_PAYS_DECODER"
+DECODERS = ("orjson", "msgspec", "json")
+
+
+def main(argv: list | None = None) -> None:
+    """
+    Выводит на экран COUNT_TRANSFERS последних выполненных переводов,
+    а с командой aggregate — итоги по группам платежей (суммы, количество,
+    минимум, максимум и перцентили по валюте, описанию, месяцу, типу карты),
+    с командой account — платежи по номеру карты/счёта, а с командой serve
+    работает как служба, отвечающая на запросы последних платежей по HTTP.
+
+    С ключом --decoder (или переменной окружения SHOW_PAYS_DECODER=orjson|msgspec|json)
+    последние переводы выбираются полным разбором файла этой библиотекой, без индекса.
+
+    С ключом --profile (или переменной окружения SHOW_PAYS_PROFILE=json|prometheus)
+    после вывода печатает в stderr (или в файл --profile-output) отчёт
+    о времени и памяти каждого этапа и количестве обработанных записей
+
+    :param argv: аргументы командной строки (без имени программы)
+    """
+    args = parse_arguments(argv or [])
+    output_format = args.profile or os.environ.get(PROFILE_ENV)
+    if not output_format:
+        run_command(args)
+        return
+
+    import scr.utils as utils
+    from scr.profiling import Profiler
+
+    profiler = Profiler()
+    previous = utils.set_profiler(profiler)
+    try:
+        run_command(args)
+    finally:
+        utils.set_profiler(previous)
+
+    report = profiler.dump(output_format if output_format in PROFILE_FORMATS else "json")
+    if args.profile_output:
+        with open(args.profile_output, "w", encoding="utf-8") as output:
+            output.write(report)
+    else:
+        sys.stderr.write(report)
+
+
+def cli() -> None:
+    """
+    Точка входа команды show-pays
+    """
+    main(sys.argv[1:])
+
+
+def parse_arguments(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="show-pays", description="Последние выполненные переводы")
+    parser.add_argument("--profile", nargs="?", const="json", choices=PROFILE_FORMATS,
+                        help="вывести отчёт о времени и памяти этапов (json или prometheus)")
+    parser.add_argument("--profile-output", help="файл для отчёта, по умолчанию stderr")
+    parser.add_argument("--dedup", choices=DEDUP_POLICIES,
+                        help="из платежей с одинаковым id показать первый в файле или самый поздний")
+    parser.add_argument("--decoder", choices=DECODERS,
+                        help="разобрать файл операций целиком этой библиотекой вместо индекса "
+                             f"(по умолчанию — переменная окружения {DECODER_ENV})")
+    parser.add_argument("--no-colour", dest="colour", action="store_false",
+                        help="выводить платежи без цветового выделения (ANSI)")
+    parser.add_argument("--source", action="append",
+                        help="файл, папка или шаблон файлов с операциями вместо PATH "
+                             "(можно указать несколько раз, файлы читаются одновременно)")
+
+    filters = parser.add_argument_group("условия отбора платежей")
+    filters.add_argument("--date-from", type=parse_date, help="не раньше даты, например 2019-03-01")
+    filters.add_argument("--date-to", type=parse_date, help="раньше даты, например 2019-04-01")
+    filters.add_argument("--currency", help="код или название валюты, например USD")
+    filters.add_argument("--description", help="описание платежа, например \"Перевод организации\"")
+    filters.add_argument("--from-account", help="номер карты/счёта отправителя")
+    filters.add_argument("--to-account", help="номер карты/счёта получателя")
+    filters.add_argument("--amount-min", type=parse_amount, help="сумма не меньше, например 100.50")
+    filters.add_argument("--amount-max", type=parse_amount, help="сумма не больше")
+
+    commands = parser.add_subparsers(dest="command")
+    aggregation = commands.add_parser("aggregate", help="итоги по группам платежей")
+    aggregation.add_argument("--by", nargs="+", choices=GROUPS, default=["currency"],
+                             help="признаки группировки")
+    aggregation.add_argument("--percentile", nargs="*", type=parse_percentile, default=[50, 90, 99],
+                             help="какие перцентили сумм считать")
+    aggregation.add_argument("--approximate", action="store_true",
+                             help="приблизительные перцентили по выборке (память на группу ограничена)")
+    aggregation.add_argument("--sample-size", type=int, help="размер выборки для --approximate")
+    aggregation.add_argument("--format", choices=("table", "json"), default="table")
+    aggregation.add_argument("--path", help="файл с операциями, по умолчанию PATH")
+
+    account = commands.add_parser("account", help="платежи по номеру карты или счёта")
+    account.add_argument("number", help="номер карты/счёта или его начало (с --prefix)")
+    account.add_argument("--prefix", action="store_true", help="искать по началу номера (BIN)")
+    account.add_argument("--role", choices=ROLES, help="только отправитель или получатель")
+    account.add_argument("--path", help="файл с операциями, по умолчанию PATH")
+
+    service = commands.add_parser("serve", help="служба: платежи в памяти, ответы по HTTP в JSON")
+    service.add_argument("--host", help="адрес, по умолчанию 127.0.0.1")
+    service.add_argument("--port", type=int, help="порт, по умолчанию 8765")
+    service.add_argument("--interval", type=float,
+                         help="как часто проверять изменения файла (секунды)")
+    service.add_argument("--path", help="файл с операциями, по умолчанию PATH")
+    args = parser.parse_args(argv)
+    if args.dedup == "first" and args.source:
+        # Файлы --source сливаются по дате, порядок внутри файлов не сохраняется
+        parser.error("--dedup first нельзя использовать вместе с --source")
+    if args.decoder and args.source:
+        parser.error("--decoder нельзя использовать вместе с --source")
+    if args.decoder is None and not args.source:
+        args.decoder = os.environ.get(DECODER_ENV) or None
+        if args.decoder is not None and args.decoder not in DECODERS:
+            parser.error(f"{DECODER_ENV}: неизвестная библиотека разбора JSON {args.decoder} "
+                         f"(ожидается одна из: {', '.join(DECODERS)})")
+    return args
+
+
+def parse_date(date: str) -> "datetime":
+    from datetime import datetime
+
+    try:
+        value = datetime.fromisoformat(date)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"некорректная дата: {date}") from None
+    # Даты платежей в файле операций без часового пояса и с датой с поясом не сравниваются
+    if value.tzinfo is not None:
+        raise argparse.ArgumentTypeError(f"дата должна быть без часового пояса: {date}")
+    return value
+
+
+def parse_amount(amount: str) -> int:
+    from class_payment.amount import to_minor
+
+    minor = to_minor(amount)
+    if minor is None:
+        raise argparse.ArgumentTypeError(f"некорректная сумма: {amount}")
+    return minor
+
+
+def parse_percentile(percent: str) -> float:
+    try:
+        value = float(percent)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"некорректный перцентиль: {percent}") from None
+    if not 0 <= value <= 100:
+        raise argparse.ArgumentTypeError(f"перцентиль должен быть от 0 до 100: {percent}")
+    return value
+
+
+def get_query(args: argparse.Namespace) -> "Query":
+    """
+    Условия отбора платежей из аргументов командной строки
+    """
+    from scr.query import Query
+
+    return Query(**{field: getattr(args, field, None) for field in Query._fields})
+
+
+def run_command(args: argparse.Namespace) -> None:
+    if args.command == "aggregate":
+        show_aggregation(args)
+    elif args.command == "account":
+        show_account_payments(args)
+    elif args.command == "serve":
+        start_server(args)
+    elif not no_operations(args.source):
+        show_latest_payments(get_query(args), args.source, args.dedup, args.decoder, args.colour)
+
+
+def show_aggregation(args: argparse.Namespace) -> None:
+    """
+    Выводит итоги по группам платежей (команда aggregate)
+    """
+    import json
+    import scr.aggregate as aggregate
+    import scr.utils as utils
+
+    path_to_file = get_path(args.path)
+    sample_size = aggregate.SAMPLE_SIZE if args.sample_size is None else args.sample_size
+    with utils.profile_stage("aggregate"):
+        groups = aggregate.aggregate_file(path_to_file, OBLIGATION_PARAMETERS_PAY, args.by,
+                                          args.approximate, sample_size, get_query(args))
+    rows = aggregate.report_rows(groups, args.by, args.percentile)
+    utils.count_records("groups", len(rows))
+
+    if args.format == "json":
+        sys.stdout.write(json.dumps(rows, ensure_ascii=False, indent=2) + "\n")
+    else:
+        sys.stdout.write(aggregate.format_table(rows))
+
+
+def show_account_payments(args: argparse.Namespace) -> None:
+    """
+    Выводит все платежи по номеру карты/счёта (команда account)
+    """
+    import scr.accounts as accounts
+    import scr.utils as utils
+
+    path_to_file = get_path(args.path)
+    with utils.profile_stage("account"):
+        payments = accounts.find_payments(path_to_file, OBLIGATION_PARAMETERS_PAY, args.number,
+                                          args.prefix, args.role)
+    utils.count_records("selected", len(payments))
+
+    with utils.profile_stage("show"):
+        utils.show_payments(payments, colour=args.colour)
+    utils.count_records("displayed", len(payments))
+
+
+def start_server(args: argparse.Namespace) -> None:
+    """
+    Запускает службу (команда serve)
+    """
+    import scr.server as server
+
+    options = {name: getattr(args, name) for name in ("host", "port", "interval")
+               if getattr(args, name) is not None}
+    server.serve(get_path(args.path), OBLIGATION_PARAMETERS_PAY, **options)
+
+
+def get_path(path: str | None = None) -> str:
+    """
+    Путь к файлу с операциями: path или PATH от корневой папки проекта
+    (как utils.get_path_to_file, но без импорта модулей обработки)
+    """
+    if path is not None:
+        return path
+
+    return os.path.join(ROOT_DIR, *PATH.split("/"))
+
+
+def no_operations(sources: list | None = None) -> bool:
+    """
+    Проверяет, что выводить нечего: файл PATH (или все файлы --source) —
+    пустой массив. Проверка не импортирует модули обработки
+
+    :raises FileNotFoundError: если файла PATH нет
+    """
+    if not sources:
+        return is_empty_source(get_path())
+    return all(os.path.isfile(source) and is_empty_source(source) for source in sources)
+
+
+def is_empty_source(path: str) -> bool:
+    """
+    Проверяет, что в файле операций пустой массив, не разбирая его
+
+    :raises FileNotFoundError: если файла нет
+    """
+    if os.stat(path).st_size > EMPTY_SOURCE_SIZE:
+        return False
+    with open(path, "rb") as source:
+        return b"".join(source.read().split()) == b"[]"
+
+
+def show_latest_payments(query: "Query | None" = None, sources: list | None = None,
+                         dedup: str | None = None, decoder: str | None = None,
+                         colour: bool = True) -> None:
+    if sources:
+        show_latest_from_sources(sources, query, dedup, colour)
+        return
+    if decoder:
+        show_latest_decoded(decoder, query, dedup, colour)
+        return
 
-def main() -> None:
     # Получаем полный путь к файлу с операциями, откуда бы не был запущен скрипт
-    *dirs, name_file = PATH.split("/")
-    path_to_file = utils.get_path_to_file(name_file, *dirs)
-
-    # Получаем итератор на основе списка словарей из JSON-файла
-    payments = utils.get_payments(path_to_file, OBLIGATION_PARAMETERS_PAY)
-
-    counter = 0
-
-    # Создаём объекты класса Payment и выводим на экран информацию либо
-    while counter < COUNT_TRANSFERS:
-        latest_payment = next(payments, None)
-        if latest_payment:
-            payment = utils.create_payment(latest_payment)
-            if all((payment.id_pay,
-                    payment.state_pay,
-                    payment.date_pay,
-                    payment.operation_amount_pay,
-                    payment.description_pay,
-                    payment.to_pay)):
-                utils.show_payment(payment)
-                counter += 1
+    path_to_file = get_path()
+
+    from itertools import islice
+    import scr.index as index
+    import scr.utils as utils
+    import scr.validation as validation
+
+    if dedup == "first":
+        # Первый в файле платёж с данным id можно найти только полным проходом по файлу
+        with utils.profile_stage("select"):
+            selected = utils.get_latest_checked_payments(path_to_file, OBLIGATION_PARAMETERS_PAY,
+                                                         COUNT_TRANSFERS, check_transfer, query, dedup)
+            payments = list(validation.build_payments(selected))
+        utils.count_records("selected", len(payments))
+        show_selected(payments, colour)
+        return
+
+    # Индекс по датам строится при первом запуске и переиспользуется, пока файл не изменится
+    with utils.profile_stage("index"):
+        payment_index = index.open_index(path_to_file, OBLIGATION_PARAMETERS_PAY)
+
+    # Идём по индексу от последних платежей к ранним (только в диапазоне дат
+    # запроса, остальные условия проверяются до создания объекта) и сразу создаём
+    # объекты класса Payment (дата уже разобрана при проверке); неполные платежи
+    # отбрасываются без создания объекта, пока не наберётся COUNT_TRANSFERS
+    with payment_index, utils.profile_stage("select"):
+        payments = validation.build_payments(payment_index.select(query))
+        if dedup == "latest":
+            payments = unique_payments(payments)
+        payments = list(islice(payments, COUNT_TRANSFERS))
+    utils.count_records("selected", len(payments))
+    show_selected(payments, colour)
+
+
+def show_latest_from_sources(sources: list, query: "Query | None" = None,
+                             dedup: str | None = None, colour: bool = True) -> None:
+    """
+    Выводит COUNT_TRANSFERS последних выполненных переводов из нескольких
+    файлов операций (--source), которые читаются и разбираются одновременно
+    """
+    from itertools import islice
+    import scr.concurrent_sources as concurrent_sources
+    import scr.utils as utils
+    import scr.validation as validation
+    from scr.query import combine
+
+    files = [path for source in sources for path in concurrent_sources.source_files(source)]
+    # С удалением повторов нужен весь отсортированный поток: сколько платежей
+    # уйдёт на повторы, заранее неизвестно
+    count = None if dedup else COUNT_TRANSFERS
+    with utils.profile_stage("select"):
+        selected = concurrent_sources.get_payments_concurrent(
+            files, OBLIGATION_PARAMETERS_PAY, count, combine(query, check_transfer))
+        payments = validation.build_payments(selected)
+        if dedup == "latest":
+            payments = unique_payments(payments)
+        payments = list(islice(payments, COUNT_TRANSFERS))
+    utils.count_records("selected", len(payments))
+    show_selected(payments, colour)
+
+
+def show_latest_decoded(decoder: str, query: "Query | None" = None,
+                        dedup: str | None = None, colour: bool = True) -> None:
+    """
+    Выводит COUNT_TRANSFERS последних выполненных переводов, разбирая
+    файл операций целиком библиотекой decoder (--decoder, SHOW_PAYS_DECODER)
+    """
+    from operator import attrgetter
+    import scr.decoder as decoder_module
+    import scr.utils as utils
+    from scr.dedup import select_latest_unique, unique
+
+    try:
+        decoder = decoder_module.choose_backend(decoder)
+    except ValueError as error:
+        # Библиотека не установлена
+        sys.exit(f"show-pays: {error}")
+
+    path_to_file = get_path()
+    with utils.profile_stage("select"):
+        # Операции без характеристик для вывода отбрасываются при разборе,
+        # поэтому select_latest выбирает среди полных платежей, как индекс
+        operations = decoder_module.decode_operations(path_to_file, OBLIGATION_PARAMETERS_PAY,
+                                                      decoder, query=query)
+        if dedup == "first":
+            latest = utils.select_latest(unique(operations, key=attrgetter("id")), COUNT_TRANSFERS)
+        elif dedup == "latest":
+            latest = select_latest_unique(operations, COUNT_TRANSFERS, key=attrgetter("id"))
         else:
-            break
+            latest = utils.select_latest(operations, COUNT_TRANSFERS)
+        payments = [operation.to_payment() for operation in latest]
+    utils.count_records("selected", len(payments))
+    show_selected(payments, colour)
+
+
+def unique_payments(payments: "Iterable[Payment]") -> "Iterator[Payment]":
+    """
+    Платежи, отсортированные по дате в обратном порядке, без повторов id
+    (остаётся самый поздний)
+    """
+    from operator import attrgetter
+    from scr.dedup import unique
+
+    return unique(payments, key=attrgetter("id_pay"))
+
+
+def show_selected(payments: list, colour: bool = True) -> None:
+    import scr.utils as utils
+
+    with utils.profile_stage("show"):
+        utils.show_payments(payments, colour=colour)
+    utils.count_records("displayed", len(payments))
+
+
+def check_transfer(checked: "CheckedPayment") -> bool:
+    """
+    Проверяет, что из словаря получается платёж со всеми
+    обязательными для вывода на экран характеристиками
+    """
+    import scr.validation as validation
+
+    return type(validation.complete_payment(*checked)) is not str
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # При запуске файлом (python programs/main.py) корневая папка проекта
+    # не входит в sys.path, а модули обработки импортируются позже
+    sys.path.append(ROOT_DIR)
+    cli()
\ No newline at end of file
@@ -0,0 +1,240 @@
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from class_payment.batch import to_microseconds
+from scr.json_stream import iter_json_items, read_chunks
+from scr.validation import complete_payment, parse_date, validate_record
+
+ACCOUNTS_SUFFIX = ".accidx"     # индекс хранится рядом с файлом операций: operations.json.accidx
+ACCOUNTS_MAGIC = b"PAYACC02"
+NUMBER_SIZE = 20                # номер счёта — 20 цифр, номер карты — 16
+ROLES = {"from": 0, "to": 1}    # поле платежа, в котором встретился номер
+
+# Заголовок: метка формата, хеш обязательных характеристик, размер и время
+# изменения файла операций, количество записей и длина таблицы типов карт (JSON).
+# Затем таблица и записи: номер (дополненный нулевыми байтами), поле платежа,
+# код типа карты/счёта, дата в мкс от EPOCH (с часовым поясом — в UTC),
+# смещение и длина записи в файле
+HEADER = struct.Struct("<8s8sqqqq")
+ENTRY = struct.Struct("<20sbhqqq")
+
+
+class AccountIndex:
+    """
+    Индекс платежей файла операций по номерам карт и счетов
+    отправителя и получателя.
+
+    Записи отсортированы по номеру, поэтому и точный поиск номера,
+    и поиск по началу номера (например, по BIN — первым 6 цифрам карты)
+    — это двоичный поиск и чтение из файла операций только найденных
+    платежей. Индекс сохраняется рядом с файлом и читается через mmap
+    """
+
+    def __init__(self, path: str, buffer, cards: list, count: int, start: int) -> None:
+        self.__path = path
+        self.__buffer = buffer
+        self.__cards = cards
+        self.__count = count
+        self.__start = start
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __enter__(self) -> "AccountIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def find(self, number: str, role: Optional[str] = None,
+             card_type: Optional[str] = None) -> list:
+        """
+        Платежи с номером карты/счёта number (пробелы и тип карты
+        в number игнорируются) от самого позднего к самому раннему
+
+        :param number: номер, например "5999414228426353" или "Visa Gold 5999 4142 2842 6353"
+        :param role: только отправитель ("from") или только получатель ("to")
+        :param card_type: только карты/счета этого типа ("Visa Gold", "Счет")
+        """
+        key = normalize_number(number).ljust(NUMBER_SIZE, b"\0")
+        start = bisect_left(range(self.__count), key, key=self.__number)
+        stop = bisect_right(range(self.__count), key, key=self.__number)
+        return self.__payments(start, stop, role, card_type)
+
+    def find_prefix(self, prefix: str, role: Optional[str] = None,
+                    card_type: Optional[str] = None) -> list:
+        """
+        Платежи с номерами карт/счетов, начинающимися с prefix
+        (например, BIN "599941"), от самого позднего к самому раннему
+        """
+        prefix = normalize_number(prefix)
+        start = bisect_left(range(self.__count), prefix, key=self.__number)
+        stop = bisect_left(range(self.__count), prefix + b"\xff", key=self.__number)
+        return self.__payments(start, stop, role, card_type)
+
+    def close(self) -> None:
+        if isinstance(self.__buffer, mmap.mmap):
+            self.__buffer.close()
+
+    def __number(self, number: int) -> bytes:
+        offset = self.__start + number * ENTRY.size
+        return self.__buffer[offset:offset + NUMBER_SIZE]
+
+    def __payments(self, start: int, stop: int, role: Optional[str], card_type: Optional[str]) -> list:
+        """
+        Читает из файла операций платежи записей индекса [start, stop)
+        """
+        role = None if role is None else ROLES[role]
+        found = {}
+        for number in range(start, stop):
+            _, entry_role, card, date, offset, length = ENTRY.unpack_from(
+                self.__buffer, self.__start + number * ENTRY.size)
+            if role is not None and entry_role != role:
+                continue
+            if card_type is not None and self.__cards[card] != card_type:
+                continue
+            # Платёж может попасть дважды (совпали отправитель и получатель)
+            found[offset] = (date, offset, length)
+
+        # По дате в обратном порядке, при равных датах — в порядке файла
+        entries = sorted(found.values(), key=lambda entry: (-entry[0], entry[1]))
+
+        payments = []
+        with open(self.__path, "rb") as source:
+            for _, offset, length in entries:
+                source.seek(offset)
+                # Дата в индексе нужна только для порядка: с часовым поясом она
+                # хранится в UTC, поэтому дата платежа берётся из самой записи
+                pay = json.loads(source.read(length))
+                payments.append(complete_payment(pay, parse_date(pay["date"])))
+        return payments
+
+
+def find_payments(path: str, parameters: set, number: str, prefix: bool = False,
+                  role: Optional[str] = None) -> list:
+    """
+    Платежи файла операций по номеру карты/счёта (или по началу номера,
+    если prefix) от самого позднего к самому раннему. Индекс по номерам
+    строится при первом запуске и переиспользуется, пока файл не изменится
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param number: номер карты/счёта или его начало
+    :param prefix: искать по началу номера
+    :param role: только отправитель ("from") или только получатель ("to")
+    """
+    with open_account_index(path, parameters) as index:
+        if prefix:
+            return index.find_prefix(number, role)
+        return index.find(number, role)
+
+
+def open_account_index(path: str, parameters: set) -> AccountIndex:
+    """
+    Открывает сохранённый индекс по номерам или строит его заново
+    """
+    index = load_account_index(path, parameters)
+    if index is None:
+        index = build_account_index(path, parameters)
+    return index
+
+
+def load_account_index(path: str, parameters: set) -> Optional[AccountIndex]:
+    """
+    Открывает сохранённый индекс, если он построен для текущего состояния
+    файла операций и набора обязательных характеристик, иначе возвращает None
+    """
+    try:
+        with open(path + ACCOUNTS_SUFFIX, "rb") as index_file:
+            buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    index = _open(path, buffer, _source_header(path, parameters))
+    if index is None:
+        buffer.close()
+    return index
+
+
+def build_account_index(path: str, parameters: set) -> AccountIndex:
+    """
+    Строит индекс одним проходом по файлу операций вместе с проверкой
+    платежей (validation.validate_record) и сохраняет его рядом с файлом.
+    Если сохранить не удалось, индекс остаётся в памяти
+    """
+    header = _source_header(path, parameters)
+    cards = {}
+    entries = []
+    with open(path, "rb") as source:
+        for begin, end, pay in iter_json_items(read_chunks(source), offsets=True):
+            payment = validate_record(pay, parameters)
+            if type(payment) is str:
+                continue
+
+            date = to_microseconds(payment.date_pay)
+            for role, account in ((ROLES["from"], payment.from_pay), (ROLES["to"], payment.to_pay)):
+                # Номер из цифр другой письменности ("١٢٣...") в индекс не попадает
+                if account and re.fullmatch(r"[0-9]+", account[1]):
+                    card = cards.setdefault(account[0], len(cards))
+                    entries.append((account[1].encode("ascii"), role, card, date, begin, end - begin))
+
+    entries.sort(key=lambda entry: (entry[0], -entry[3], entry[4]))
+    data = _pack(header, list(cards), entries)
+
+    # Если файл изменился во время построения, индекс не сохраняется
+    if _source_header(path, parameters) == header:
+        _save(path + ACCOUNTS_SUFFIX, data)
+
+    return _open(path, data, header)
+
+
+def normalize_number(number: str) -> bytes:
+    """
+    Номер карты/счёта без типа карты и пробелов: "Visa Gold 5999 4142" -> b"59994142"
+    """
+    return "".join(re.findall(r"[0-9]", number)).encode("ascii")
+
+
+def _pack(header: tuple, cards: list, entries: list) -> bytes:
+    table = json.dumps(cards, ensure_ascii=False).encode("utf-8")
+    parts = [HEADER.pack(*header, len(entries), len(table)), table]
+    parts.extend(ENTRY.pack(*entry) for entry in entries)
+    return b"".join(parts)
+
+
+def _open(path: str, buffer, header: tuple) -> Optional[AccountIndex]:
+    """
+    Проверяет заголовок и размер данных индекса
+    """
+    if len(buffer) < HEADER.size:
+        return None
+    *saved, count, table_size = HEADER.unpack_from(buffer)
+    start = HEADER.size + table_size
+    if tuple(saved) != header or len(buffer) != start + count * ENTRY.size:
+        return None
+
+    cards = json.loads(bytes(buffer[HEADER.size:start]))
+    return AccountIndex(path, buffer, cards, count, start)
+
+
+def _save(index_path: str, data: bytes) -> None:
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as index_file:
+            index_file.write(data)
+        os.replace(temp_path, index_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _source_header(path: str, parameters: set) -> tuple:
+    stat = os.stat(path)
+    parameters_hash = hashlib.blake2b("\0".join(sorted(parameters)).encode(), digest_size=8)
+    return ACCOUNTS_MAGIC, parameters_hash.digest(), stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,177 @@
+import random
+from array import array
+from typing import Callable, Iterable, Optional, Sequence
+
+from class_payment.amount import format_minor
+from class_payment.batch import INT64_MAX, INT64_MIN
+from class_payment.payment import Payment
+from scr.json_stream import iter_json_array
+from scr.query import Query
+from scr.utils import check_payments
+from scr.validation import build_payments, validate_records
+
+SAMPLE_SIZE = 10000     # размер выборки группы для приблизительных перцентилей
+SAMPLE_SEED = 0         # выборка детерминирована: один и тот же файл — один и тот же отчёт
+NO_CARD = "-"           # тип карты у платежей без отправителя
+
+# Признаки, по которым группируются платежи: название -> ключ группы из Payment
+GROUPS = {
+    "currency": lambda payment: payment.currency_pay,
+    "description": lambda payment: payment.description_pay,
+    "month": lambda payment: f"{payment.date_pay.year}-{payment.date_pay.month:02}",
+    "card": lambda payment: payment.from_pay[0] if payment.from_pay else NO_CARD,
+    "to_card": lambda payment: payment.to_pay[0],
+}
+
+
+class GroupStats:
+    """
+    Итоги по группе платежей: количество, сумма, минимум и максимум
+    (в копейках/центах) и суммы платежей для перцентилей — все
+    (компактный массив int64 или список, если сумма не помещается
+    в int64) или равномерная выборка из не более
+    чем sample_size сумм (reservoir sampling), если перцентили
+    нужны приблизительно
+    """
+
+    __slots__ = ("count", "total", "minimum", "maximum", "amounts", "sample_size", "random")
+
+    def __init__(self, sample_size: Optional[int] = None, seed: int = SAMPLE_SEED) -> None:
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.amounts = array("q")
+        self.sample_size = sample_size
+        self.random = random.Random(seed) if sample_size else None
+
+    def add(self, amount: int) -> None:
+        self.count += 1
+        self.total += amount
+        if self.minimum is None or amount < self.minimum:
+            self.minimum = amount
+        if self.maximum is None or amount > self.maximum:
+            self.maximum = amount
+
+        if self.sample_size is None or len(self.amounts) < self.sample_size:
+            index = len(self.amounts)
+        else:
+            # Каждая из count сумм оказывается в выборке с вероятностью sample_size / count
+            index = self.random.randrange(self.count)
+            if index >= self.sample_size:
+                return
+
+        if type(self.amounts) is array and not INT64_MIN <= amount <= INT64_MAX:
+            # Сумма вроде "1e30" не помещается в массив: дальше суммы хранятся в списке
+            self.amounts = list(self.amounts)
+        if index == len(self.amounts):
+            self.amounts.append(amount)
+        else:
+            self.amounts[index] = amount
+
+    def percentiles(self, percents: Sequence[float]) -> list:
+        """
+        Перцентили сумм группы (метод ближайшего ранга): сумма,
+        не меньше которой percent процентов сумм группы
+
+        :raises ValueError: если перцентиль не от 0 до 100
+        """
+        for percent in percents:
+            if not 0 <= percent <= 100:
+                raise ValueError(f"Перцентиль должен быть от 0 до 100: {percent}")
+
+        amounts = sorted(self.amounts)
+        if not amounts:
+            return [None for _ in percents]
+
+        result = []
+        for percent in percents:
+            rank = max(-(-percent * len(amounts) // 100), 1)
+            result.append(amounts[int(rank) - 1])
+        return result
+
+
+def aggregate(payments: Iterable[Payment], by: Sequence[str] = ("currency",),
+              approximate: bool = False, sample_size: int = SAMPLE_SIZE) -> dict:
+    """
+    Группирует платежи за один проход и считает по каждой группе
+    количество, сумму, минимум и максимум
+
+    :param payments: платежи (например, validation.validate_records)
+    :param by: признаки группировки (ключи GROUPS)
+    :param approximate: хранить для перцентилей не все суммы группы,
+    а выборку из sample_size сумм (память на группу ограничена)
+    :param sample_size: размер выборки для approximate
+
+    :return: ключ группы (кортеж значений признаков by) -> GroupStats
+    :raises ValueError: если признак группировки неизвестен
+    """
+    unknown = [name for name in by if name not in GROUPS]
+    if unknown:
+        raise ValueError(f"Неизвестные признаки группировки: {', '.join(unknown)}")
+
+    keys = [GROUPS[name] for name in by]
+    size = sample_size if approximate else None
+    groups = {}
+    for payment in payments:
+        key = tuple(get_key(payment) for get_key in keys)
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats(size)
+        stats.add(payment.amount_pay)
+
+    return groups
+
+
+def aggregate_file(path: str, parameters: set, by: Sequence[str] = ("currency",),
+                   approximate: bool = False, sample_size: int = SAMPLE_SIZE,
+                   query: Optional[Query] = None) -> dict:
+    """
+    То же, что aggregate, для всех платежей файла операций, прошедших
+    проверку и содержащих все характеристики, нужные для вывода на экран.
+    Файл читается потоково, записи не сортируются
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param query: условия отбора платежей
+    """
+    if query is None or query.empty:
+        payments = validate_records(iter_json_array(path), parameters)
+    else:
+        checked = check_payments(iter_json_array(path), parameters)
+        payments = build_payments(filter(query.predicate(), checked))
+    return aggregate(payments, by, approximate, sample_size)
+
+
+def report_rows(groups: dict, by: Sequence[str], percents: Sequence[float] = (),
+                amount_format: Callable[[int], str] = format_minor) -> list:
+    """
+    Строки отчёта, отсортированные по ключу группы: признаки группы,
+    количество, сумма, минимум, максимум и перцентили (pNN)
+    """
+    rows = []
+    for key in sorted(groups):
+        stats = groups[key]
+        row = dict(zip(by, key))
+        row.update(count=stats.count, total=amount_format(stats.total),
+                   min=amount_format(stats.minimum), max=amount_format(stats.maximum))
+        for percent, value in zip(percents, stats.percentiles(percents)):
+            row[f"p{percent:g}"] = amount_format(value)
+        rows.append(row)
+
+    return rows
+
+
+def format_table(rows: list) -> str:
+    """
+    Отчёт в виде текстовой таблицы с выровненными столбцами
+    """
+    if not rows:
+        return ""
+
+    columns = list(rows[0])
+    lines = [columns] + [[str(row[column]) for column in columns] for row in rows]
+    widths = [max(len(line[number]) for line in lines) for number in range(len(columns))]
+
+    return "".join("  ".join(value.ljust(width) for value, width in zip(line, widths)).rstrip() + "\n"
+                   for line in lines)
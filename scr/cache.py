@@ -0,0 +1,326 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from typing import Iterator, Optional
+
+from class_payment.batch import COLUMNS, NO_CODE, PaymentBatch, to_microseconds
+from class_payment.payment import Payment
+from scr.json_stream import iter_json_array
+from scr.utils import CACHE_SUFFIX, check_payments, get_payments
+from scr.validation import complete_payment, validate_records
+
+CACHE_MAGIC = b"PAYCOL04"
+ALIGNMENT = 8               # колонки выравниваются, чтобы их можно было читать через memoryview.cast
+
+# Колонки кэша кроме колонок PaymentBatch: код валюты платежа (в таблице
+# currency_codes, NO_CODE — кода нет); номера (в порядке get_payments)
+# платежей, неполных для вывода на экран, и их исходные словари
+# в компактном JSON (UTF-8) подряд со смещениями начала каждого словаря
+# (последнее — конец данных)
+RECORD_COLUMNS = {"currency_codes": "i", "skipped": "q", "record_offsets": "q", "records": "B"}
+
+# Заголовок: метка формата и длина описания (JSON) в байтах. Затем описание
+# (обязательные характеристики, размер и время изменения файла операций,
+# таблицы уникальных значений, смещения и длины колонок) и сами колонки
+HEADER = struct.Struct("<8sq")
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class PaymentCache:
+    """
+    Кэш проверенных платежей файла операций в двоичном колоночном
+    формате: колонки PaymentBatch (id, дата в мкс, сумма в копейках/центах,
+    коды валюты, описания и типа карты/счёта, упакованные номера),
+    записанные подряд в один файл.
+
+    Кроме колонок в кэше хранятся коды валют и исходные словари платежей,
+    которые прошли check_payment, но неполны для вывода на экран (таких
+    обычно единицы): get_payments возвращает словари тех же платежей,
+    что и для JSON-файла, собирая их из колонок.
+
+    Файл читается через mmap: колонки — это memoryview над отображённым
+    файлом, поэтому при открытии ничего не копируется и не разбирается.
+    Платежи хранятся в порядке get_payments (по дате в обратном порядке)
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap, batch: PaymentBatch, parameters: set,
+                 records: Optional[dict] = None, currency_codes: Optional[list] = None,
+                 source: Optional[list] = None) -> None:
+        self.__path = path
+        self.__buffer = buffer
+        self.__batch = batch
+        self.__parameters = parameters
+        self.__records = records or {name: array(code) for name, code in RECORD_COLUMNS.items()}
+        self.__currency_codes = currency_codes or []
+        self.__source = source
+
+    def __len__(self) -> int:
+        return len(self.__batch)
+
+    def __iter__(self) -> Iterator[Payment]:
+        return iter(self.__batch)
+
+    def __getitem__(self, index: int) -> Payment:
+        return self.__batch[index]
+
+    def __enter__(self) -> "PaymentCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def batch(self) -> PaymentBatch:
+        return self.__batch
+
+    @property
+    def parameters(self) -> set:
+        return self.__parameters
+
+    def records(self) -> Iterator[dict]:
+        """
+        Словари платежей, прошедших check_payment, в порядке get_payments.
+        Словари полных платежей собираются из колонок (сумма с двумя
+        знаками после точки, дата в формате ISO, без лишних ключей),
+        неполные возвращаются в исходном виде
+        """
+        offsets = self.__records["record_offsets"]
+        data = self.__records["records"]
+        start = 0
+        for index, position in enumerate(self.__records["skipped"]):
+            # Перед неполным платежом идут полные с номерами в колонках [start, position - index)
+            yield from self.__complete_records(start, position - index)
+            start = position - index
+            yield json.loads(bytes(data[offsets[index]:offsets[index + 1]]))
+        yield from self.__complete_records(start, len(self.__batch))
+
+    def is_current(self, source_path: str) -> bool:
+        """
+        Проверяет, что файл операций не менялся после построения кэша
+        """
+        source = os.stat(source_path)
+        return self.__source == [source.st_size, source.st_mtime_ns]
+
+    def close(self) -> None:
+        # Колонки ссылаются на mmap, поэтому сначала освобождаются они
+        for column in (*self.__batch.columns.values(), *self.__records.values()):
+            column.release()
+        self.__batch = PaymentBatch()
+        self.__records = {name: array(code) for name, code in RECORD_COLUMNS.items()}
+        self.__buffer.close()
+
+    def __complete_records(self, start: int, stop: int) -> Iterator[dict]:
+        codes = self.__records["currency_codes"]
+        for number in range(start, stop):
+            code = codes[number]
+            yield _to_record(self.__batch[number], None if code == NO_CODE else self.__currency_codes[code])
+
+
+def get_cached_payments(path: str, parameters: set) -> Iterator[Payment]:
+    """
+    Платежи файла операций в порядке get_payments (по дате в обратном
+    порядке) в виде объектов Payment. Кэш строится при первом запуске
+    и перестраивается, если файл операций изменился
+
+    Возвращаются только платежи со всеми характеристиками, нужными
+    для вывода на экран (см. validation.validate_record). Если кэш
+    нельзя записать (папка только для чтения) или платежи не помещаются
+    в колонки (id или сумма больше int64, номер карты/счёта не из цифр 0-9),
+    платежи читаются из JSON-файла
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    """
+    cache_path = path + CACHE_SUFFIX
+    cache = load_cache(cache_path, parameters, path)
+    if cache is None:
+        try:
+            build_cache(path, parameters, cache_path)
+        except (OSError, OverflowError, ValueError):
+            yield from validate_records(get_payments(path, parameters), parameters)
+            return
+        cache = load_cache(cache_path, parameters)
+
+    with cache:
+        yield from cache
+
+
+def build_cache(path: str, parameters: set, cache_path: Optional[str] = None) -> str:
+    """
+    Конвертирует JSON-файл операций в двоичный колоночный кэш
+    и возвращает путь к кэшу
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param cache_path: куда записать кэш, по умолчанию рядом с файлом операций
+    :raises OverflowError: если id или сумма платежа не помещаются в int64
+    :raises ValueError: если номер карты/счёта нельзя упаковать (не цифры 0-9)
+    :raises OSError: если кэш не удалось записать
+    """
+    cache_path = path + CACHE_SUFFIX if cache_path is None else cache_path
+    source = os.stat(path)
+
+    # Сортировка по дате в обратном порядке; при равных датах сохраняется порядок файла.
+    # Даты сравниваются в мкс (с часовым поясом — в UTC), поэтому даты
+    # с поясом и без него в одном файле не мешают сортировке
+    checked = list(check_payments(iter_json_array(path), parameters))
+    checked.sort(reverse=True, key=lambda item: to_microseconds(item.date))
+
+    batch = PaymentBatch()
+    currency_codes = {}
+    codes = array("i")
+    skipped = array("q")
+    data = bytearray()
+    offsets = array("q", [0])
+    for position, (pay, date) in enumerate(checked):
+        payment = complete_payment(pay, date)
+        if type(payment) is str:
+            skipped.append(position)
+            data += _encode(pay).encode("utf-8")
+            offsets.append(len(data))
+            continue
+
+        batch.append(payment)
+        code = pay["operationAmount"]["currency"].get("code")
+        codes.append(currency_codes.setdefault(code, len(currency_codes)) if type(code) is str else NO_CODE)
+    all_columns = {**batch.columns, "currency_codes": codes, "skipped": skipped,
+                   "record_offsets": offsets, "records": data}
+
+    columns = {}
+    offset = 0
+    for name, column in all_columns.items():
+        size = memoryview(column).nbytes
+        columns[name] = (offset, size)
+        offset += _aligned(size)
+
+    description = json.dumps({
+        "parameters": sorted(parameters),
+        "source": [source.st_size, source.st_mtime_ns],
+        "count": len(batch),
+        "tables": batch.tables,
+        "currency_codes": list(currency_codes),
+        "columns": columns,
+    }, ensure_ascii=False).encode("utf-8")
+    start = _aligned(HEADER.size + len(description))
+
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as cache_file:
+            cache_file.write(HEADER.pack(CACHE_MAGIC, len(description)))
+            cache_file.write(description)
+            for name, column in all_columns.items():
+                cache_file.seek(start + columns[name][0])
+                cache_file.write(column)
+            cache_file.truncate(start + offset)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return cache_path
+
+
+def load_cache(cache_path: str, parameters: Optional[set] = None,
+               source_path: Optional[str] = None) -> Optional[PaymentCache]:
+    """
+    Открывает кэш через mmap. Возвращает None, если кэша нет, он другого
+    формата, построен для других обязательных характеристик или (если
+    передан source_path) файл операций изменился после построения кэша
+
+    :param cache_path: путь к кэшу
+    :param parameters: обязательные характеристики платежа
+    :param source_path: путь к файлу операций, из которого построен кэш
+    """
+    try:
+        with open(cache_path, "rb") as cache_file:
+            head = cache_file.read(HEADER.size)
+            if len(head) < HEADER.size:
+                return None
+            magic, length = HEADER.unpack(head)
+            if magic != CACHE_MAGIC:
+                return None
+            description = json.loads(cache_file.read(length))
+            buffer = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+
+    if parameters is not None and description["parameters"] != sorted(parameters):
+        buffer.close()
+        return None
+
+    start = _aligned(HEADER.size + length)
+    data = memoryview(buffer)
+    codes = {**COLUMNS, **RECORD_COLUMNS}
+    columns = {name: data[start + offset:start + offset + size].cast(codes[name])
+               for name, (offset, size) in description["columns"].items()}
+    data.release()
+    records = {name: columns.pop(name) for name in RECORD_COLUMNS}
+    batch = PaymentBatch.from_columns(columns, description["tables"])
+
+    cache = PaymentCache(cache_path, buffer, batch, set(description["parameters"]), records,
+                         description["currency_codes"], description["source"])
+    if source_path is not None and not cache.is_current(source_path):
+        cache.close()
+        return None
+    return cache
+
+
+def iter_cache_dicts(cache_path: str, parameters: set) -> Iterator[dict]:
+    """
+    Словари платежей из кэша в порядке get_payments: словари тех же
+    платежей, что get_payments возвращает для JSON-файла, из которого
+    построен кэш (см. PaymentCache.records)
+
+    :raises FileNotFoundError: если файла нет
+    :raises ValueError: если файл не кэш, кэш построен для других
+    обязательных характеристик или файл операций рядом с кэшем
+    изменился после построения кэша
+    """
+    os.stat(cache_path)
+    cache = load_cache(cache_path)
+    if cache is None:
+        raise ValueError(f"{cache_path} is not a payment cache")
+    if cache.parameters != set(parameters):
+        cache.close()
+        raise ValueError(f"{cache_path} was built for parameters {sorted(cache.parameters)}")
+
+    # Кэш без файла операций рядом (например, скопированный отдельно) читается как есть
+    source_path = cache_path[:-len(CACHE_SUFFIX)]
+    if os.path.exists(source_path) and not cache.is_current(source_path):
+        cache.close()
+        raise ValueError(f"{cache_path} is out of date: {source_path} has changed")
+
+    return _iter_dicts(cache)
+
+
+def _iter_dicts(cache: PaymentCache) -> Iterator[dict]:
+    with cache:
+        yield from cache.records()
+
+
+def _to_record(payment: Payment, currency_code: Optional[str]) -> dict:
+    """
+    Словарь платежа в формате файла операций из значений колонок
+    """
+    amount, currency = payment.operation_amount_pay
+    pay = {
+        "id": payment.id_pay,
+        "state": payment.state_pay,
+        "date": payment.date_pay.isoformat(),
+        "operationAmount": {"amount": amount, "currency": {"name": currency}},
+        "description": payment.description_pay,
+    }
+    if currency_code is not None:
+        pay["operationAmount"]["currency"]["code"] = currency_code
+    if payment.from_pay:
+        pay["from"] = " ".join(payment.from_pay)
+    pay["to"] = " ".join(payment.to_pay)
+    return pay
+
+
+def _aligned(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
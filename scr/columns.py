@@ -0,0 +1,108 @@
+from itertools import compress, islice
+from operator import and_
+from typing import Callable, Iterable, Iterator
+
+from scr.utils import CheckedPayment
+from scr.validation import has_fields, is_executed, is_filled, parse_date
+
+BATCH_SIZE = 4096  # сколько платежей проверяется за один раз
+
+
+def to_columns(payments: list, parameters: set) -> dict:
+    """
+    Переводит список словарей платежей в колоночный вид:
+    ключ -> список значений этого ключа для всех платежей.
+
+    Если у платежа нет обязательного ключа, на его месте стоит None
+    (платёж не пройдёт проверку так же, как с пустым значением),
+    если нет необязательного — True (на проверку это не влияет).
+
+    :param payments: список словарей с информацией о платежах
+    :param parameters: обязательные характеристики платежа
+    """
+    keys = dict.fromkeys(parameters)
+    for pay in payments:
+        keys.update(dict.fromkeys(pay))
+
+    return {key: [pay.get(key, default) for pay in payments]
+            for key, default in ((key, None if key in parameters else True) for key in keys)}
+
+
+def check_columns(columns: dict, parameters: set) -> list:
+    """
+    Колоночный аналог check_payment: проверяет сразу все платежи
+    и возвращает список True/False (маску) в порядке платежей
+
+    :param columns: платежи в колоночном виде (см. to_columns)
+    :param parameters: обязательные характеристики платежа
+    """
+    return [date is not None for date in validate_columns(columns, parameters)]
+
+
+def validate_columns(columns: dict, parameters: set) -> list:
+    """
+    Колоночный аналог validate_payment: для каждого платежа возвращает
+    разобранную дату, если платёж подходит, иначе None.
+
+    Каждая проверка выполняется сразу над целыми колонками, а не над
+    отдельным словарём: наличие и непустота всех значений — одним
+    проходом по строкам колонок, проверка состояния — один раз для
+    каждого уникального значения, разбор даты — только для платежей,
+    прошедших остальные проверки. Правила проверок — те же, что
+    у utils.classify_payment (см. scr.validation).
+
+    :param columns: платежи в колоночном виде (см. to_columns)
+    :param parameters: обязательные характеристики платежа
+    """
+    size = len(next(iter(columns.values()), ()))
+    if not size or "state" not in columns or not has_fields(columns.keys(), parameters):
+        return [None] * size
+
+    # все ли характеристики есть и непустые (отсутствующая обязательная — None)
+    mask = map(is_filled, zip(*columns.values()))
+
+    # был ли платёж успешным
+    mask = list(map(and_, mask, _map_unique(columns["state"], is_executed)))
+
+    # является ли дата платежа корректной
+    dates = [None] * size
+    date_column = columns.get("date", dates)
+    for index, date in zip(compress(range(size), mask), compress(date_column, mask)):
+        dates[index] = parse_date(date)
+
+    return dates
+
+
+def check_payments_batched(payments: Iterable[dict], parameters: set,
+                           batch_size: int = BATCH_SIZE) -> Iterator[CheckedPayment]:
+    """
+    То же, что utils.check_payments, но платежи проверяются
+    пачками по batch_size штук в колоночном виде
+
+    :param payments: словари с информацией о платежах
+    :param parameters: обязательные характеристики платежа
+    :param batch_size: размер пачки
+    """
+    payments = iter(payments)
+    while True:
+        batch = list(islice(payments, batch_size))
+        if not batch:
+            break
+
+        dates = validate_columns(to_columns(batch, parameters), parameters)
+        for pay, date in zip(batch, dates):
+            if date is not None:
+                yield CheckedPayment(pay, date)
+
+
+def _map_unique(column: list, function: Callable) -> list:
+    """
+    Применяет функцию к каждому уникальному значению колонки
+    и раскладывает результаты по всем строкам
+    """
+    try:
+        results = {value: function(value) for value in set(column)}
+    except TypeError:  # в колонке есть нехешируемые значения
+        return list(map(function, column))
+
+    return list(map(results.__getitem__, column))
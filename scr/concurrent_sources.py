@@ -0,0 +1,146 @@
+import asyncio
+import codecs
+import heapq
+from itertools import islice
+from operator import attrgetter
+from typing import Callable, Iterator, Optional
+
+from scr.json_stream import CHUNK_SIZE, iter_json_items
+from scr.parallel import source_files
+from scr.utils import CheckedPayment, check_payments, select_latest
+
+WORKERS = 4         # сколько файлов разбирается одновременно
+READ_AHEAD = 4      # сколько прочитанных блоков файла может ждать разбора
+
+# Признак для потока разбора: чтение файла остановлено. Это не экземпляр
+# исключения: одно и то же исключение, поднятое в нескольких потоках,
+# накапливает в __traceback__ кадры всех потоков
+_STOPPED = object()
+
+
+def get_payments_concurrent(sources, parameters: set, count: Optional[int] = None,
+                            accept: Optional[Callable[[CheckedPayment], bool]] = None,
+                            workers: int = WORKERS, chunk_size: int = CHUNK_SIZE,
+                            read_ahead: int = READ_AHEAD) -> Iterator[CheckedPayment]:
+    """
+    Синхронная обёртка над get_payments_async для кода без asyncio
+    """
+    return asyncio.run(get_payments_async(sources, parameters, count, accept,
+                                          workers, chunk_size, read_ahead))
+
+
+async def get_payments_async(sources, parameters: set, count: Optional[int] = None,
+                             accept: Optional[Callable[[CheckedPayment], bool]] = None,
+                             workers: int = WORKERS, chunk_size: int = CHUNK_SIZE,
+                             read_ahead: int = READ_AHEAD) -> Iterator[CheckedPayment]:
+    """
+    Читает многие файлы операций одновременно и возвращает последние
+    count платежей всех файлов или все платежи, отсортированные по дате
+    в обратном порядке.
+
+    Для каждого файла чтение блоков (в потоке, asyncio.to_thread) и разбор
+    (в другом потоке) идут одновременно: чтение опережает разбор не больше
+    чем на read_ahead блоков, после чего ждёт (обратное давление). Одновременно
+    обрабатывается не больше workers файлов. Отсортированные результаты
+    файлов сливаются (k-way merge); при равных датах раньше идёт платёж
+    из файла, который стоит в списке раньше, как при последовательной обработке
+
+    :param sources: путь к JSON-файлу, к папке с JSON-файлами, шаблон путей
+    или список путей (см. parallel.source_files)
+    :param parameters: обязательные характеристики платежа
+    :param count: сколько последних платежей вернуть; None — все платежи
+    :param accept: дополнительная проверка платежа
+    :param workers: сколько файлов обрабатывается одновременно
+    :param chunk_size: размер блока чтения в байтах
+    :param read_ahead: сколько прочитанных блоков может ждать разбора
+
+    :return: итератор CheckedPayment, отсортированный по дате в обратном порядке
+    """
+    limit = asyncio.Semaphore(workers)
+
+    async def process(path: str) -> list:
+        async with limit:
+            return await _process_source(path, parameters, count, accept, chunk_size, read_ahead)
+
+    runs = await asyncio.gather(*(process(path) for path in source_files(sources)))
+    merged = heapq.merge(*runs, key=attrgetter("date"), reverse=True)
+
+    return islice(merged, count)
+
+
+async def _process_source(path: str, parameters: set, count: Optional[int],
+                          accept: Optional[Callable[[CheckedPayment], bool]],
+                          chunk_size: int, read_ahead: int) -> list:
+    """
+    Читает файл блоками в очередь и одновременно разбирает его в потоке
+    """
+    loop = asyncio.get_running_loop()
+    blocks = asyncio.Queue(read_ahead)
+    stop = asyncio.Event()
+
+    async def read() -> None:
+        try:
+            with open(path, "rb") as source:
+                while not stop.is_set():
+                    data = await asyncio.to_thread(source.read, chunk_size)
+                    await blocks.put(data)
+                    if not data:
+                        break
+        except OSError as error:
+            await blocks.put(error)
+
+    def next_block():
+        # Вызывается из потока разбора: ждёт блок из очереди цикла событий
+        return asyncio.run_coroutine_threadsafe(blocks.get(), loop).result()
+
+    reader = asyncio.create_task(read())
+    parser = asyncio.ensure_future(asyncio.to_thread(_parse, next_block, parameters, count, accept))
+    try:
+        return await parser
+    finally:
+        # Разбор завершился ошибкой или обработку отменили (например, из-за
+        # ошибки в другом файле): чтение останавливается, а поток разбора,
+        # который может ждать блок, получает признак остановки. Без этого
+        # asyncio.run бесконечно ждёт завершения потока
+        stop.set()
+        reader.cancel()
+        while not blocks.empty():
+            blocks.get_nowait()
+        blocks.put_nowait(_STOPPED)
+        await asyncio.wait((parser, reader))
+
+
+def _parse(next_block: Callable, parameters: set, count: Optional[int],
+           accept: Optional[Callable[[CheckedPayment], bool]]) -> list:
+    payments = iter_json_items(_decode_blocks(next_block))
+    checked = check_payments(payments, parameters)
+    if count is not None:
+        return select_latest(checked, count, accept)
+
+    if accept is not None:
+        checked = filter(accept, checked)
+    result = list(checked)
+    result.sort(reverse=True, key=attrgetter("date"))
+    return result
+
+
+def _decode_blocks(next_block: Callable) -> Iterator[str]:
+    """
+    Блоки файла из очереди, декодированные из UTF-8 (как json_stream.read_chunks)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while True:
+        data = next_block()
+        if data is _STOPPED:
+            raise asyncio.CancelledError("Чтение файла остановлено")
+        if isinstance(data, BaseException):
+            raise data
+        if not data:
+            break
+        text = decoder.decode(data)
+        if text:
+            yield text
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
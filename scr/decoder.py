@@ -0,0 +1,167 @@
+import gc
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, NamedTuple, Optional
+
+from class_payment.payment import Payment
+from scr.json_stream import iter_json_array
+from scr.utils import CheckedPayment, classify_payment, get_profiler
+from scr.validation import record_values
+
+if TYPE_CHECKING:
+    from scr.query import Query
+
+DECODER_ENV = "SHOW_PAYS_DECODER"           # переменная окружения: orjson, msgspec или json
+BACKENDS = ("orjson", "msgspec", "json")    # в порядке предпочтения, json — всегда доступен
+
+
+class Operation(NamedTuple):
+    """
+    Операция из файла операций, прошедшая все проверки check_payment
+    и сеттеров Payment, с характеристиками, уже приведёнными к нужному
+    виду (поля в порядке аргументов Payment.from_values)
+    """
+    id: int
+    state: str
+    date: datetime
+    amount: int                     # в копейках/центах
+    currency: str
+    description: str
+    from_account: Optional[tuple]   # (тип карты или "Счет", номер) или None
+    to_account: tuple
+
+    def to_payment(self) -> Payment:
+        return Payment.from_values(*self)
+
+
+def available_backends() -> list:
+    """
+    Установленные библиотеки разбора JSON в порядке предпочтения
+    """
+    result = []
+    for name in BACKENDS:
+        try:
+            _get_loads(name)
+        except ImportError:
+            continue
+        result.append(name)
+    return result
+
+
+def choose_backend(backend: Optional[str] = None) -> str:
+    """
+    Библиотека разбора: backend, значение DECODER_ENV или самая быстрая из установленных
+
+    :raises ValueError: если библиотека неизвестна или не установлена
+    """
+    backend = backend or os.environ.get(DECODER_ENV)
+    if not backend:
+        return available_backends()[0]
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестная библиотека разбора JSON: {backend}")
+    try:
+        _get_loads(backend)
+    except ImportError:
+        raise ValueError(f"Библиотека разбора JSON не установлена: {backend}") from None
+    return backend
+
+
+def load_records(path: str, backend: Optional[str] = None) -> Iterable:
+    """
+    Словари платежей из файла операций.
+
+    orjson и msgspec разбирают файл целиком (быстрее, но весь документ
+    в памяти), json — потоково по одной записи (json_stream.iter_json_array).
+    Если orjson или msgspec не принимают документ (например, NaN и Infinity,
+    которые допускает json), файл разбирается потоково
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param backend: библиотека разбора (см. choose_backend)
+    :raises ValueError: если документ не является JSON-массивом
+    """
+    backend = choose_backend(backend)
+    if backend == "json":
+        return iter_json_array(path)
+
+    with open(path, "rb") as json_file:
+        data = json_file.read()
+    try:
+        with _gc_paused():
+            records = _get_loads(backend)(data)
+    except ValueError:
+        # Ошибки разбора orjson и msgspec — подклассы ValueError; некорректный
+        # документ потоковый разбор отвергнет с указанием места ошибки
+        return iter_json_array(path)
+    if type(records) is not list:
+        raise ValueError(f"{path}: ожидается JSON-массив")
+    return records
+
+
+def decode_operations(path: str, parameters: set, backend: Optional[str] = None,
+                      counters: Optional[Counter] = None,
+                      query: Optional["Query"] = None) -> Iterator[Operation]:
+    """
+    Генератор операций файла, прошедших проверку и содержащих все
+    характеристики, нужные для вывода на экран, в порядке файла.
+    Причины отказа учитываются в counters и в подключённом профилировщике
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param backend: библиотека разбора (см. choose_backend)
+    :param counters: счётчик, в котором учитываются причины отказа
+    :param query: условия отбора платежей (scr.query.Query); проверяются
+    на словаре платежа до проверки остальных характеристик
+    """
+    profiler = get_profiler()
+    matches = query.predicate() if query is not None and not query.empty else None
+    for pay in load_records(path, backend):
+        date = classify_payment(pay, parameters)
+        if profiler is not None:
+            profiler.count("read")
+            if type(date) is not str:
+                profiler.count("accepted")
+        if type(date) is not str and matches is not None and not matches(CheckedPayment(pay, date)):
+            continue
+
+        values = date if type(date) is str else record_values(pay, date)
+        if type(values) is not str:
+            yield Operation(*values)
+            continue
+
+        if counters is not None:
+            counters[values] += 1
+        if profiler is not None:
+            profiler.reject(values)
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Выключает сборщик мусора на время разбора документа целиком: в разобранных
+    записях нет циклических ссылок, а проходы сборщика по сотням тысяч
+    создаваемых словарей замедляют разбор в 2-2.5 раза
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _get_loads(backend: str) -> Callable[[bytes], object]:
+    """
+    :raises ImportError: если библиотека не установлена
+    """
+    if backend == "orjson":
+        import orjson
+        return orjson.loads
+    if backend == "msgspec":
+        import msgspec
+        return msgspec.json.Decoder().decode
+    return json.loads
@@ -0,0 +1,260 @@
+import heapq
+import json
+import math
+import os
+import sqlite3
+import tempfile
+from typing import Callable, Hashable, Iterable, Iterator, Optional
+
+POLICIES = ("first", "latest")  # какой из платежей с одинаковым id остаётся
+EXACT_THRESHOLD = 1000000       # сколько id хранится точно (в set), пока не включится фильтр Блума
+BLOOM_CAPACITY = 10000000       # на сколько id рассчитан фильтр Блума
+BLOOM_ERROR_RATE = 0.01         # доля ложных срабатываний фильтра при BLOOM_CAPACITY id
+
+_MASK = (1 << 64) - 1
+
+
+def payment_id(checked) -> Hashable:
+    """
+    id платежа из CheckedPayment (ключ удаления повторов по умолчанию)
+    """
+    return checked.pay.get("id")
+
+
+def check_policy(policy: Optional[str]) -> None:
+    """
+    :raises ValueError: если политика удаления повторов неизвестна
+    """
+    if policy is not None and policy not in POLICIES:
+        raise ValueError(f"Неизвестная политика удаления повторов: {policy}")
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: множество ключей с ограниченной памятью, в котором
+    «нет» — точный ответ, а «есть» может оказаться ложным срабатыванием
+    (с долей error_rate, пока ключей не больше capacity)
+    """
+
+    __slots__ = ("size", "hashes", "bits")
+
+    def __init__(self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE) -> None:
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Добавляет ключ. Возвращает True, если ключ, возможно, уже был
+        в фильтре (все его биты уже установлены)
+        """
+        bits = self.bits
+        present = True
+        for position in self.__positions(key):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                present = False
+        return present
+
+    def __contains__(self, key: Hashable) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.__positions(key))
+
+    def __positions(self, key: Hashable) -> list:
+        # Двойное хеширование: позиции h1 + i * h2, где h1 и h2 — половины перемешанного хеша ключа
+        mixed = _mix(hash(key))
+        size = self.size
+        position = (mixed & 0xFFFFFFFF) % size
+        step = (mixed >> 32) % size or 1
+        positions = []
+        for _ in range(self.hashes):
+            positions.append(position)
+            position = (position + step) % size
+        return positions
+
+
+class SeenIds:
+    """
+    Множество уже встреченных ключей (id платежей) с ограниченной памятью.
+
+    До threshold ключей хранятся точно в set. Дальше ключи переносятся
+    во временную базу SQLite на диске, а в памяти остаётся только фильтр
+    Блума: новый ключ, которого нет в фильтре, добавляется без обращения
+    к диску, и только при срабатывании фильтра наличие проверяется в базе
+    (повторы и редкие ложные срабатывания). Ответ всегда точный
+    """
+
+    def __init__(self, threshold: int = EXACT_THRESHOLD, capacity: int = BLOOM_CAPACITY,
+                 error_rate: float = BLOOM_ERROR_RATE, temp_dir: Optional[str] = None) -> None:
+        self.__threshold = threshold
+        self.__capacity = capacity
+        self.__error_rate = error_rate
+        self.__temp_dir = temp_dir
+        self.__exact = set()
+        self.__bloom = None
+        self.__database = None
+        self.__path = None
+        self.__count = 0
+        self.disk_lookups = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __enter__(self) -> "SeenIds":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def on_disk(self) -> bool:
+        return self.__bloom is not None
+
+    def add(self, key: Hashable) -> bool:
+        """
+        Добавляет ключ. Возвращает True, если ключ встретился впервые
+        """
+        key = _normalize(key)
+        if self.__bloom is None:
+            if key in self.__exact:
+                return False
+            self.__exact.add(key)
+            self.__count += 1
+            if self.__count > self.__threshold:
+                self.__spill()
+            return True
+
+        if self.__bloom.add(key):
+            self.disk_lookups += 1
+            if self.__database.execute("SELECT 1 FROM ids WHERE key = ?", (key,)).fetchone():
+                return False
+
+        self.__database.execute("INSERT INTO ids VALUES (?)", (key,))
+        self.__count += 1
+        return True
+
+    def close(self) -> None:
+        if self.__database is not None:
+            self.__database.close()
+            self.__database = None
+        if self.__path is not None:
+            os.remove(self.__path)
+            self.__path = None
+
+    def __spill(self) -> None:
+        """
+        Переносит точное множество в базу на диске и фильтр Блума
+        """
+        descriptor, self.__path = tempfile.mkstemp(suffix=".sqlite", dir=self.__temp_dir)
+        os.close(descriptor)
+        # База временная: журнал и синхронизация с диском не нужны
+        self.__database = sqlite3.connect(self.__path, isolation_level=None)
+        self.__database.execute("PRAGMA journal_mode = OFF")
+        self.__database.execute("PRAGMA synchronous = OFF")
+        self.__database.execute("CREATE TABLE ids (key PRIMARY KEY) WITHOUT ROWID")
+        self.__database.execute("BEGIN")
+
+        self.__bloom = BloomFilter(max(self.__capacity, 2 * self.__count), self.__error_rate)
+        for key in self.__exact:
+            self.__bloom.add(key)
+        self.__database.executemany("INSERT INTO ids VALUES (?)", ((key,) for key in self.__exact))
+        self.__exact = None
+
+
+def unique(items: Iterable, key: Callable = payment_id, threshold: int = EXACT_THRESHOLD,
+           temp_dir: Optional[str] = None) -> Iterator:
+    """
+    Генератор, пропускающий элементы с уже встречавшимся ключом:
+    из повторов остаётся первый в порядке потока (для потока,
+    отсортированного по дате в обратном порядке, — самый поздний)
+
+    :param items: элементы (по умолчанию CheckedPayment)
+    :param key: ключ элемента, по умолчанию id платежа
+    :param threshold: сколько ключей хранить точно в памяти (см. SeenIds)
+    :param temp_dir: папка для временной базы, по умолчанию системная
+    """
+    with SeenIds(threshold, temp_dir=temp_dir) as seen:
+        for item in items:
+            if seen.add(key(item)):
+                yield item
+
+
+def select_latest_unique(payments: Iterable, count: int,
+                         accept: Optional[Callable] = None, key: Callable = payment_id) -> list:
+    """
+    То же, что utils.select_latest, но из платежей с одинаковым ключом
+    учитывается только самый поздний: результат совпадает с первыми count
+    элементами отсортированного по дате потока после unique.
+
+    Память O(count): в куче хранятся только платежи, которые могут
+    попасть в результат, и их ключи
+
+    :param payments: проверенные платежи в порядке следования в файле
+    :param count: сколько последних платежей нужно вернуть
+    :param accept: дополнительная проверка; вызывается только для платежей,
+    которые могут попасть в результат
+    :param key: ключ платежа, по умолчанию id
+
+    :return: список CheckedPayment, отсортированный по дате в обратном порядке
+    """
+    best = {}       # ключ -> (порядок, платёж) для платежей в результате
+    heap = []       # (порядок, ключ); записи вытесненных платежей удаляются лениво
+    if count > 0:
+        for index, checked in enumerate(payments):
+            # Порядок (дата, -номер): при равных датах «больше» тот платёж,
+            # который встретился в файле раньше
+            order = (checked.date, -index)
+            ident = _normalize(key(checked))
+            current = best.get(ident)
+            if current is not None:
+                if order <= current[0]:
+                    continue
+            elif len(best) == count and order <= _smallest(heap, best)[0]:
+                continue
+            if accept is not None and not accept(checked):
+                continue
+
+            if current is None and len(best) == count:
+                del best[_smallest(heap, best)[1]]
+                heapq.heappop(heap)
+            best[ident] = (order, checked)
+            heapq.heappush(heap, (order, ident))
+
+            # Устаревшие записи копятся, если в результате часто обновляются одни и те же id
+            if len(heap) > 4 * count + 64:
+                heap = [item for item in heap if best.get(item[1], (None,))[0] == item[0]]
+                heapq.heapify(heap)
+
+    latest = sorted(best.values(), reverse=True, key=lambda item: item[0])
+    return [checked for _, checked in latest]
+
+
+def _smallest(heap: list, best: dict) -> tuple:
+    """
+    Самая ранняя актуальная запись кучи (устаревшие снимаются с вершины)
+    """
+    while best.get(heap[0][1], (None,))[0] != heap[0][0]:
+        heapq.heappop(heap)
+    return heap[0]
+
+
+def _normalize(key: Hashable) -> Hashable:
+    """
+    Ключ, который можно хранить и в set, и в SQLite: целые числа (64 бита)
+    и строки остаются как есть, остальные значения заменяются строкой с JSON
+    (с нулевым символом в начале, чтобы не совпасть с id-строкой)
+    """
+    if type(key) is str or (type(key) is int and -(1 << 63) <= key < 1 << 63):
+        return key
+    return "\0" + json.dumps(key, sort_keys=True)
+
+
+def _mix(value: int) -> int:
+    """
+    Перемешивание битов (splitmix64): хеш целого числа в Python — само число
+    """
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
@@ -0,0 +1,126 @@
+import heapq
+import json
+import struct
+import tempfile
+from datetime import datetime
+from operator import attrgetter
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from class_payment.batch import pack_date, unpack_date
+from scr.utils import CheckedPayment, count_records
+
+RUN_SIZE = 100000           # сколько платежей сортируется в памяти за один раз
+BUFFER_SIZE = 1 << 16       # размер буфера чтения одной серии при слиянии
+
+# Запись серии: дата в мкс от EPOCH (без часового пояса), смещение часового
+# пояса в секундах (batch.NAIVE — дата без пояса), длина словаря платежа в байтах;
+# затем словарь платежа в компактном JSON (UTF-8)
+RECORD = struct.Struct("<qiI")
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+_date = attrgetter("date")
+
+
+def sort_external(payments: Iterable[CheckedPayment], run_size: int = RUN_SIZE,
+                  temp_dir: Optional[str] = None) -> Iterator[CheckedPayment]:
+    """
+    Сортирует проверенные платежи по дате в обратном порядке, не держа
+    их все в памяти: платежи сортируются сериями по run_size, серии
+    записываются во временные файлы в двоичном виде и сливаются
+    (k-way merge, heapq.merge) при чтении результата.
+
+    Порядок тот же, что у list.sort(reverse=True, key=дата): при равных
+    датах платежи идут в исходном порядке (сортировка серий устойчива,
+    а при слиянии раньше идёт платёж из более ранней серии).
+    Если все платежи помещаются в одну серию, файлы не создаются
+
+    :param payments: проверенные платежи (например, utils.check_payments)
+    :param run_size: сколько платежей сортируется в памяти за один раз
+    :param temp_dir: папка для временных файлов, по умолчанию системная
+
+    :return: итератор CheckedPayment, отсортированный по дате в обратном порядке
+    """
+    if run_size < 1:
+        raise ValueError("Размер серии должен быть положительным")
+
+    runs = []
+    try:
+        run = []
+        for checked in payments:
+            run.append(checked)
+            if len(run) >= run_size:
+                run.sort(reverse=True, key=_date)
+                runs.append(_spill(run, temp_dir))
+                run = []
+        run.sort(reverse=True, key=_date)
+    except BaseException:
+        for file in runs:
+            file.close()
+        raise
+
+    if not runs:
+        return iter(run)
+
+    count_records("spilled_runs", len(runs))
+    if run:
+        runs.append(_spill(run, temp_dir))
+    return _merge(runs)
+
+
+def _spill(run: list, temp_dir: Optional[str]) -> BinaryIO:
+    """
+    Записывает отсортированную серию во временный файл (удаляется
+    при закрытии) и возвращает файл, готовый к чтению с начала
+    """
+    file = tempfile.TemporaryFile(dir=temp_dir)
+    try:
+        file.write(b"".join(_pack(pay, date) for pay, date in run))
+        file.seek(0)
+    except BaseException:
+        file.close()
+        raise
+    return file
+
+
+def _pack(pay: dict, date: datetime) -> bytes:
+    data = _encode(pay).encode("utf-8")
+    return RECORD.pack(*pack_date(date), len(data)) + data
+
+
+def _merge(runs: list) -> Iterator[CheckedPayment]:
+    try:
+        yield from heapq.merge(*map(_read_run, runs), key=_date, reverse=True)
+    finally:
+        for file in runs:
+            file.close()
+
+
+def _read_run(file: BinaryIO) -> Iterator[CheckedPayment]:
+    """
+    Платежи серии в порядке записи (буферизованное чтение по BUFFER_SIZE)
+    """
+    buffer = b""
+    position = 0
+    while True:
+        if len(buffer) - position < RECORD.size:
+            data = file.read(BUFFER_SIZE)
+            if not data:
+                if position < len(buffer):
+                    raise ValueError("Временный файл серии обрезан")
+                return
+            buffer = buffer[position:] + data
+            position = 0
+            continue
+
+        microseconds, offset, size = RECORD.unpack_from(buffer, position)
+        start = position + RECORD.size
+        if len(buffer) - start < size:
+            data = file.read(max(BUFFER_SIZE, size + RECORD.size))
+            if not data:
+                raise ValueError("Временный файл серии обрезан")
+            buffer = buffer[position:] + data
+            position = 0
+            continue
+
+        yield CheckedPayment(json.loads(buffer[start:start + size]), unpack_date(microseconds, offset))
+        position = start + size
@@ -0,0 +1,426 @@
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Iterator, Optional
+
+from class_payment.batch import to_microseconds
+from scr.json_stream import iter_json_items, read_chunks
+from scr.query import Query, combine
+from scr.utils import CheckedPayment, classify_payment, get_profiler
+from scr.validation import (REJECT_BAD_DATE, REJECT_EMPTY_FIELDS, REJECT_MISSING_FIELDS,
+                            REJECT_NO_STATE, REJECT_NOT_EXECUTED, parse_date)
+
+INDEX_SUFFIX = ".idx"       # индекс хранится рядом с файлом операций: operations.json.idx
+INDEX_MAGIC = b"PAYIDX04"
+HASH_BLOCK = 1 << 20        # размер блоков, которыми читается файл для контрольной суммы
+
+# Счётчики разбора файла, которые хранятся в индексе, чтобы отчёт профилировщика
+# был одинаковым и при построении индекса, и при его повторном использовании
+COUNTS = ("read", REJECT_NO_STATE, REJECT_NOT_EXECUTED, REJECT_MISSING_FIELDS,
+          REJECT_EMPTY_FIELDS, REJECT_BAD_DATE)
+
+# Заголовок: метка формата, хеш обязательных характеристик, размер и время
+# изменения файла операций, смещение конца последней разобранной записи,
+# контрольная сумма всего файла до этого смещения, счётчики COUNTS,
+# количество записей. Затем записи по три int64: (дата в мкс, смещение, длина)
+HEADER = struct.Struct(f"<8s8sqqq16s{len(COUNTS)}qq")
+SOURCE_FIELDS = 6           # поля заголовка, описывающие состояние файла операций
+ENTRY_SIZE = 3
+
+
+class PaymentIndex:
+    """
+    Индекс проверенных платежей файла операций, отсортированный по дате.
+
+    Для каждого платежа, прошедшего check_payment, хранится дата
+    (микросекунды от EPOCH, даты с часовым поясом — в UTC), смещение
+    записи в файле и её длина в байтах.
+    Индекс сохраняется в файл рядом с источником и читается через mmap,
+    поэтому выбор последних N платежей — это N чтений записей из файла
+    без разбора всего JSON.
+    """
+
+    def __init__(self, path: str, entries: memoryview, buffer=None) -> None:
+        self.__path = path
+        self.__entries = entries
+        self.__buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.__entries) // ENTRY_SIZE
+
+    def __iter__(self) -> Iterator[CheckedPayment]:
+        """
+        Все платежи индекса от самого позднего к самому раннему
+        """
+        with open(self.__path, "rb") as source:
+            for number in range(len(self) - 1, -1, -1):
+                yield self.__read(source, number)
+
+    def __enter__(self) -> "PaymentIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def latest(self, count: int,
+               accept: Optional[Callable[[CheckedPayment], bool]] = None,
+               query: Optional[Query] = None) -> list:
+        """
+        Возвращает count самых поздних платежей (с учётом дополнительной
+        проверки accept и условий query) в том же порядке,
+        что и get_latest_checked_payments
+        """
+        if count <= 0:
+            return []
+        return list(islice(self.select(query, accept), count))
+
+    def select(self, query: Optional[Query] = None,
+               accept: Optional[Callable[[CheckedPayment], bool]] = None) -> Iterator[CheckedPayment]:
+        """
+        Платежи, подходящие под условия query (и проверку accept), от самого
+        позднего к самому раннему. Диапазон дат запроса находится двоичным
+        поиском по индексу, и платежи вне диапазона не читаются из файла
+        """
+        start, stop = self.date_range(query.date_from if query else None,
+                                      query.date_to if query else None)
+        accept = combine(query._replace(date_from=None, date_to=None) if query else None, accept)
+
+        with open(self.__path, "rb") as source:
+            for number in range(stop - 1, start - 1, -1):
+                checked = self.__read(source, number)
+                if accept is None or accept(checked):
+                    yield checked
+
+    def date_range(self, date_from: Optional[datetime] = None,
+                   date_to: Optional[datetime] = None) -> tuple:
+        """
+        Номера записей индекса [start, stop) с датами в диапазоне [date_from, date_to)
+        """
+        with self.__entries[::ENTRY_SIZE] as dates:
+            start = 0 if date_from is None else bisect_left(dates, to_microseconds(date_from))
+            stop = len(dates) if date_to is None else bisect_left(dates, to_microseconds(date_to))
+        return start, max(start, stop)
+
+    def last_date(self) -> int:
+        """
+        Дата самого позднего платежа индекса в микросекундах от EPOCH
+        """
+        return self.__entries[-ENTRY_SIZE]
+
+    def entries(self) -> array:
+        """
+        Копия записей индекса: (дата в мкс, смещение, длина) подряд
+        """
+        return array("q", self.__entries)
+
+    def close(self) -> None:
+        self.__entries.release()
+        if self.__buffer is not None:
+            self.__buffer.close()
+
+    def __read(self, source, number: int) -> CheckedPayment:
+        offset, length = self.__entries[number * ENTRY_SIZE + 1:(number + 1) * ENTRY_SIZE]
+        source.seek(offset)
+        pay = json.loads(source.read(length))
+        # Даты с часовым поясом хранятся в индексе в UTC, поэтому дата
+        # платежа (вместе с часовым поясом) берётся из самой записи
+        return CheckedPayment(pay, parse_date(pay["date"]))
+
+
+def get_latest_indexed_payments(path: str, parameters: set, count: int,
+                                accept: Optional[Callable[[CheckedPayment], bool]] = None,
+                                query: Optional[Query] = None) -> Iterator[CheckedPayment]:
+    """
+    То же, что utils.get_latest_checked_payments, но через индекс:
+    при первом запуске индекс строится и сохраняется, при следующих —
+    используется (и дополняется, если в файл дописаны новые записи)
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param count: сколько последних платежей нужно вернуть
+    :param accept: дополнительная проверка платежа
+    :param query: условия отбора платежей
+    """
+    with open_index(path, parameters) as index:
+        return iter(index.latest(count, accept, query))
+
+
+def open_index(path: str, parameters: set) -> PaymentIndex:
+    """
+    Открывает сохранённый индекс файла операций. Если с момента
+    построения в файл только дописывались записи, индекс дополняется
+    разбором новых записей; если файл изменён иначе (или индекса нет),
+    индекс строится заново
+    """
+    index = load_index(path, parameters)
+    if index is not None:
+        # Файл не разбирается: в отчёт идут счётчики, сохранённые при построении
+        _report_counts(_read_counts(path + INDEX_SUFFIX), len(index))
+        return index
+
+    index = update_index(path, parameters)
+    if index is None:
+        index = build_index(path, parameters)
+    return index
+
+
+def load_index(path: str, parameters: set) -> Optional[PaymentIndex]:
+    """
+    Открывает сохранённый индекс, если он соответствует текущему
+    состоянию файла операций и набору обязательных характеристик,
+    иначе возвращает None
+    """
+    header = _read_header(path + INDEX_SUFFIX)
+    if header is None or header[:4] != _source_state(path, parameters):
+        return None
+
+    return _map_index(path)
+
+
+def update_index(path: str, parameters: set) -> Optional[PaymentIndex]:
+    """
+    Дополняет сохранённый индекс записями, дописанными в конец
+    файла операций после его построения. Разбирается только новая
+    часть файла, поэтому время работы зависит от объёма добавленных
+    записей, а не от размера всего файла.
+
+    Возвращает None, если индекса нет или файл был изменён не только
+    дописыванием в конец (усечён, перезаписан) — тогда нужно полное построение
+    """
+    saved = _read_header(path + INDEX_SUFFIX)
+    if saved is None:
+        return None
+
+    processed = saved[4]
+    state = _source_state(path, parameters)
+    if state[:2] != saved[:2] or state[2] < processed:
+        return None
+    # Уже разобранная часть файла не должна меняться: запись, исправленная
+    # на месте (та же длина, другое состояние), иначе осталась бы в индексе
+    prefix = _hash_file(path, processed)
+    if prefix.digest() != saved[5]:
+        return None
+
+    try:
+        keys, end, counts = _scan(path, parameters, processed)
+    except json.JSONDecodeError:
+        return None
+    counts.update(_read_counts(path + INDEX_SUFFIX))
+    header = (*_source_state(path, parameters), end, _hash_file(path, end, processed, prefix).digest())
+
+    index = _map_index(path)
+    if index is None:
+        return None
+
+    with index:
+        count = len(index)
+        # Новые записи позже всех старых (обычный случай для журнала операций):
+        # достаточно дописать их в конец индекса, иначе индекс сливается заново
+        append = not keys or not count or keys[0][0] > index.last_date()
+        old = None if append else index.entries()
+
+    if append:
+        _append_index(path + INDEX_SUFFIX, header, counts, count, _to_entries(keys))
+    else:
+        _save_index(path + INDEX_SUFFIX, header, counts, _to_entries(heapq.merge(_to_keys(old), keys)))
+
+    index = load_index(path, parameters)
+    if index is not None:
+        _report_counts(counts, len(index))
+    return index
+
+
+def build_index(path: str, parameters: set) -> PaymentIndex:
+    """
+    Строит индекс одним проходом по файлу операций и сохраняет его
+    рядом с файлом. Если сохранить не удалось (например, папка только
+    для чтения), индекс остаётся в памяти
+    """
+    before = os.stat(path)
+    keys, processed, counts = _scan(path, parameters)
+    entries = _to_entries(keys)
+    _report_counts(counts, len(keys))
+    del keys
+
+    # Если файл изменился во время построения, индекс не сохраняется
+    header = (*_source_state(path, parameters), processed, _hash_file(path, processed).digest())
+    if header[2:4] == (before.st_size, before.st_mtime_ns):
+        _save_index(path + INDEX_SUFFIX, header, counts, entries)
+
+    return PaymentIndex(path, memoryview(entries))
+
+
+def _scan(path: str, parameters: set, start: int = 0) -> tuple:
+    """
+    Разбирает файл операций (целиком или начиная сразу после записи,
+    которая заканчивается на смещении start) и возвращает отсортированные
+    ключи (дата в мкс, -смещение, длина) проверенных платежей, смещение
+    конца последней разобранной записи и счётчики COUNTS разобранной части
+    """
+    keys = []
+    processed = start
+    counts = Counter()
+    with open(path, "rb") as source:
+        source.seek(start)
+        items = iter_json_items(read_chunks(source), offsets=True, continued=start > 0)
+        for begin, end, pay in items:
+            processed = start + end
+            date = classify_payment(pay, parameters)
+            counts["read"] += 1
+            if type(date) is str:
+                counts[date] += 1
+            else:
+                # При равных датах раньше в обратном порядке должна идти более ранняя запись
+                keys.append((to_microseconds(date), -(start + begin), end - begin))
+    keys.sort()
+
+    return keys, processed, counts
+
+
+def _report_counts(counts: Counter, accepted: int) -> None:
+    """
+    Передаёт подключённому профилировщику счётчики разбора файла
+    (прочитано, отброшено по причинам) и количество платежей в индексе
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        return
+
+    if counts["read"]:
+        profiler.count("read", counts["read"])
+    for reason in COUNTS[1:]:
+        if counts[reason]:
+            profiler.reject(reason, counts[reason])
+    if accepted:
+        profiler.count("accepted", accepted)
+
+
+def _to_entries(keys) -> array:
+    entries = array("q")
+    for date, start, length in keys:
+        entries.extend((date, -start, length))
+    return entries
+
+
+def _to_keys(entries: array) -> Iterator[tuple]:
+    for number in range(0, len(entries), ENTRY_SIZE):
+        date, start, length = entries[number:number + ENTRY_SIZE]
+        yield date, -start, length
+
+
+def _map_index(path: str) -> Optional[PaymentIndex]:
+    try:
+        with open(path + INDEX_SUFFIX, "rb") as index_file:
+            buffer = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    count = HEADER.unpack_from(buffer)[-1] if len(buffer) >= HEADER.size else -1
+    if len(buffer) != HEADER.size + count * ENTRY_SIZE * 8:
+        buffer.close()
+        return None
+
+    entries = memoryview(buffer)[HEADER.size:].cast("q")
+    return PaymentIndex(path, entries, buffer)
+
+
+def _read_header(index_path: str) -> Optional[tuple]:
+    """
+    Читает заголовок сохранённого индекса: поля, описывающие
+    состояние файла операций (без счётчиков и количества записей)
+    """
+    fields = _read_fields(index_path)
+    return None if fields is None else fields[:SOURCE_FIELDS]
+
+
+def _read_counts(index_path: str) -> Counter:
+    """
+    Счётчики COUNTS из заголовка сохранённого индекса
+    """
+    fields = _read_fields(index_path)
+    if fields is None:
+        return Counter()
+    return Counter(dict(zip(COUNTS, fields[SOURCE_FIELDS:-1])))
+
+
+def _read_fields(index_path: str) -> Optional[tuple]:
+    try:
+        with open(index_path, "rb") as index_file:
+            data = index_file.read(HEADER.size)
+    except OSError:
+        return None
+
+    if len(data) != HEADER.size or not data.startswith(INDEX_MAGIC):
+        return None
+    return HEADER.unpack(data)
+
+
+def _save_index(index_path: str, header: tuple, counts: Counter, entries: array) -> None:
+    """
+    Атомарно записывает индекс: сначала во временный файл, затем переименовывает
+    """
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as index_file:
+            index_file.write(HEADER.pack(*header, *map(counts.__getitem__, COUNTS),
+                                         len(entries) // ENTRY_SIZE))
+            entries.tofile(index_file)
+        os.replace(temp_path, index_path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _append_index(index_path: str, header: tuple, counts: Counter, count: int,
+                  entries: array) -> None:
+    """
+    Дописывает записи в конец сохранённого индекса и обновляет заголовок.
+    Если запись прервётся, длина файла не совпадёт с заголовком
+    и индекс будет построен заново
+    """
+    try:
+        with open(index_path, "r+b") as index_file:
+            index_file.seek(HEADER.size + count * ENTRY_SIZE * 8)
+            entries.tofile(index_file)
+            index_file.truncate()
+            index_file.seek(0)
+            index_file.write(HEADER.pack(*header, *map(counts.__getitem__, COUNTS),
+                                         count + len(entries) // ENTRY_SIZE))
+    except OSError:
+        pass
+
+
+def _source_state(path: str, parameters: set) -> tuple:
+    """
+    Начало заголовка индекса для текущего состояния файла операций: метка
+    формата, хеш обязательных характеристик, размер и время изменения файла
+    """
+    stat = os.stat(path)
+    parameters_hash = hashlib.blake2b("\0".join(sorted(parameters)).encode(), digest_size=8)
+    return INDEX_MAGIC, parameters_hash.digest(), stat.st_size, stat.st_mtime_ns
+
+
+def _hash_file(path: str, stop: int, start: int = 0, digest=None):
+    """
+    Контрольная сумма содержимого файла [start, stop). Если передан digest
+    (сумма части [0, start)), он дополняется, и получается сумма [0, stop)
+    """
+    digest = hashlib.blake2b(digest_size=16) if digest is None else digest.copy()
+    with open(path, "rb") as source:
+        source.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = source.read(min(HASH_BLOCK, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+    return digest
@@ -0,0 +1,181 @@
+import codecs
+import json
+import re
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+CHUNK_SIZE = 1 << 20  # размер блока, который читается из файла за один раз (1 МиБ)
+MAX_ITEM_SIZE = 64 << 20  # запись длиннее (в символах) считается некорректной, а не оборванной блоком
+
+_decode = json.JSONDecoder().raw_decode
+_skip_whitespace = re.compile(r"[ \t\n\r]*").match
+_NUMBER_TAIL = "0123456789.eE+-"  # символы, которыми может продолжаться число
+
+# Состояния разбора массива верхнего уровня
+_START, _FIRST, _ITEM, _AFTER_ITEM, _END = range(5)
+
+
+def iter_json_array(path: str, chunk_size: int = CHUNK_SIZE, offsets: bool = False) -> Iterator:
+    """
+    Генератор, который по одному возвращает элементы JSON-массива
+    верхнего уровня из файла, не загружая весь документ в память.
+
+    Файл читается блоками по chunk_size байт, поэтому пиковое
+    потребление памяти зависит от размера блока и самой большой
+    записи, а не от размера файла.
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param chunk_size: размер блока чтения в байтах
+    :param offsets: возвращать кортежи (начало, конец, элемент), где начало
+    и конец — смещения элемента в файле в байтах
+    """
+    with open(path, "rb") as json_file:
+        yield from iter_json_items(read_chunks(json_file, chunk_size), offsets=offsets)
+
+
+def read_chunks(file: BinaryIO, chunk_size: int = CHUNK_SIZE,
+                limit: Optional[int] = None) -> Iterator[str]:
+    """
+    Читает бинарный файл блоками фиксированного размера
+    и декодирует их из UTF-8 (символ, разрезанный границей блока,
+    корректно склеивается со следующим блоком)
+
+    :param limit: сколько байт прочитать начиная с текущей позиции файла;
+    если не указано, файл читается до конца
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    while limit is None or limit > 0:
+        data = file.read(chunk_size if limit is None else min(chunk_size, limit))
+        if not data:
+            break
+        if limit is not None:
+            limit -= len(data)
+        text = decoder.decode(data)
+        if text:
+            yield text
+
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_items(chunks: Iterable[str], inside: bool = False, partial: bool = False,
+                    offsets: bool = False, continued: bool = False,
+                    max_item_size: int = MAX_ITEM_SIZE) -> Iterator:
+    """
+    Разбирает JSON-массив верхнего уровня, поступающий частями,
+    и по одному возвращает его элементы.
+
+    Следующий элемент не разбирается, пока не обработан предыдущий,
+    поэтому вызывающий код может отбросить запись до того, как
+    будет создана следующая.
+
+    Флаги inside и partial позволяют разбирать отдельный участок
+    массива (например, при разбиении файла на части по байтам).
+
+    :param chunks: части текста JSON-документа в порядке следования
+    :param inside: текст начинается с элемента массива, а не с "["
+    :param partial: текст может заканчиваться после "," без закрывающей "]"
+    :param offsets: возвращать кортежи (начало, конец, элемент), где начало
+    и конец — смещения элемента в байтах UTF-8 от начала текста
+    :param continued: текст начинается сразу после элемента массива
+    (дальше ожидается "," или "]")
+    :param max_item_size: сколько символов можно дочитать в поисках конца
+    элемента, который не разбирается; иначе из-за одной некорректной записи
+    в буфер дочитывался бы весь оставшийся файл
+    :raises json.JSONDecodeError: если документ не является корректным JSON-массивом
+    """
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    state = _AFTER_ITEM if continued else _ITEM if inside else _START
+    eof = False
+    # Смещение в байтах символа buffer[mark] (нужно только при offsets)
+    base = mark = 0
+
+    while True:
+        pos = _skip_whitespace(buffer, pos).end()
+
+        if pos == len(buffer):
+            if eof:
+                break
+            if offsets:
+                base += _byte_length(buffer, mark, pos)
+            buffer, pos, eof = _refill(chunks, buffer, pos)
+            mark = pos
+            continue
+
+        char = buffer[pos]
+
+        if state == _START:
+            if char != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            pos += 1
+            state = _FIRST
+
+        elif state == _END:
+            raise json.JSONDecodeError("Extra data", buffer, pos)
+
+        elif char == "]" and state in (_FIRST, _AFTER_ITEM):
+            pos += 1
+            state = _END
+
+        elif state == _AFTER_ITEM:
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+            pos += 1
+            state = _ITEM
+
+        else:
+            try:
+                item, end = _decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Запись могла оборваться на границе блока — дочитываем,
+                # пока она не длиннее max_item_size
+                if eof or len(buffer) - pos > max_item_size:
+                    raise
+                if offsets:
+                    base += _byte_length(buffer, mark, pos)
+                buffer, pos, eof = _refill(chunks, buffer, pos)
+                mark = pos
+                continue
+
+            # Число на границе блока может оказаться началом более длинного числа
+            if not eof and type(item) in (int, float) and buffer[end:end + 1] in _NUMBER_TAIL:
+                if offsets:
+                    base += _byte_length(buffer, mark, pos)
+                buffer, pos, eof = _refill(chunks, buffer, pos)
+                mark = pos
+                continue
+
+            if offsets:
+                start = base + _byte_length(buffer, mark, pos)
+                base, mark = start + _byte_length(buffer, pos, end), end
+                yield start, base, item
+            else:
+                yield item
+            pos = end
+            state = _AFTER_ITEM
+
+    if state != _END and not (partial and state == _ITEM):
+        raise json.JSONDecodeError("Unexpected end of JSON array", buffer, pos)
+
+
+def _byte_length(text: str, start: int, end: int) -> int:
+    """
+    Длина участка текста в байтах UTF-8
+    """
+    part = text[start:end]
+    return len(part) if part.isascii() else len(part.encode("utf-8"))
+
+
+def _refill(chunks: Iterator[str], buffer: str, pos: int) -> tuple:
+    """
+    Отбрасывает уже разобранную часть буфера и дописывает
+    следующую часть текста. Возвращает новый буфер, позицию
+    и признак конца данных
+    """
+    chunk = next(chunks, None)
+    if chunk is None:
+        return buffer, pos, True
+
+    return buffer[pos:] + chunk, 0, False
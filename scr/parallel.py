@@ -0,0 +1,184 @@
+import glob
+import heapq
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import attrgetter
+from typing import Callable, Iterator, Optional
+
+from scr.json_stream import CHUNK_SIZE, iter_json_array, iter_json_items, read_chunks
+from scr.utils import CheckedPayment, check_payments, select_latest
+
+MIN_SHARD_SIZE = 16 << 20   # файл меньше этого размера на части не делится (16 МиБ)
+WINDOW_SIZE = 64 << 10      # сколько байт читается при поиске начала записи
+
+_array_start = re.compile(rb"\s*\[\s*")
+# Начало записи: "{" после "," на уровне массива; граница проверяется при разборе
+_record_start = re.compile(rb",\s*(\{)")
+
+
+def get_payments_parallel(sources, parameters: set, count: Optional[int] = None,
+                          accept: Optional[Callable[[CheckedPayment], bool]] = None,
+                          workers: Optional[int] = None,
+                          min_shard_size: int = MIN_SHARD_SIZE) -> Iterator[CheckedPayment]:
+    """
+    Параллельный вариант get_payments / get_latest_checked_payments.
+
+    Источник делится на части: один JSON-файл — на диапазоны байт
+    по границам записей, папка или список файлов — по файлам.
+    Каждая часть проверяется и сортируется в отдельном процессе,
+    а родительский процесс сливает отсортированные результаты.
+    Порядок совпадает с последовательной обработкой (файлы списка
+    обрабатываются как один массив в порядке следования, файлы
+    папки — в порядке имён).
+
+    :param sources: путь к JSON-файлу, к папке с JSON-файлами, шаблон путей
+    или список путей (см. source_files)
+    :param parameters: обязательные характеристики платежа
+    :param count: сколько последних платежей вернуть; None — все платежи
+    :param accept: дополнительная проверка платежа (функция уровня модуля,
+    чтобы её можно было передать в другой процесс)
+    :param workers: количество процессов, по умолчанию — количество ядер
+    :param min_shard_size: минимальный размер части файла в байтах
+
+    :return: итератор CheckedPayment, отсортированный по дате в обратном порядке
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = make_shards(sources, workers, min_shard_size)
+
+    if len(shards) <= 1 or workers == 1:
+        runs = [_process_shard(shard, parameters, count, accept) for shard in shards]
+    else:
+        tasks = [(shard, parameters, count, accept) for shard in shards]
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            try:
+                runs = list(executor.map(_process_shard_task, tasks))
+            except json.JSONDecodeError:
+                # Граница части пришлась не на начало записи — обрабатываем источники целиком
+                whole = [(path, 0, None) for path in source_files(sources)]
+                runs = [_process_shard(shard, parameters, count, accept) for shard in whole]
+
+    # При равных датах раньше идёт платёж из более ранней части
+    merged = heapq.merge(*runs, key=attrgetter("date"), reverse=True)
+
+    return islice(merged, count)
+
+
+def make_shards(sources, parts: int, min_shard_size: int = MIN_SHARD_SIZE) -> list:
+    """
+    Делит источники на части вида (путь, начало, конец) в байтах.
+    Конец None означает «до конца файла»
+
+    :param sources: путь к JSON-файлу, к папке с JSON-файлами или список путей
+    :param parts: желаемое количество частей одного файла
+    :param min_shard_size: минимальный размер части в байтах
+    """
+    files = source_files(sources)
+    if len(files) != 1:
+        return [(path, 0, None) for path in files]
+
+    path = files[0]
+    parts = max(1, min(parts, os.path.getsize(path) // max(min_shard_size, 1)))
+    if parts == 1:
+        return [(path, 0, None)]
+
+    bounds = split_json_array(path, parts)
+    if not bounds:
+        return [(path, 0, None)]
+
+    return [(path, start, end) for start, end in zip(bounds, bounds[1:] + [None])]
+
+
+def split_json_array(path: str, parts: int) -> list:
+    """
+    Возвращает смещения (в байтах) начала записей JSON-массива,
+    примерно делящие файл на parts равных частей. Первое смещение —
+    начало первой записи; пустой список — если в массиве нет записей
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        head = file.read(WINDOW_SIZE)
+        match = _array_start.match(head)
+        if not match or head[match.end():match.end() + 1] in (b"]", b""):
+            return []
+
+        bounds = [match.end()]
+        for part in range(1, parts):
+            start = _find_record_start(file, max(size * part // parts, bounds[-1] + 1))
+            if start is None:
+                break
+            if start > bounds[-1]:
+                bounds.append(start)
+
+    return bounds
+
+
+def _find_record_start(file, position: int) -> Optional[int]:
+    """
+    Ищет ближайшее к position начало записи массива
+    """
+    while True:
+        file.seek(position)
+        window = file.read(WINDOW_SIZE)
+        match = _record_start.search(window)
+        if match:
+            return position + match.start(1)
+        if len(window) < WINDOW_SIZE:
+            return None
+        # Окна перекрываются, чтобы не пропустить разрезанный разделитель ", {"
+        position += WINDOW_SIZE - 64
+
+
+def source_files(sources) -> list:
+    """
+    Список файлов операций: путь к JSON-файлу, папка с JSON-файлами
+    (в порядке имён), шаблон вида "sources/*/operations_*.json"
+    (в порядке имён) или список путей (в порядке следования)
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        if os.path.isdir(sources):
+            return sorted(os.path.join(sources, name) for name in os.listdir(sources)
+                          if name.endswith(".json"))
+        if any(char in str(sources) for char in "*?["):
+            return sorted(glob.glob(str(sources)))
+        return [sources]
+
+    return list(sources)
+
+
+def _process_shard_task(task: tuple) -> list:
+    return _process_shard(*task)
+
+
+def _process_shard(shard: tuple, parameters: set, count: Optional[int],
+                   accept: Optional[Callable[[CheckedPayment], bool]]) -> list:
+    """
+    Проверяет платежи одной части и возвращает её отсортированный
+    результат: последние count платежей или все платежи
+    """
+    path, start, end = shard
+    if start == 0:
+        payments = iter_json_array(path)
+        return _select(payments, parameters, count, accept)
+
+    with open(path, "rb") as file:
+        file.seek(start)
+        limit = None if end is None else end - start
+        payments = iter_json_items(read_chunks(file, CHUNK_SIZE, limit),
+                                   inside=True, partial=end is not None)
+        return _select(payments, parameters, count, accept)
+
+
+def _select(payments, parameters: set, count: Optional[int],
+            accept: Optional[Callable[[CheckedPayment], bool]]) -> list:
+    checked = check_payments(payments, parameters)
+    if count is not None:
+        return select_latest(checked, count, accept)
+
+    if accept is not None:
+        checked = filter(accept, checked)
+    result = list(checked)
+    result.sort(reverse=True, key=attrgetter("date"))
+    return result
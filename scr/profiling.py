@@ -0,0 +1,126 @@
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
+PROFILE_ENV = "SHOW_PAYS_PROFILE"      # переменная окружения: json или prometheus
+PROFILE_FORMATS = ("json", "prometheus")
+METRICS_PREFIX = "show_pays"
+
+
+class Profiler:
+    """
+    Собирает замеры этапов обработки платежей: время выполнения этапа,
+    пик выделенной памяти (через tracemalloc), количество записей
+    (прочитано / отброшено по причинам / принято / выведено).
+
+    Профилировщик подключается через utils.set_profiler; пока он
+    не подключён, функции utils не делают лишней работы
+    """
+
+    def __init__(self, memory: bool = True) -> None:
+        """
+        :param memory: замерять ли пик выделенной памяти; tracemalloc
+        заметно замедляет работу, поэтому его можно отключить
+        """
+        self.__memory = memory
+        self.__seconds = {}
+        self.__peaks = {}
+        # Для каждого начатого этапа — пик памяти, сброшенный вложенными этапами
+        self.__reset_peaks = []
+        self.__counts = Counter()
+        self.__rejected = Counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Замеряет этап name; если этап выполняется несколько раз,
+        время суммируется, а пик памяти берётся наибольший. Этапы можно
+        вкладывать: пик внешнего этапа учитывает и память до вложенного
+        """
+        tracing = self.__memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.__memory:
+            # reset_peak сбрасывает и пик внешнего этапа: он сохраняется отдельно
+            if self.__reset_peaks:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.__reset_peaks[-1] = max(self.__reset_peaks[-1], peak)
+            tracemalloc.reset_peak()
+        if self.__memory:
+            self.__reset_peaks.append(0)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.__seconds[name] = self.__seconds.get(name, 0.0) + seconds
+            if self.__memory:
+                peak = max(tracemalloc.get_traced_memory()[1], self.__reset_peaks.pop())
+                self.__peaks[name] = max(self.__peaks.get(name, 0), peak)
+            if tracing:
+                tracemalloc.stop()
+
+    def count(self, name: str, number: int = 1) -> None:
+        """
+        Увеличивает счётчик записей name (read, accepted, displayed, ...)
+        """
+        self.__counts[name] += number
+
+    def reject(self, reason: str, number: int = 1) -> None:
+        """
+        Учитывает платежи, не прошедшие проверку, по причине reason
+        """
+        self.__rejected[reason] += number
+
+    def report(self) -> dict:
+        """
+        Возвращает собранные замеры в виде словаря
+        """
+        stages = {name: {"seconds": round(seconds, 6)} for name, seconds in self.__seconds.items()}
+        for name, peak in self.__peaks.items():
+            stages[name]["peak_bytes"] = peak
+
+        return {
+            "stages": stages,
+            "records": dict(self.__counts),
+            "rejected": dict(self.__rejected),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.report(), ensure_ascii=False, indent=2) + "\n"
+
+    def to_prometheus(self) -> str:
+        """
+        Возвращает замеры в текстовом формате Prometheus
+        """
+        report = self.report()
+        stages = report["stages"]
+        metrics = (
+            ("stage_seconds", "gauge", "Время выполнения этапа, секунды", "stage",
+             {name: stage["seconds"] for name, stage in stages.items()}),
+            ("stage_peak_bytes", "gauge", "Пик выделенной за этап памяти, байты", "stage",
+             {name: stage["peak_bytes"] for name, stage in stages.items() if "peak_bytes" in stage}),
+            ("records_total", "counter", "Количество записей", "kind", report["records"]),
+            ("rejected_total", "counter", "Платежи, не прошедшие проверку", "reason", report["rejected"]),
+        )
+
+        lines = []
+        for name, kind, description, label, values in metrics:
+            name = f"{METRICS_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f'{name}{{{label}="{key}"}} {value}' for key, value in values.items())
+
+        return "\n".join(lines) + "\n"
+
+    def dump(self, output_format: str = "json") -> str:
+        """
+        Возвращает замеры в формате output_format (json или prometheus)
+        """
+        if output_format not in PROFILE_FORMATS:
+            raise ValueError(f"Неизвестный формат отчёта: {output_format}")
+        return self.to_json() if output_format == "json" else self.to_prometheus()
@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+from class_payment.amount import to_minor
+from scr.utils import CheckedPayment
+
+
+class Query(NamedTuple):
+    """
+    Условия отбора платежей. Незаданные (None) условия не проверяются.
+
+    Условия проверяются на словаре платежа сразу после check_payment,
+    до создания объекта Payment, а диапазон дат с индексом (scr.index)
+    позволяет вовсе не читать платежи вне диапазона
+
+    date_from, date_to: диапазон дат [date_from, date_to)
+    currency: код или название валюты ("USD", "RUB", "руб.")
+    description: описание платежа целиком ("Перевод организации")
+    from_account, to_account: номер карты/счёта или строка целиком ("Счет 6468...")
+    amount_min, amount_max: диапазон сумм [amount_min, amount_max] в копейках/центах
+    """
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    currency: Optional[str] = None
+    description: Optional[str] = None
+    from_account: Optional[str] = None
+    to_account: Optional[str] = None
+    amount_min: Optional[int] = None
+    amount_max: Optional[int] = None
+
+    def matches(self, checked: CheckedPayment) -> bool:
+        """
+        Проверяет, подходит ли проверенный платёж под все условия
+        """
+        return self.predicate()(checked)
+
+    def predicate(self) -> Callable[[CheckedPayment], bool]:
+        """
+        Возвращает функцию проверки, в которой проверяются
+        только заданные условия (для потоковой обработки)
+        """
+        checks = []
+        if self.date_from is not None:
+            checks.append(lambda checked, date_from=self.date_from: checked.date >= date_from)
+        if self.date_to is not None:
+            checks.append(lambda checked, date_to=self.date_to: checked.date < date_to)
+        if self.currency is not None:
+            checks.append(lambda checked, currency=self.currency: _same_currency(checked.pay, currency))
+        if self.description is not None:
+            checks.append(lambda checked, description=self.description:
+                          checked.pay.get("description") == description)
+        if self.from_account is not None:
+            checks.append(lambda checked, account=self.from_account:
+                          _same_account(checked.pay.get("from"), account))
+        if self.to_account is not None:
+            checks.append(lambda checked, account=self.to_account:
+                          _same_account(checked.pay.get("to"), account))
+        if self.amount_min is not None or self.amount_max is not None:
+            checks.append(self.__amount_check())
+
+        if not checks:
+            return lambda checked: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda checked: all(check(checked) for check in checks)
+
+    @property
+    def empty(self) -> bool:
+        return all(value is None for value in self)
+
+    def __amount_check(self) -> Callable[[CheckedPayment], bool]:
+        amount_min, amount_max = self.amount_min, self.amount_max
+
+        def check(checked: CheckedPayment) -> bool:
+            amount = _amount(checked.pay)
+            if amount is None:
+                return False
+            if amount_min is not None and amount < amount_min:
+                return False
+            return amount_max is None or amount <= amount_max
+
+        return check
+
+
+def combine(query: Optional[Query],
+            accept: Optional[Callable[[CheckedPayment], bool]]) -> Optional[Callable[[CheckedPayment], bool]]:
+    """
+    Объединяет условия запроса и дополнительную проверку accept в одну
+    проверку (условия запроса дешевле и проверяются первыми)
+    """
+    if query is None or query.empty:
+        return accept
+
+    matches = query.predicate()
+    if accept is None:
+        return matches
+    return lambda checked: matches(checked) and accept(checked)
+
+
+def _same_currency(pay: dict, code: str) -> bool:
+    amount = pay.get("operationAmount")
+    if type(amount) is dict:
+        currency = amount.get("currency")
+        if type(currency) is dict:
+            return currency.get("code") == code or currency.get("name") == code
+    return False
+
+
+def _amount(pay: dict) -> Optional[int]:
+    amount = pay.get("operationAmount")
+    if type(amount) is dict:
+        return to_minor(amount.get("amount"))
+    return None
+
+
+def _same_account(value, account: str) -> bool:
+    """
+    Совпадает ли поле отправителя/получателя с номером или строкой account
+    """
+    if type(value) is not str:
+        return False
+    return value == account or value.rsplit(" ", 1)[-1] == account
@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from operator import attrgetter
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from class_payment.amount import to_minor
+from scr.json_stream import iter_json_array
+from scr.query import Query
+from scr.utils import check_payments
+from scr.validation import complete_payment
+
+HOST = "127.0.0.1"
+PORT = 8765
+COUNT = 5               # сколько платежей возвращается, если count не указан
+MAX_COUNT = 10000       # сколько платежей можно запросить за один раз
+WATCH_INTERVAL = 1.0    # как часто проверяется, не изменился ли файл операций (секунды)
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+class Snapshot(NamedTuple):
+    """
+    Загруженное состояние файла операций: проверенные платежи
+    по возрастанию даты (при равных датах — в обратном порядке файла),
+    их даты для двоичного поиска и платежи, заранее закодированные в JSON
+    """
+    stat: tuple
+    payments: list
+    dates: list
+    encoded: list
+
+
+class PaymentStore:
+    """
+    Платежи файла операций в памяти для ответов службы.
+
+    Файл разбирается и проверяется один раз; платежи без характеристик,
+    нужных для вывода на экран, отбрасываются сразу. Состояние хранится
+    в неизменяемом Snapshot и при изменении файла заменяется целиком,
+    поэтому запросы читают его без блокировок
+    """
+
+    def __init__(self, path: str, parameters: set) -> None:
+        self.__path = path
+        self.__parameters = parameters
+        self.__lock = threading.Lock()
+        self.__snapshot = self.__load(_stat(path))
+
+    def __len__(self) -> int:
+        return len(self.__snapshot.payments)
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает файл операций, если он изменился (размер или время
+        изменения). Возвращает True, если состояние обновлено
+        """
+        with self.__lock:
+            stat = _stat(self.__path)
+            if stat == self.__snapshot.stat:
+                return False
+            self.__snapshot = self.__load(stat)
+            return True
+
+    def latest(self, count: int = COUNT, query: Optional[Query] = None) -> list:
+        """
+        count последних платежей, подходящих под условия query,
+        в виде строк JSON (словари платежей из файла операций)
+        """
+        snapshot = self.__snapshot
+        start, stop = 0, len(snapshot.dates)
+        if query is not None and query.date_from is not None:
+            start = bisect_left(snapshot.dates, query.date_from)
+        if query is not None and query.date_to is not None:
+            stop = bisect_left(snapshot.dates, query.date_to)
+
+        if query is None or query.empty or _only_dates(query):
+            return snapshot.encoded[max(stop - count, start):stop][::-1]
+
+        matches = query.predicate()
+        result = []
+        for number in range(stop - 1, start - 1, -1):
+            if matches(snapshot.payments[number]):
+                result.append(snapshot.encoded[number])
+                if len(result) >= count:
+                    break
+        return result
+
+    def __load(self, stat: tuple) -> Snapshot:
+        payments = [checked for checked in check_payments(iter_json_array(self.__path), self.__parameters)
+                    if type(complete_payment(*checked)) is not str]
+        # Обратный порядок по убыванию даты: при чтении с конца
+        # равные даты идут в порядке файла, как в get_payments
+        payments.sort(reverse=True, key=attrgetter("date"))
+        payments.reverse()
+
+        return Snapshot(stat, payments, [checked.date for checked in payments],
+                        [_encode(checked.pay) for checked in payments])
+
+
+class PaymentHandler(BaseHTTPRequestHandler):
+    """
+    GET /payments?count=5&currency=USD&date_from=2019-01-01 — последние
+    платежи (условия — поля Query, суммы в рублях/долларах: 100.50);
+    GET /health — количество загруженных платежей
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело ответа пишутся отдельно: без этого при постоянном
+    # соединении каждый ответ ждёт подтверждения TCP (десятки миллисекунд)
+    disable_nagle_algorithm = True
+    server: "PaymentServer"
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/payments":
+            try:
+                count, query = parse_request(url.query)
+            except ValueError as error:
+                self.__send(400, _encode({"error": str(error)}))
+                return
+            payments = self.server.store.latest(count, query)
+            self.__send(200, "[" + ",".join(payments) + "]")
+        elif url.path == "/health":
+            self.__send(200, _encode({"payments": len(self.server.store)}))
+        else:
+            self.__send(404, _encode({"error": "not found"}))
+
+    def log_message(self, format: str, *args) -> None:
+        # Журнал каждого запроса замедляет ответы при частом опросе
+        pass
+
+    def __send(self, status: int, body: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class PaymentServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер с хранилищем платежей и потоком, который следит
+    за изменениями файла операций
+    """
+
+    daemon_threads = True
+
+    def __init__(self, store: PaymentStore, address: tuple = (HOST, PORT),
+                 interval: float = WATCH_INTERVAL) -> None:
+        super().__init__(address, PaymentHandler)
+        self.store = store
+        self.__stop = threading.Event()
+        self.__watcher = threading.Thread(target=self.__watch, args=(interval,), daemon=True)
+        self.__watcher.start()
+
+    def server_close(self) -> None:
+        self.__stop.set()
+        super().server_close()
+
+    def __watch(self, interval: float) -> None:
+        while not self.__stop.wait(interval):
+            try:
+                self.store.refresh()
+            except (OSError, ValueError):
+                # Файл заменяется или записан не полностью — остаются прежние
+                # данные, попробуем при следующей проверке
+                pass
+
+
+def serve(path: str, parameters: set, host: str = HOST, port: int = PORT,
+          interval: float = WATCH_INTERVAL) -> None:
+    """
+    Загружает файл операций и отвечает на запросы, пока процесс не остановят
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param host: адрес, на котором принимаются запросы
+    :param port: порт
+    :param interval: как часто проверять изменения файла (секунды)
+    """
+    with PaymentServer(PaymentStore(path, parameters), (host, port), interval) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def parse_request(query_string: str) -> tuple:
+    """
+    Количество платежей и условия отбора из строки запроса
+
+    :raises ValueError: если значение некорректно или условие неизвестно,
+    дата указана с часовым поясом (даты платежей без пояса) или сумма слишком велика
+    """
+    values = {}
+    for name, items in parse_qs(query_string, strict_parsing=False).items():
+        values[name] = items[-1]
+
+    count = int(values.pop("count", COUNT))
+    if not 0 <= count <= MAX_COUNT:
+        raise ValueError(f"count должен быть от 0 до {MAX_COUNT}")
+
+    unknown = set(values) - set(Query._fields)
+    if unknown:
+        raise ValueError(f"Неизвестные условия: {', '.join(sorted(unknown))}")
+
+    for name in ("date_from", "date_to"):
+        if name in values:
+            date = datetime.fromisoformat(values[name])
+            if date.tzinfo is not None:
+                raise ValueError(f"Дата должна быть без часового пояса: {values[name]}")
+            values[name] = date
+    for name in ("amount_min", "amount_max"):
+        if name in values:
+            try:
+                minor = to_minor(values[name])
+            except ArithmeticError:
+                minor = None
+            if minor is None:
+                raise ValueError(f"Некорректная сумма: {values[name]}")
+            values[name] = minor
+
+    return count, Query(**values)
+
+
+def _only_dates(query: Query) -> bool:
+    return all(value is None for name, value in zip(Query._fields, query)
+               if name not in ("date_from", "date_to"))
+
+
+def _stat(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
@@ -1,8 +1,53 @@
-import json
+import heapq
+from class_payment.lazy import LazyPayment
 from class_payment.payment import Payment
+from scr.json_stream import iter_json_array
+# Правила проверки платежа и причины отказа (REJECT_*) — в scr.validation
+from scr.validation import (REJECT_BAD_DATE, REJECT_EMPTY_FIELDS, REJECT_MISSING_FIELDS,
+                            REJECT_NO_STATE, REJECT_NOT_EXECUTED, classify_payment, parse_date)
 from datetime import datetime
-from typing import Iterator
+from itertools import islice
+from operator import attrgetter, itemgetter
+from contextlib import nullcontext
+from typing import (TYPE_CHECKING, Callable, ContextManager, Iterable, Iterator, NamedTuple,
+                    Optional, TextIO)
 import os
+import sys
+
+if TYPE_CHECKING:
+    from scr.profiling import Profiler
+    from scr.query import Query
+
+# Шаблоны скрытия номеров по количеству цифр: карта (16) — видны первые 6
+# и последние 4 цифры, блоки по 4 цифры; счёт (20) — видны последние 4 цифры
+HIDE_MASKS = {
+    16: lambda number: f"{number[:4]} {number[4:6]}** **** {number[12:]}",
+    20: lambda number: f"**{number[16:]}",
+}
+HIDE_BYTES_MASKS = {
+    16: lambda number: b"%b %b** **** %b" % (number[:4], number[4:6], number[12:]),
+    20: lambda number: b"**" + number[16:],
+}
+
+CACHE_SUFFIX = ".paycache"  # файлы двоичного колоночного кэша операций (scr.cache)
+
+SHOW_CHUNK_SIZE = 1024  # сколько платежей show_payments записывает за один раз
+
+# Шаблоны вывода платежа (дата и описание, отправитель, получатель, сумма):
+# с выделением цветом (ANSI) и без него
+PAYMENT_FORMATS = {
+    True: ("\033[31m{}\033[0m.{} {}\n",
+           "{} \033[34m{} \033[0m-\033[33m>\033[0m ",
+           "{} \033[34m{}\n",
+           "\033[31m{}\033[0m {}\n\n"),
+    False: ("{}.{} {}\n",
+            "{} {} -> ",
+            "{} {}\n",
+            "{} {}\n\n"),
+}
+
+# Подключённый профилировщик (scr.profiling.Profiler); None — профилирование выключено
+_profiler = None
 
 
 def get_path_to_file(name_file: str, *dirs: str) -> str:
@@ -20,7 +65,21 @@ def get_path_to_file(name_file: str, *dirs: str) -> str:
     return path_to_file
 
 
-def get_payments(path: str, parameters: set) -> Iterator[dict]:
+class CheckedPayment(NamedTuple):
+    """
+    Словарь платежа, прошедший проверку check_payment,
+    вместе с датой, разобранной при проверке.
+
+    Дата разбирается один раз и дальше используется
+    и для сортировки, и для создания объекта Payment
+    """
+    pay: dict
+    date: datetime
+
+
+def get_payments(path: str, parameters: set, query: Optional["Query"] = None,
+                 run_size: Optional[int] = None, backend: Optional[str] = None,
+                 dedup: Optional[str] = None) -> Iterator[dict]:
     """
     Функция фильтрует и сортирует по дате в обратном порядке
     релевантные для нас значения из списка словарей с информацией
@@ -28,18 +87,187 @@ def get_payments(path: str, parameters: set) -> Iterator[dict]:
 
     :param path: путь к JSON-файлу, содержащему список словарей
     :param parameters: обязательные характеристики платежа
+    :param query: условия отбора платежей (scr.query.Query); проверяются
+    во время разбора, до сортировки
+    :param run_size: внешняя сортировка (scr.external_sort) сериями
+    по run_size платежей для файлов, которые не помещаются в память;
+    None — все платежи сортируются в памяти
+    :param backend: библиотека разбора JSON (scr.decoder: "orjson", "msgspec"
+    или "json"); None — потоковый разбор стандартным json
+    :param dedup: из платежей с одинаковым id, прошедших все проверки и условия,
+    оставить первый в файле ("first") или самый поздний ("latest"), см. scr.dedup;
+    None — оставить все
 
     :return: итератор на основе отсортированного списка словарей платежа
+    :raises ValueError: если политика dedup неизвестна
     """
-    with open(path, "rt", encoding="utf-8") as json_file:
-        payments = json.load(json_file)
+    if dedup is not None:
+        from scr.dedup import check_policy, unique
+        check_policy(dedup)
+
+    if path.endswith(CACHE_SUFFIX):
+        # Двоичный колоночный кэш (см. scr.cache) уже отсортирован и проверен
+        if dedup == "first":
+            raise ValueError("В кэше не сохранён порядок файла операций: dedup=\"first\" недоступен")
+        from scr.cache import iter_cache_dicts
+        payments = iter_cache_dicts(path, parameters)
+        if query is not None and not query.empty:
+            matches = query.predicate()
+            payments = (pay for pay in payments if matches(CheckedPayment(pay, parse_date(pay["date"]))))
+        if dedup == "latest":
+            payments = unique(payments, key=itemgetter("id"))
+        return payments
+
+    if backend is None:
+        # Записи разбираются по одной, отброшенные сразу освобождают память
+        payments = iter_json_array(path)
+    else:
+        from scr.decoder import load_records
+        payments = load_records(path, backend)
+
+    successful_payments = check_payments(payments, parameters)
+    if query is not None and not query.empty:
+        successful_payments = filter(query.predicate(), successful_payments)
+    if dedup == "first":
+        successful_payments = unique(successful_payments)
+
+    if run_size is not None:
+        from scr.external_sort import sort_external
+        successful_payments = sort_external(successful_payments, run_size)
+    else:
+        successful_payments = list(successful_payments)
+        successful_payments.sort(reverse=True, key=attrgetter("date"))
+
+    # В отсортированном потоке первым из повторов идёт самый поздний платёж
+    if dedup == "latest":
+        successful_payments = unique(successful_payments)
+
+    latest_payments = map(attrgetter("pay"), successful_payments)
 
-    successful_payments = [pay for pay in payments if check_payment(pay, parameters)]
-    successful_payments.sort(reverse=True, key=reformat_date)
+    return latest_payments
 
-    latest_payments = iter(successful_payments)
 
-    return latest_payments
+def get_latest_payments(path: str, parameters: set, count: int,
+                        accept: Optional[Callable[[dict], bool]] = None,
+                        query: Optional["Query"] = None, dedup: Optional[str] = None) -> Iterator[dict]:
+    """
+    Потоковый вариант get_payments: возвращает только count самых
+    поздних платежей, не сортируя весь список.
+
+    Порядок результата совпадает с первыми count элементами
+    итератора get_payments.
+
+    :param path: путь к JSON-файлу, содержащему список словарей
+    :param parameters: обязательные характеристики платежа
+    :param count: сколько последних платежей нужно вернуть
+    :param accept: дополнительная (более дорогая) проверка платежа;
+    вызывается только для платежей, которые могут попасть в результат
+    :param query: условия отбора платежей (scr.query.Query)
+    :param dedup: политика удаления повторов id, как в get_payments
+
+    :return: итератор на основе отсортированного списка словарей платежа
+    """
+    accept_checked = (lambda checked: accept(checked.pay)) if accept else None
+    latest = get_latest_checked_payments(path, parameters, count, accept_checked, query, dedup)
+
+    return map(attrgetter("pay"), latest)
+
+
+def get_latest_checked_payments(path: str, parameters: set, count: int,
+                                accept: Optional[Callable[[CheckedPayment], bool]] = None,
+                                query: Optional["Query"] = None,
+                                dedup: Optional[str] = None) -> Iterator[CheckedPayment]:
+    """
+    То же, что get_latest_payments, но возвращает платежи вместе
+    с уже разобранной датой, чтобы не разбирать её повторно.
+
+    :param accept: дополнительная проверка, получает CheckedPayment
+    """
+    if query is not None and not query.empty:
+        from scr.query import combine
+        accept = combine(query, accept)
+
+    payments = check_payments(iter_json_array(path), parameters)
+    if dedup is None:
+        latest = select_latest(payments, count, accept)
+    else:
+        from scr.dedup import check_policy, select_latest_unique, unique
+        check_policy(dedup)
+        if dedup == "first":
+            # Повторы ищутся среди платежей, прошедших все проверки, как в get_payments,
+            # поэтому accept здесь вызывается для каждого платежа
+            if accept is not None:
+                payments = filter(accept, payments)
+            latest = select_latest(unique(payments), count)
+        else:
+            latest = select_latest_unique(payments, count, accept)
+
+    return iter(latest)
+
+
+def select_latest(payments: Iterable[CheckedPayment], count: int,
+                  accept: Optional[Callable[[CheckedPayment], bool]] = None) -> list:
+    """
+    Выбирает count самых поздних платежей из потока проверенных платежей.
+
+    Платежи попадают в ограниченную min-кучу из count элементов,
+    поэтому время работы O(n log count), а память O(count).
+    При равных датах раньше идёт платёж, который встретился
+    в потоке раньше, как при стабильной сортировке.
+
+    :param payments: проверенные платежи в порядке следования в файле
+    :param count: сколько последних платежей нужно вернуть
+    :param accept: дополнительная проверка; вызывается только для платежей,
+    которые могут попасть в результат
+
+    :return: список CheckedPayment, отсортированный по дате в обратном порядке
+    """
+    latest = []
+    if count > 0:
+        for index, checked in enumerate(payments):
+            # Ключ (дата, -номер): при равных датах «больше» тот платёж,
+            # который встретился в файле раньше
+            key = (checked.date, -index)
+            if len(latest) == count and key <= latest[0][0]:
+                continue
+            if accept is not None and not accept(checked):
+                continue
+
+            if len(latest) < count:
+                heapq.heappush(latest, (key, checked))
+            else:
+                heapq.heapreplace(latest, (key, checked))
+
+    latest.sort(reverse=True, key=itemgetter(0))
+
+    return [checked for _, checked in latest]
+
+
+def check_payments(payments: Iterable[dict], parameters: set) -> Iterator[CheckedPayment]:
+    """
+    Генератор проверенных платежей: пропускает платежи,
+    не прошедшие check_payment, и сохраняет разобранную дату
+    для остальных
+
+    :param payments: словари с информацией о платежах
+    :param parameters: обязательные характеристики платежа
+    """
+    profiler = _profiler
+    if profiler is None:
+        for pay in payments:
+            date = validate_payment(pay, parameters)
+            if date is not None:
+                yield CheckedPayment(pay, date)
+        return
+
+    for pay in payments:
+        date = classify_payment(pay, parameters)
+        profiler.count("read")
+        if type(date) is str:
+            profiler.reject(date)
+        else:
+            profiler.count("accepted")
+            yield CheckedPayment(pay, date)
 
 
 def check_payment(pay: dict, parameters: set) -> bool:
@@ -54,19 +282,67 @@ def check_payment(pay: dict, parameters: set) -> bool:
     :param pay: словарь, содержащий информацию о платеже
     :param parameters: обязательные характеристики платежа
     """
-    state = pay.get("state")
-    if not state:
-        return False
-    if state.lower() != "executed":
-        return False
-    elif not parameters.issubset(set(pay.keys())):
-        return False
-    elif not all(pay.values()):
-        return False
-    elif not check_date(pay.get("date")):
-        return False
+    return validate_payment(pay, parameters) is not None
+
+
+def validate_payment(pay: dict, parameters: set) -> Optional[datetime]:
+    """
+    Выполняет проверки check_payment и возвращает дату платежа
+    в формате datetime, если платёж подходит, иначе None
+
+    :param pay: словарь, содержащий информацию о платеже
+    :param parameters: обязательные характеристики платежа
+    """
+    date = classify_payment(pay, parameters)
+    return date if type(date) is datetime else None
 
-    return True
+
+def rejection_reason(pay: dict, parameters: set) -> Optional[str]:
+    """
+    Возвращает причину, по которой платёж не проходит check_payment
+    (одну из констант REJECT_*), или None, если платёж подходит
+
+    :param pay: словарь, содержащий информацию о платеже
+    :param parameters: обязательные характеристики платежа
+    """
+    reason = classify_payment(pay, parameters)
+    return reason if type(reason) is str else None
+
+
+def set_profiler(profiler: Optional["Profiler"]) -> Optional["Profiler"]:
+    """
+    Подключает профилировщик, который получает замеры этапов
+    и счётчики записей; None отключает профилирование.
+    Возвращает ранее подключённый профилировщик
+    """
+    global _profiler
+    previous, _profiler = _profiler, profiler
+    return previous
+
+
+def get_profiler() -> Optional["Profiler"]:
+    """
+    Возвращает подключённый профилировщик или None
+    """
+    return _profiler
+
+
+def profile_stage(name: str) -> ContextManager:
+    """
+    Контекстный менеджер для замера этапа name подключённым
+    профилировщиком; без профилировщика ничего не делает
+    """
+    if _profiler is None:
+        return nullcontext()
+    return _profiler.stage(name)
+
+
+def count_records(name: str, number: int = 1) -> None:
+    """
+    Увеличивает счётчик записей name подключённого профилировщика
+    """
+    if _profiler is not None:
+        _profiler.count(name, number)
 
 
 def check_date(date: str) -> bool:
@@ -74,17 +350,7 @@ def check_date(date: str) -> bool:
     Проверяет корректность формата даты и
     её соответствие принятой форме записи
     """
-    if type(date) is not str:
-        return False
-    if len(date.split("T")) != 2:
-        return False
-
-    try:
-        datetime.fromisoformat(date.replace("T", " "))
-    except ValueError:
-        return False
-
-    return True
+    return parse_date(date) is not None
 
 
 def reformat_date(pay: dict) -> datetime:
@@ -102,15 +368,24 @@ def reformat_date(pay: dict) -> datetime:
     return date
 
 
-def create_payment(pay: dict) -> Payment:
+def create_payment(pay: dict, date: Optional[datetime] = None, lazy: bool = False) -> Payment:
     """
     Создает и возвращает объект класса Payment, установив атрибуты
     в соответствии с подходящими ключами передаваемого словаря.
+
+    :param pay: словарь, содержащий информацию о платеже
+    :param date: уже разобранная дата платежа (например, CheckedPayment.date);
+    если не передана, дата берётся из словаря
+    :param lazy: вернуть LazyPayment, который разбирает характеристики
+    только при первом обращении к ним
     """
+    if lazy:
+        return LazyPayment(pay, date)
+
     payment = Payment()
     payment.id_pay = pay.get("id")
     payment.state_pay = pay.get("state")
-    payment.date_pay = pay.get("date")
+    payment.date_pay = pay.get("date") if date is None else date
     payment.operation_amount_pay = pay.get("operationAmount")
     payment.description_pay = pay.get("description")
     payment.from_pay = pay.get("from")
@@ -123,38 +398,91 @@ def show_payment(pay: Payment) -> None:
     """
     Выводит информацию о платеже на экран в требуемом виде
     """
+    sys.stdout.write(format_payment(pay))
+
+
+def show_payments(payments: Iterable[Payment], colour: Optional[bool] = None,
+                  file: Optional[TextIO] = None, chunk_size: int = SHOW_CHUNK_SIZE) -> None:
+    """
+    Выводит информацию о многих платежах: платежи форматируются
+    пачками по chunk_size штук, и каждая пачка записывается
+    одним вызовом write. Вывод с цветом совпадает побайтно
+    с последовательными вызовами show_payment.
+
+    :param payments: платежи для вывода
+    :param colour: выделять ли части вывода цветом (ANSI); по умолчанию —
+    только если вывод идёт в терминал
+    :param file: куда выводить, по умолчанию sys.stdout
+    :param chunk_size: сколько платежей записывать за один раз
+    """
+    file = sys.stdout if file is None else file
+    if colour is None:
+        colour = file.isatty()
+
+    payments = iter(payments)
+    while True:
+        chunk = [format_payment(pay, colour) for pay in islice(payments, chunk_size)]
+        if not chunk:
+            break
+        file.write("".join(chunk))
+
+
+def format_payment(pay: Payment, colour: bool = True) -> str:
+    """
+    Возвращает информацию о платеже в требуемом виде одной строкой
+    (вместе с завершающей пустой строкой)
+
+    :param pay: платёж
+    :param colour: выделять ли части вывода цветом (ANSI)
+    """
+    head, source, target, amount = PAYMENT_FORMATS[colour]
     date = pay.date_pay
-    date_format = date.strftime("%d.%m.%Y")
-    red_date, white_date = date_format.rsplit('.', 1)
-    description = pay.description_pay
     pay_from = pay.from_pay
     pay_to = pay.to_pay
     operation_amount = pay.operation_amount_pay
 
-    print(f"\033[31m{red_date}\033[0m.{white_date} {description}")
+    text = head.format(f"{date.day:02}.{date.month:02}", date.year, pay.description_pay)
     if pay_from:
-        print(f"{pay_from[0]} \033[34m{hide(pay_from[1])} "
-              f"\033[0m-\033[33m>\033[0m", end=" ")
-    print(f"{pay_to[0]} \033[34m{hide(pay_to[1])}")
-    print(f"\033[31m{operation_amount[0]}\033[0m {operation_amount[1]}")
-    print()
+        text += source.format(pay_from[0], hide(pay_from[1]))
+    text += target.format(pay_to[0], hide(pay_to[1]))
+    text += amount.format(operation_amount[0], operation_amount[1])
+
+    return text
 
 
 def hide(number: str) -> str:
     """
     Скрывает определённую часть номера карты или счёта символом "*"
     """
-    card_digits = 16
-    bank_account_digits = 20
     if type(number) is str:
-        if len(number) == card_digits:
-            hide_start = 6
-            hide_end = 12
-            hidden_simbols = hide_end - hide_start
-            number_hide = number[:hide_start] + "*" * hidden_simbols + number[hide_end:]
-            number_sep = [number_hide[i:i+4] for i in range(0, len(number), 4)]
+        mask = HIDE_MASKS.get(len(number))
+        if mask is not None:
+            return mask(number)
+
 
-            return " ".join(number_sep)
+def hide_numbers(numbers: Iterable) -> list:
+    """
+    Скрывает части сразу многих номеров карт и счетов.
 
-        elif len(number) == bank_account_digits:
-            return number.replace(number[:-4], "**")
\ No newline at end of file
+    Для каждой длины номера (16 — карта, 20 — счёт) используется
+    заранее подготовленный шаблон. Номера можно передавать строками
+    или байтами (например, b"5999414228426353"); результат — строки,
+    такие же, как у hide, или None для номеров неподходящей длины
+
+    :param numbers: номера карт и счетов
+    """
+    masks = HIDE_MASKS
+    bytes_masks = HIDE_BYTES_MASKS
+    hidden = []
+    for number in numbers:
+        kind = type(number)
+        if kind is str:
+            mask = masks.get(len(number))
+            hidden.append(None if mask is None else mask(number))
+        elif kind is bytes:
+            mask = bytes_masks.get(len(number))
+            hidden.append(None if mask is None else mask(number).decode("ascii"))
+        else:
+            hidden.append(None)
+
+    return hidden
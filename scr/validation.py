@@ -0,0 +1,194 @@
+from class_payment.payment import Payment
+from collections import Counter
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from scr.utils import CheckedPayment
+
+# Правила проверки платежа собраны в этом модуле: utils.classify_payment
+# (check_payment) и columns.validate_columns (те же проверки над колонками)
+# используют одни и те же правила. Модуль не импортирует scr.utils
+# при загрузке, поэтому utils импортирует правила отсюда
+
+# Причины, по которым платёж не проходит check_payment
+REJECT_NO_STATE = "no_state"
+REJECT_NOT_EXECUTED = "not_executed"
+REJECT_MISSING_FIELDS = "missing_fields"
+REJECT_EMPTY_FIELDS = "empty_fields"
+REJECT_BAD_DATE = "bad_date"
+
+# Причины, по которым из прошедшего check_payment словаря не получается
+# платёж со всеми характеристиками, нужными для вывода на экран
+REJECT_BAD_ID = "bad_id"
+REJECT_BAD_AMOUNT = "bad_amount"
+REJECT_BAD_DESCRIPTION = "bad_description"
+REJECT_BAD_TO = "bad_to"
+
+
+def classify_payment(pay: dict, parameters: set) -> datetime | str:
+    """
+    Выполняет проверки check_payment за один проход и возвращает
+    либо разобранную дату платежа (платёж подходит), либо причину,
+    по которой он не подходит (одну из констант REJECT_*)
+
+    :param pay: словарь, содержащий информацию о платеже
+    :param parameters: обязательные характеристики платежа
+    """
+    state = pay.get("state")
+    if not state:
+        return REJECT_NO_STATE
+    if not is_executed(state):
+        return REJECT_NOT_EXECUTED
+    elif not has_fields(pay.keys(), parameters):
+        return REJECT_MISSING_FIELDS
+    elif not is_filled(pay.values()):
+        return REJECT_EMPTY_FIELDS
+
+    date = parse_date(pay.get("date"))
+    return REJECT_BAD_DATE if date is None else date
+
+
+def is_executed(state) -> bool:
+    """
+    Был ли платёж успешным ("state": "executed")
+    """
+    return type(state) is str and state.lower() == "executed"
+
+
+def has_fields(keys: Iterable[str], parameters: set) -> bool:
+    """
+    Есть ли среди ключей платежа все обязательные характеристики
+    """
+    return parameters.issubset(keys)
+
+
+def is_filled(values: Iterable) -> bool:
+    """
+    Все ли характеристики платежа непустые
+    """
+    return all(values)
+
+
+def parse_date(date: str) -> Optional[datetime]:
+    """
+    Приводит строку с датой к формату datetime, если строка
+    соответствует принятой форме записи, иначе возвращает None
+    """
+    if type(date) is not str:
+        return None
+    if date.count("T") != 1:
+        return None
+
+    try:
+        return datetime.fromisoformat(date.replace("T", " "))
+    except ValueError:
+        return None
+
+
+def validate_record(pay: dict, parameters: set, counters: Optional[Counter] = None) -> Payment | str:
+    """
+    Проверяет словарь платежа и за один проход создаёт из него объект
+    Payment. Возвращает либо платёж со всеми характеристиками, нужными
+    для вывода на экран, либо код причины, по которой платёж не подходит
+    (одну из констант REJECT_*)
+
+    :param pay: словарь, содержащий информацию о платеже
+    :param parameters: обязательные характеристики платежа
+    :param counters: счётчик, в котором учитываются причины отказа
+    """
+    date = classify_payment(pay, parameters)
+    result = date if type(date) is str else complete_payment(pay, date)
+
+    if counters is not None and type(result) is str:
+        counters[result] += 1
+    return result
+
+
+def complete_payment(pay: dict, date: datetime) -> Payment | str:
+    """
+    Создаёт Payment из словаря, уже прошедшего check_payment (дата
+    разобрана при проверке), или возвращает код причины, по которой
+    у платежа нет какой-то характеристики, нужной для вывода на экран.
+
+    Каждое поле проверяется один раз, а некорректный платёж
+    не создаётся вовсе. Отправитель необязателен: некорректный
+    отправитель не выводится, как и с сеттером Payment.from_pay
+
+    :param pay: словарь, прошедший check_payment
+    :param date: разобранная дата платежа
+    """
+    values = record_values(pay, date)
+    if type(values) is str:
+        return values
+    return Payment.from_values(*values)
+
+
+def record_values(pay: dict, date: datetime) -> tuple | str:
+    """
+    Проверенные и приведённые к нужному виду характеристики платежа
+    в порядке аргументов Payment.from_values или код причины отказа
+    (см. complete_payment)
+    """
+    id_pay = pay.get("id")
+    if type(id_pay) is not int or not id_pay:
+        return REJECT_BAD_ID
+
+    amount = Payment.parse_amount(pay.get("operationAmount"))
+    if amount is None:
+        return REJECT_BAD_AMOUNT
+
+    description = pay.get("description")
+    if type(description) is not str or not description:
+        return REJECT_BAD_DESCRIPTION
+
+    to_pay = Payment.parse_account(pay.get("to"))
+    if to_pay is None:
+        return REJECT_BAD_TO
+
+    minor, currency = amount
+    return (id_pay, pay["state"].upper(), date, minor, currency, description,
+            Payment.parse_account(pay.get("from")), to_pay)
+
+
+def build_payments(payments: Iterable["CheckedPayment"],
+                   counters: Optional[Counter] = None) -> Iterator[Payment]:
+    """
+    Генератор объектов Payment из проверенных платежей (например,
+    из индекса или get_latest_checked_payments): неполные платежи
+    пропускаются, причины учитываются в counters и в подключённом
+    профилировщике
+
+    :param payments: проверенные платежи
+    :param counters: счётчик, в котором учитываются причины отказа
+    """
+    from scr.utils import get_profiler
+
+    profiler = get_profiler()
+    for pay, date in payments:
+        result = complete_payment(pay, date)
+        if type(result) is not str:
+            yield result
+            continue
+
+        if counters is not None:
+            counters[result] += 1
+        if profiler is not None:
+            profiler.reject(result)
+
+
+def validate_records(payments: Iterable[dict], parameters: set,
+                     counters: Optional[Counter] = None) -> Iterator[Payment]:
+    """
+    Генератор объектов Payment из словарей платежей: за один проход
+    отбрасывает платежи, не прошедшие check_payment или неполные,
+    и учитывает причины отказа в counters
+
+    :param payments: словари с информацией о платежах
+    :param parameters: обязательные характеристики платежа
+    :param counters: счётчик, в котором учитываются причины отказа
+    """
+    for pay in payments:
+        result = validate_record(pay, parameters, counters)
+        if type(result) is not str:
+            yield result
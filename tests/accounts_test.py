@@ -0,0 +1,108 @@
+import json
+import os
+import random
+import scr.accounts as acc
+import scr.utils as u
+import scr.validation as v
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Повторяющиеся номера и даты, чтобы проверить порядок найденных платежей
+    rnd = random.Random(2)
+    operations = [dict(rnd.choice(operations), id=i) for i in range(1, 301)]
+
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def naive(path, parameters, match, role=None):
+    payments = v.validate_records(u.get_payments(path, parameters), parameters)
+    result = []
+    for payment in payments:
+        accounts = {"from": payment.from_pay, "to": payment.to_pay}
+        if role is not None:
+            accounts = {role: accounts[role]}
+        if any(account and match(account[1]) for account in accounts.values()):
+            result.append(repr(payment))
+    return result
+
+
+def test_find(operations_path, parameters):
+    numbers = {payment.to_pay[1] for payment in
+               v.validate_records(u.get_payments(operations_path, parameters), parameters)}
+    for number in sorted(numbers)[:20] + ["5999414228426353", "123"]:
+        expected = naive(operations_path, parameters, lambda value: value == number)
+        result = acc.find_payments(operations_path, parameters, number)
+        assert [repr(payment) for payment in result] == expected
+
+
+@pytest.mark.parametrize("prefix, role", [("5", None), ("7158", "from"), ("4", "to"), ("", None),
+                                          ("999999", None)])
+def test_find_prefix(operations_path, parameters, prefix, role):
+    expected = naive(operations_path, parameters, lambda value: value.startswith(prefix), role)
+    result = acc.find_payments(operations_path, parameters, prefix, prefix=True, role=role)
+    assert [repr(payment) for payment in result] == expected
+
+
+def test_find_card_type(operations_path, parameters):
+    with acc.open_account_index(operations_path, parameters) as index:
+        payments = index.find_prefix("", role="from", card_type="Maestro")
+        assert payments
+        assert all(payment.from_pay[0] == "Maestro" for payment in payments)
+
+        number = payments[0].from_pay[1]
+        found = index.find(f"Maestro {number[:4]} {number[4:]}")
+        assert found
+        assert [repr(payment) for payment in found] == [repr(payment) for payment in index.find(number)]
+
+
+def test_find_aware_dates_and_other_digits(tmp_path, operations_path, parameters):
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)[:3]
+    number = operations[0]["to"].rsplit(" ", 1)[1]
+    operations = [dict(pay, state="EXECUTED", to=f"Счет {number:0>20}") for pay in operations]
+    operations[0]["date"] = "2019-01-08T22:46:21.935582+03:00"
+    operations[1]["date"] = "2019-01-08T20:00:00+00:00"
+    operations[2]["date"] = "2019-01-08T10:00:00-05:00"
+    # Номер из цифр другой письменности проходит проверку платежа, но не попадает в индекс
+    operations.append(dict(operations[0], id=10 ** 6, to="Счет " + "\u0661" * 20))
+    path = tmp_path / "aware.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+    path = str(path)
+
+    found = acc.find_payments(path, parameters, f"{number:0>20}")
+    assert [payment.date_pay.isoformat() for payment in found] == \
+        [operations[1]["date"], operations[0]["date"], operations[2]["date"]]
+    assert acc.find_payments(path, parameters, "\u0661" * 20) == []
+    assert acc.normalize_number("Счет \u0661\u0662 34") == b"34"
+
+
+def test_account_index_saved(operations_path, parameters):
+    assert acc.load_account_index(operations_path, parameters) is None
+    acc.build_account_index(operations_path, parameters).close()
+    assert os.path.exists(operations_path + acc.ACCOUNTS_SUFFIX)
+
+    with acc.load_account_index(operations_path, parameters) as index:
+        assert len(index) > 0
+    assert acc.load_account_index(operations_path, parameters - {"to"}) is None
+
+    with open(operations_path, "a", encoding="utf-8") as json_file:
+        json_file.write("\n")
+    assert acc.load_account_index(operations_path, parameters) is None
+
+
+def test_find_incorrect_path(parameters):
+    with pytest.raises(FileNotFoundError):
+        acc.find_payments("ksu/sources/operations.json", parameters, "5999414228426353")
@@ -0,0 +1,105 @@
+import json
+import random
+from collections import defaultdict
+import programs.main as main
+import scr.aggregate as a
+import scr.utils as u
+import scr.validation as v
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def payments(parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    return list(v.validate_records(u.get_payments(path, parameters), parameters))
+
+
+def test_aggregate(payments, parameters):
+    expected = defaultdict(list)
+    for payment in payments:
+        card = payment.from_pay[0] if payment.from_pay else a.NO_CARD
+        expected[(payment.currency_pay, card)].append(payment.amount_pay)
+
+    path = u.get_path_to_file("operations.json", "sources")
+    groups = a.aggregate_file(path, parameters, ["currency", "card"])
+    assert set(groups) == set(expected)
+    for key, amounts in expected.items():
+        stats = groups[key]
+        assert (stats.count, stats.total, stats.minimum, stats.maximum) == \
+            (len(amounts), sum(amounts), min(amounts), max(amounts))
+        assert stats.percentiles([0, 50, 100]) == [min(amounts), sorted(amounts)[(len(amounts) - 1) // 2],
+                                                    max(amounts)]
+        for percent in (-1, 100.5, float("nan")):
+            with pytest.raises(ValueError):
+                stats.percentiles([percent])
+
+
+def test_aggregate_approximate(payments):
+    rnd = random.Random(0)
+    many = [rnd.choice(payments) for _ in range(5000)]
+    exact = a.aggregate(many, ["month"])
+    approximate = a.aggregate(many, ["month"], approximate=True, sample_size=20)
+
+    assert set(exact) == set(approximate)
+    for key, stats in approximate.items():
+        assert len(stats.amounts) <= 20
+        assert (stats.count, stats.total, stats.minimum, stats.maximum) == \
+            (exact[key].count, exact[key].total, exact[key].minimum, exact[key].maximum)
+        assert stats.minimum <= stats.percentiles([50])[0] <= stats.maximum
+
+    again = a.aggregate(many, ["month"], approximate=True, sample_size=20)
+    assert all(list(again[key].amounts) == list(stats.amounts) for key, stats in approximate.items())
+
+
+@pytest.mark.parametrize("sample_size", [None, 2])
+def test_aggregate_large_amounts(payments, sample_size):
+    # Суммы больше int64 (например, "1e30") не ломают группу
+    many = payments[:3]
+    for payment, amount in zip(many, ("1e30", "-1e30", "10.50")):
+        payment.operation_amount_pay = {"amount": amount, "currency": {"name": "USD", "code": "USD"}}
+    stats = a.aggregate(many, ["currency"], approximate=sample_size is not None,
+                        sample_size=sample_size)[("USD",)]
+    amounts = [payment.amount_pay for payment in many]
+    assert amounts[0] > 1 << 63
+    assert (stats.count, stats.total, stats.minimum, stats.maximum) == \
+        (3, sum(amounts), amounts[1], amounts[0])
+    if sample_size:
+        assert len(stats.amounts) == 2
+    else:
+        assert stats.percentiles([0, 50, 100]) == [amounts[1], amounts[2], amounts[0]]
+
+
+def test_aggregate_incorrect(payments):
+    with pytest.raises(ValueError):
+        a.aggregate(payments, ["weekday"])
+    assert a.aggregate([], ["currency"]) == {}
+    assert a.format_table([]) == ""
+
+
+def test_report_rows(payments):
+    rows = a.report_rows(a.aggregate(payments, ["currency"]), ["currency"], [50, 99.9])
+    assert [row["currency"] for row in rows] == ["USD", "руб."]
+    assert list(rows[0]) == ["currency", "count", "total", "min", "max", "p50", "p99.9"]
+    assert sum(row["count"] for row in rows) == len(payments)
+
+    table = a.format_table(rows).splitlines()
+    assert table[0].split() == list(rows[0])
+    assert len(table) == 3
+
+
+def test_main_aggregate(capsys, monkeypatch, payments):
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    main.main(["aggregate", "--by", "description", "--format", "json", "--percentile", "50"])
+    rows = json.loads(capsys.readouterr().out)
+
+    assert sum(row["count"] for row in rows) == len(payments)
+    assert {row["description"] for row in rows} == {payment.description_pay for payment in payments}
+
+    for percent in ("150", "-5", "nan", "x"):
+        with pytest.raises(SystemExit):
+            main.main(["aggregate", "--percentile", percent])
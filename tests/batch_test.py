@@ -0,0 +1,135 @@
+import random
+from decimal import ROUND_HALF_EVEN, Decimal, localcontext
+import scr.utils as u
+from scr.json_stream import iter_json_array
+import pytest
+from class_payment.amount import format_minor, parse_minor, to_minor
+from class_payment.batch import PaymentBatch, pack_number, unpack_number
+from class_payment.payment import Payment
+
+
+@pytest.fixture
+def payments():
+    path = u.get_path_to_file("operations.json", "sources")
+    parameters = {"id", "date", "state", "operationAmount", "description", "to"}
+    return [u.create_payment(*checked) for checked in
+            u.check_payments(iter_json_array(path), parameters)]
+
+
+def test_payment_batch_round_trip(payments):
+    batch = PaymentBatch.from_payments(payments)
+    assert len(batch) == len(payments)
+    assert [repr(pay) for pay in batch] == [repr(pay) for pay in payments]
+    assert repr(batch[-1]) == repr(payments[-1])
+    assert type(batch[0]) is Payment
+
+
+def test_payment_batch_compact(payments):
+    batch = PaymentBatch.from_payments(payments)
+    assert batch.nbytes < 80 * len(batch)
+
+
+def test_payment_batch_incorrect(payments):
+    batch = PaymentBatch()
+    with pytest.raises(ValueError):
+        batch.append(Payment())
+
+    with pytest.raises(IndexError):
+        batch[0]
+
+    # id и сумма больше int64: платёж не добавляется, колонки не меняются
+    payments[0].id_pay = 1 << 63
+    payments[1].operation_amount_pay = {"amount": "1e20", "currency": {"name": "руб.", "code": "RUB"}}
+    for payment in payments[:2]:
+        with pytest.raises(OverflowError):
+            batch.append(payment)
+    assert all(len(column) == 0 for column in batch.columns.values())
+
+
+def test_payment_batch_aware_dates(payments):
+    # Дата с часовым поясом восстанавливается вместе с поясом
+    payments[0].date_pay = "2019-01-08T22:46:21.935582+03:00"
+    payments[1].date_pay = "2019-01-08T10:00:00-05:30"
+    batch = PaymentBatch.from_payments(payments[:3])
+    assert [pay.date_pay for pay in batch] == [pay.date_pay for pay in payments[:3]]
+    assert batch[0].date_pay.utcoffset() == payments[0].date_pay.utcoffset()
+    assert batch[2].date_pay.tzinfo is None
+
+
+def test_payment_batch_append_atomic(payments):
+    # Номер из цифр другой письменности не упаковывается:
+    # колонки не меняются и остаются одной длины
+    batch = PaymentBatch.from_payments(payments[:1])
+    payments[1].to_pay = "Счет " + "\u0661" * 20
+    assert payments[1].to_pay is not None
+    with pytest.raises(ValueError):
+        batch.append(payments[1])
+    assert len({len(column) for name, column in batch.columns.items()
+                if not name.endswith("_numbers")}) == 1
+    assert len(batch.columns["to_numbers"]) == len(batch) * 10
+
+
+def test_pack_number():
+    assert unpack_number(pack_number("72731966109147704472")) == "72731966109147704472"
+    assert unpack_number(pack_number("0599414228426353")) == "0599414228426353"
+    assert unpack_number(pack_number("")) == ""
+    assert len(pack_number("5999414228426353")) == 10
+
+
+def test_minor_units():
+    assert parse_minor("41096.24") == 4109624
+    assert parse_minor("-0.50") == -50
+    assert parse_minor("41096.2") is None
+    assert parse_minor("inf") is None
+    assert format_minor(4109624) == "41096.24"
+    assert format_minor(-50) == "-0.50"
+    assert format_minor(7) == "0.07"
+
+
+def test_payment_batch_columns(payments):
+    batch = PaymentBatch.from_payments(payments)
+    copy = PaymentBatch.from_columns(batch.columns, batch.tables)
+    assert [repr(pay) for pay in copy] == [repr(pay) for pay in payments]
+
+    order = list(range(len(batch) - 1, -1, -1))
+    reversed_batch = batch.take(order)
+    assert [repr(pay) for pay in reversed_batch] == [repr(pay) for pay in reversed(payments)]
+
+
+@pytest.mark.parametrize("amount, minor", [
+    ("41096.24", 4109624), ("100", 10000), (" -5.5 ", -550), (".5", 50), ("5.", 500),
+    ("1e3", 100000), ("1_000.5", 100050), ("12.345", 1234), ("12.355", 1236), (100, 10000), (1.5, 150),
+    ("0.165", 16), ("2.675", 268), ("-0.001", 0), ("92233720368547758.07", 9223372036854775807),
+    ("1e30", 10 ** 32), ("123456789012345678901234567890.125", 12345678901234567890123456789012),
+    ("1e400", None), ("-1e400", None), ("inf", None), ("nan", None), ("сто", None), ("", None), (".", None), (True, None), (None, None),
+])
+def test_to_minor(amount, minor):
+    assert to_minor(amount) == minor
+
+
+def test_to_minor_same_as_float():
+    rnd = random.Random(0)
+    for _ in range(10000):
+        amount = f"{rnd.randrange(10 ** 10) / 100:.{rnd.randrange(3)}f}"
+        assert format_minor(to_minor(amount)) == f"{float(amount):.2f}"
+
+
+def test_to_minor_rounding_exact():
+    # Больше двух знаков после точки и очень большие суммы округляются точно, по десятичной записи
+    rnd = random.Random(0)
+    amounts = [f"{rnd.uniform(0, 10 ** 6):.{rnd.randrange(3, 6)}f}" for _ in range(10000)]
+    amounts += ["1e30", "-2.5e100", "1.7976931348623157e308", "98765432109876543210.005"]
+    with localcontext() as context:
+        context.prec = 400
+        for amount in amounts:
+            expected = Decimal(amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_EVEN)
+            assert format_minor(to_minor(amount)) == f"{expected:f}"
+
+
+@pytest.mark.parametrize("amount, shown", [("nan", None), ("inf", None), ("-0.001", "0.00"), ("-0.00", "0.00")])
+def test_to_minor_changed_output(amount, shown):
+    # Раньше выводились "nan", "inf" и "-0.00"; теперь такие платежи
+    # считаются неполными, а нулевая сумма выводится без знака
+    payment = Payment()
+    payment.operation_amount_pay = {"amount": amount, "currency": {"name": "USD", "code": "USD"}}
+    assert payment.operation_amount_pay == (None if shown is None else (shown, "USD"))
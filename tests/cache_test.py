@@ -0,0 +1,148 @@
+import json
+import os
+import scr.cache as c
+import scr.utils as u
+import scr.validation as v
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Повторяющаяся дата, чтобы проверить порядок при равных датах
+    operations += [dict(operations[0], id=i) for i in range(1, 4)]
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def expected_payments(path, parameters):
+    """Платежи со всеми характеристиками для вывода, в порядке get_payments"""
+    return [repr(payment) for payment in v.validate_records(u.get_payments(path, parameters), parameters)]
+
+
+def test_get_cached_payments(operations_path, parameters):
+    expected = expected_payments(operations_path, parameters)
+    # первый вызов строит кэш, второй читает сохранённый
+    for _ in range(2):
+        assert [repr(pay) for pay in c.get_cached_payments(operations_path, parameters)] == expected
+    assert os.path.exists(operations_path + c.CACHE_SUFFIX)
+
+
+def test_get_payments_from_cache(operations_path, parameters):
+    cache_path = c.build_cache(operations_path, parameters)
+    payments = [repr(u.create_payment(pay)) for pay in u.get_payments(cache_path, parameters)]
+    assert payments == expected_payments(operations_path, parameters)
+
+    with pytest.raises(ValueError):
+        u.get_payments(cache_path, parameters - {"to"})
+    with pytest.raises(FileNotFoundError):
+        u.get_payments(operations_path + ".missing" + c.CACHE_SUFFIX, parameters)
+
+    os.rename(operations_path, operations_path + c.CACHE_SUFFIX)
+    with pytest.raises(ValueError):
+        u.get_payments(operations_path + c.CACHE_SUFFIX, parameters)
+
+
+def test_load_cache(operations_path, parameters):
+    assert c.load_cache(operations_path + c.CACHE_SUFFIX, parameters) is None
+
+    cache_path = c.build_cache(operations_path, parameters)
+    assert c.load_cache(cache_path, parameters - {"to"}) is None
+
+    with c.load_cache(cache_path, parameters, operations_path) as cache:
+        assert len(cache) == len(expected_payments(operations_path, parameters))
+        assert type(cache.batch.columns["dates"]) is memoryview
+        assert repr(cache[0]) == expected_payments(operations_path, parameters)[0]
+
+    with open(operations_path, "a", encoding="utf-8") as json_file:
+        json_file.write("\n")
+    assert c.load_cache(cache_path, parameters, operations_path) is None
+
+
+def test_get_payments_cache_same_as_json(operations_path, parameters):
+    # Из кэша возвращаются те же словари, что и из JSON, в том числе неполные для вывода
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    operations += [dict(operations[0], id=10 ** 6, to="Счет 12"),
+                   dict(operations[0], id=10 ** 6 + 1, operationAmount={"amount": "1.005"})]
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations, json_file, ensure_ascii=False)
+
+    cache_path = c.build_cache(operations_path, parameters)
+    expected = list(u.get_payments(operations_path, parameters))
+    assert list(u.get_payments(cache_path, parameters)) == expected
+    assert len(expected) > len(expected_payments(operations_path, parameters))
+
+    # Словари полных платежей собираются из колонок, в JSON хранятся только неполные
+    with c.load_cache(cache_path, parameters) as cache:
+        assert len(cache.batch) + 2 == len(expected)
+        assert [pay for pay in cache.records() if pay["id"] in (10 ** 6, 10 ** 6 + 1)] == operations[-2:]
+
+
+def test_get_payments_stale_cache(operations_path, parameters):
+    cache_path = c.build_cache(operations_path, parameters)
+    with open(operations_path, "a", encoding="utf-8") as json_file:
+        json_file.write("\n")
+    with pytest.raises(ValueError):
+        u.get_payments(cache_path, parameters)
+
+    # Без файла операций рядом кэш читается как есть
+    os.remove(operations_path)
+    assert len(list(u.get_payments(cache_path, parameters))) > 0
+
+
+def test_build_cache_aware_dates(operations_path, parameters):
+    # Даты с часовым поясом и без него в одном файле
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    operations[0]["date"] = "2030-01-08T22:46:21.935582+03:00"
+    operations[0]["state"] = "EXECUTED"
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations, json_file, ensure_ascii=False)
+
+    payments = list(c.get_cached_payments(operations_path, parameters))
+    assert payments[0].id_pay == operations[0]["id"]
+    assert payments[0].date_pay.utcoffset() is not None
+    assert next(u.get_payments(operations_path + c.CACHE_SUFFIX, parameters))["date"] == operations[0]["date"]
+
+
+def test_get_cached_payments_fallback(operations_path, parameters, monkeypatch):
+    expected = expected_payments(operations_path, parameters)
+
+    # Кэш нельзя записать — платежи читаются из JSON
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only")
+    monkeypatch.setattr(c, "build_cache", read_only)
+    assert [repr(pay) for pay in c.get_cached_payments(operations_path, parameters)] == expected
+    assert not os.path.exists(operations_path + c.CACHE_SUFFIX)
+    monkeypatch.undo()
+
+    # Сумма не помещается в int64
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    operations[0]["operationAmount"]["amount"] = "1e20"
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations, json_file, ensure_ascii=False)
+    expected = expected_payments(operations_path, parameters)
+    with pytest.raises(OverflowError):
+        c.build_cache(operations_path, parameters)
+    assert [repr(pay) for pay in c.get_cached_payments(operations_path, parameters)] == expected
+
+    # Номер из цифр другой письменности не упаковывается в колонки
+    operations[0]["operationAmount"]["amount"] = "10.00"
+    operations[0]["to"] = "Счет " + "\u0661" * 20
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations, json_file, ensure_ascii=False)
+    expected = expected_payments(operations_path, parameters)
+    with pytest.raises(ValueError):
+        c.build_cache(operations_path, parameters)
+    assert [repr(pay) for pay in c.get_cached_payments(operations_path, parameters)] == expected
@@ -0,0 +1,57 @@
+import scr.columns as c
+import scr.utils as u
+import pytest
+from scr.json_stream import iter_json_array
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations():
+    path = u.get_path_to_file("operations.json", "sources")
+    operations = list(iter_json_array(path))
+    pay = operations[0]
+    # Добавляем платежи, которые отбрасываются по разным причинам
+    return operations + [
+        dict(pay, state="executed"),
+        dict(pay, state=""),
+        dict(pay, state=1),
+        dict(pay, description=None),
+        dict(pay, date="2019-12-32T22:46:21.935582"),
+        dict(pay, date="2019-12-08 22:46:21.935582"),
+        dict(pay, date=None),
+        dict(pay, extra=0),
+        {key: value for key, value in pay.items() if key != "to"},
+        {key: value for key, value in pay.items() if key != "from"},
+    ]
+
+
+def test_to_columns(parameters):
+    columns = c.to_columns([{"id": 1, "from": "a"}, {"id": 2}], parameters)
+    assert columns["id"] == [1, 2]
+    assert columns["to"] == [None, None]
+    assert columns["from"] == ["a", True]
+
+
+def test_check_columns_same_as_check_payment(operations, parameters):
+    mask = c.check_columns(c.to_columns(operations, parameters), parameters)
+    assert mask == [u.check_payment(pay, parameters) for pay in operations]
+
+
+def test_validate_columns_dates(operations, parameters):
+    dates = c.validate_columns(c.to_columns(operations, parameters), parameters)
+    assert dates == [u.validate_payment(pay, parameters) for pay in operations]
+
+
+def test_check_columns_empty(parameters):
+    assert c.check_columns({}, parameters) == []
+    assert c.check_columns(c.to_columns([{"id": 1}], parameters), parameters) == [False]
+
+
+def test_check_payments_batched(operations, parameters):
+    for batch_size in (1, 7, c.BATCH_SIZE):
+        checked = c.check_payments_batched(operations, parameters, batch_size)
+        assert list(checked) == list(u.check_payments(operations, parameters))
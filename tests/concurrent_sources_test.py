@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import scr.concurrent_sources as cs
+import scr.parallel as par
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def sources_dir(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Несколько файлов с повторяющимися датами, чтобы проверить порядок при равных датах
+    rnd = random.Random(0)
+    for number in range(3):
+        part = [dict(rnd.choice(operations), id=number * 1000 + i) for i in range(1, 301)]
+        (tmp_path / f"operations_{number}.json").write_text(
+            json.dumps(part, ensure_ascii=False, indent=2), encoding="utf-8")
+    return tmp_path
+
+
+def is_usd(checked):
+    return checked.pay["operationAmount"]["currency"]["code"] == "USD"
+
+
+def test_get_payments_concurrent_latest(sources_dir, parameters):
+    expected = list(par.get_payments_parallel(str(sources_dir), parameters, 5, is_usd, workers=1))
+    result = cs.get_payments_concurrent(str(sources_dir), parameters, 5, is_usd,
+                                        workers=2, chunk_size=512, read_ahead=2)
+    assert list(result) == expected
+
+
+def test_get_payments_concurrent_all(sources_dir, parameters):
+    expected = list(par.get_payments_parallel(str(sources_dir), parameters, workers=1))
+    result = list(cs.get_payments_concurrent(str(sources_dir), parameters, chunk_size=1000))
+    assert result == expected
+    assert all(a.date >= b.date for a, b in zip(result, result[1:]))
+
+
+def test_get_payments_concurrent_glob(sources_dir, parameters):
+    files = sorted(str(path) for path in sources_dir.glob("operations_[01].json"))
+    expected = list(par.get_payments_parallel(files, parameters, 10, workers=1))
+    result = cs.get_payments_concurrent(str(sources_dir / "operations_[01].json"), parameters, 10)
+    assert list(result) == expected
+
+
+def test_get_payments_async_single_file(parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    expected = list(u.get_latest_checked_payments(path, parameters, 5))
+    result = asyncio.run(cs.get_payments_async([path], parameters, 5, chunk_size=256))
+    assert list(result) == expected
+
+
+def test_get_payments_concurrent_errors(tmp_path, parameters):
+    broken = tmp_path / "broken.json"
+    broken.write_text('[{"id": 1,')
+    with pytest.raises(ValueError):
+        cs.get_payments_concurrent(str(broken), parameters, 5)
+    with pytest.raises(FileNotFoundError):
+        cs.get_payments_concurrent([str(tmp_path / "missing.json")], parameters, 5)
+
+
+def test_main_sources(capsys, monkeypatch):
+    import programs.main as main
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    path = u.get_path_to_file("operations.json", "sources")
+    main.main([])
+    expected = capsys.readouterr().out
+
+    main.main(["--source", path])
+    assert capsys.readouterr().out == expected
+
+
+def test_get_payments_concurrent_broken_with_good(sources_dir, parameters):
+    # Ошибка в одном файле отменяет обработку остальных: потоки разбора
+    # не должны остаться ждать блоков, иначе asyncio.run не завершится
+    (sources_dir / "broken.json").write_text('[{"id": 1,')
+    code = ("import scr.concurrent_sources as cs\n"
+            f"cs.get_payments_concurrent({str(sources_dir)!r}, {parameters!r}, 5, chunk_size=64, read_ahead=1)\n")
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(__file__)),
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 1
+    assert "JSONDecodeError" in result.stderr
+
+
+def test_decode_blocks_stopped():
+    # Каждый поток разбора получает своё исключение, а не общий экземпляр
+    errors = []
+    for _ in range(2):
+        with pytest.raises(asyncio.CancelledError) as info:
+            list(cs._decode_blocks(lambda: cs._STOPPED))
+        errors.append(info.value)
+    assert errors[0] is not errors[1]
@@ -0,0 +1,108 @@
+import json
+from collections import Counter
+from datetime import datetime
+import scr.decoder as dec
+import scr.utils as u
+import scr.validation as v
+from scr.query import Query
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def path():
+    return u.get_path_to_file("operations.json", "sources")
+
+
+@pytest.mark.parametrize("backend", dec.available_backends())
+def test_decode_operations(path, parameters, backend):
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    expected_counters = Counter()
+    expected = list(v.validate_records(operations, parameters, expected_counters))
+
+    counters = Counter()
+    result = list(dec.decode_operations(path, parameters, backend, counters))
+    assert [repr(operation.to_payment()) for operation in result] == [repr(pay) for pay in expected]
+    assert counters == expected_counters
+    assert result[0].amount == expected[0].amount_pay
+
+
+@pytest.mark.parametrize("backend", dec.available_backends())
+def test_get_payments_backend(path, parameters, backend):
+    assert list(u.get_payments(path, parameters, backend=backend)) == list(u.get_payments(path, parameters))
+
+
+def test_choose_backend(monkeypatch):
+    assert dec.choose_backend() == dec.available_backends()[0]
+    assert dec.available_backends()[-1] == "json"
+    monkeypatch.setenv(dec.DECODER_ENV, "json")
+    assert dec.choose_backend() == "json"
+    with pytest.raises(ValueError):
+        dec.choose_backend("simplejson")
+
+
+def test_choose_backend_not_installed(monkeypatch):
+    def not_installed(backend):
+        raise ImportError(backend)
+
+    monkeypatch.setattr(dec, "_get_loads", not_installed)
+    with pytest.raises(ValueError):
+        dec.choose_backend("orjson")
+
+
+@pytest.mark.parametrize("backend", dec.available_backends())
+def test_load_records_not_array(tmp_path, backend):
+    path = tmp_path / "operations.json"
+    path.write_text('{"id": 1}')
+    with pytest.raises(ValueError):
+        list(dec.load_records(str(path), backend))
+
+
+@pytest.mark.parametrize("backend", dec.available_backends())
+def test_load_records_nan(tmp_path, path, backend):
+    # NaN допускает json, но не orjson и msgspec: файл разбирается потоково
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    operations[0]["operationAmount"]["amount"] = float("nan")
+    nan_path = tmp_path / "operations.json"
+    nan_path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+
+    records = list(dec.load_records(str(nan_path), backend))
+    assert len(records) == len(operations)
+    assert records[1:] == operations[1:]
+
+
+@pytest.mark.parametrize("backend", dec.available_backends())
+def test_decode_operations_query(path, parameters, backend):
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    query = Query(currency="USD", date_from=datetime(2019, 1, 1))
+    checked = [checked for checked in u.check_payments(operations, parameters) if query.matches(checked)]
+    expected = [repr(pay) for pay in v.build_payments(checked)]
+
+    result = dec.decode_operations(path, parameters, backend, query=query)
+    assert [repr(operation.to_payment()) for operation in result] == expected
+
+
+def test_main_decoder(capsys, monkeypatch):
+    import programs.main as main
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    for arguments in ([], ["--currency", "USD"], ["--dedup", "first"], ["--dedup", "latest"]):
+        main.main(arguments)
+        expected = capsys.readouterr().out
+        for backend in dec.available_backends():
+            main.main(["--decoder", backend, *arguments])
+            assert capsys.readouterr().out == expected
+            monkeypatch.setenv(dec.DECODER_ENV, backend)
+            main.main(arguments)
+            assert capsys.readouterr().out == expected
+            monkeypatch.delenv(dec.DECODER_ENV)
+
+    monkeypatch.setenv(dec.DECODER_ENV, "simplejson")
+    with pytest.raises(SystemExit):
+        main.main([])
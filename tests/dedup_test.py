@@ -0,0 +1,114 @@
+import json
+import random
+import scr.dedup as dd
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations():
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Повторы id с разными датами, в том числе с одинаковыми датами
+    rnd = random.Random(0)
+    return [dict(rnd.choice(operations), id=rnd.randrange(1, 300)) for _ in range(1000)]
+
+
+@pytest.fixture
+def operations_path(tmp_path, operations):
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def expected_unique(payments):
+    seen = set()
+    return [pay for pay in payments if not (pay["id"] in seen or seen.add(pay["id"]))]
+
+
+def is_usd(checked):
+    return checked.pay["operationAmount"]["currency"]["code"] == "USD"
+
+
+def test_get_payments_dedup(operations_path, operations, parameters):
+    checked = [pay for pay in operations if u.check_payment(pay, parameters)]
+    first = expected_unique(checked)
+    first.sort(reverse=True, key=u.reformat_date)
+    assert list(u.get_payments(operations_path, parameters, dedup="first")) == first
+
+    latest = expected_unique(list(u.get_payments(operations_path, parameters)))
+    assert list(u.get_payments(operations_path, parameters, dedup="latest")) == latest
+    assert list(u.get_payments(operations_path, parameters, run_size=50, dedup="latest")) == latest
+
+    with pytest.raises(ValueError):
+        u.get_payments(operations_path, parameters, dedup="last")
+
+
+@pytest.mark.parametrize("dedup", dd.POLICIES)
+@pytest.mark.parametrize("count", [1, 5, 40])
+def test_get_latest_payments_dedup(operations_path, operations, parameters, dedup, count):
+    # Повторы ищутся среди платежей, прошедших все проверки (здесь — только USD)
+    def accept(pay):
+        return is_usd(u.CheckedPayment(pay, None))
+
+    if dedup == "first":
+        expected = expected_unique([pay for pay in operations if u.check_payment(pay, parameters) and accept(pay)])
+        expected.sort(reverse=True, key=u.reformat_date)
+    else:
+        expected = expected_unique(list(filter(accept, u.get_payments(operations_path, parameters))))
+
+    result = list(u.get_latest_payments(operations_path, parameters, count, accept, dedup=dedup))
+    assert result == expected[:count]
+
+
+def test_select_latest_unique():
+    payments = [u.CheckedPayment({"id": i % 7}, i // 3) for i in range(100)]
+    rnd = random.Random(1)
+    rnd.shuffle(payments)
+    ordered = sorted(payments, reverse=True, key=lambda checked: checked.date)
+    expected = expected_unique([checked.pay for checked in ordered])
+    for count in (1, 3, 7, 10):
+        result = dd.select_latest_unique(payments, count)
+        assert [checked.pay for checked in result] == expected[:count]
+
+
+def test_seen_ids_spill(tmp_path):
+    keys = [1, 2, "2", 3.5, None, [1, 2], True, 1 << 70] + list(range(100, 2000))
+    with dd.SeenIds(threshold=5, capacity=100, temp_dir=str(tmp_path)) as seen:
+        assert all(seen.add(key) for key in keys)
+        assert seen.on_disk
+        assert not any(seen.add(key) for key in keys)
+        assert len(seen) == len(keys)
+        assert seen.disk_lookups >= len(keys)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unique_bloom(operations):
+    exact = list(dd.unique(operations, key=lambda pay: pay["id"]))
+    assert list(dd.unique(operations, key=lambda pay: pay["id"], threshold=10)) == exact
+    assert exact == expected_unique(operations)
+
+
+def test_bloom_filter():
+    bloom = dd.BloomFilter(1000, 0.01)
+    for key in range(1000):
+        bloom.add(key)
+    assert all(key in bloom for key in range(1000))
+    assert sum(key in bloom for key in range(1000, 11000)) < 300
+
+
+def test_main_dedup(capsys, monkeypatch):
+    import programs.main as main
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    main.main([])
+    expected = capsys.readouterr().out
+    for policy in dd.POLICIES:
+        main.main(["--dedup", policy])
+        assert capsys.readouterr().out == expected
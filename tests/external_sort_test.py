@@ -0,0 +1,64 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+import scr.external_sort as es
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Много записей с повторяющимися датами, чтобы проверить порядок при равных датах
+    rnd = random.Random(0)
+    operations = [dict(rnd.choice(operations), id=i) for i in range(1, 1001)]
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("run_size", [1, 7, 100, 10000])
+def test_get_payments_external(operations_path, parameters, run_size):
+    expected = list(u.get_payments(operations_path, parameters))
+    assert list(u.get_payments(operations_path, parameters, run_size=run_size)) == expected
+
+
+def test_sort_external_ties(tmp_path):
+    date = datetime(2019, 1, 1)
+    payments = [u.CheckedPayment({"id": i, "description": "Перевод"}, date + timedelta(days=i % 3))
+                for i in range(50)]
+    expected = sorted(payments, reverse=True, key=lambda checked: checked.date)
+    result = list(es.sort_external(payments, run_size=4, temp_dir=str(tmp_path)))
+    assert result == expected
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sort_external_dates():
+    dates = [datetime(2019, 1, 1, 10, 30, 0, 123456),
+             datetime(2019, 1, 1, 12, tzinfo=timezone(timedelta(hours=3))),
+             datetime(1960, 5, 1)]
+    payments = [u.CheckedPayment({"id": i}, date) for i, date in enumerate(dates)]
+    result = list(es.sort_external(payments[:1] + payments[2:], run_size=1))
+    assert [checked.date for checked in result] == [dates[0], dates[2]]
+    assert list(es.sort_external(payments[1:2], run_size=1))[0].date.utcoffset() == timedelta(hours=3)
+
+
+def test_sort_external_empty():
+    assert list(es.sort_external([], run_size=2)) == []
+    with pytest.raises(ValueError):
+        es.sort_external([], run_size=0)
+
+
+def test_read_run_large_record():
+    pay = {"id": 1, "description": "x" * (es.BUFFER_SIZE * 2)}
+    payments = [u.CheckedPayment(pay, datetime(2019, 1, 1)), u.CheckedPayment({"id": 2}, datetime(2018, 1, 1))]
+    assert list(es.sort_external(payments * 2, run_size=2)) == sorted(payments * 2, reverse=True,
+                                                                      key=lambda checked: checked.date)
@@ -0,0 +1,184 @@
+import json
+import os
+import random
+import scr.index as idx
+import scr.utils as u
+from scr.profiling import Profiler
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Повторяющиеся даты, чтобы проверить порядок при равных датах
+    rnd = random.Random(1)
+    operations = [dict(rnd.choice(operations), id=i) for i in range(1, 301)]
+
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def is_rub(checked):
+    return checked.pay["operationAmount"]["currency"]["code"] == "RUB"
+
+
+def test_get_latest_indexed_payments(operations_path, parameters):
+    for count in (0, 1, 5, 500):
+        expected = list(u.get_latest_checked_payments(operations_path, parameters, count, is_rub))
+        # первый вызов строит индекс, второй читает сохранённый
+        for _ in range(2):
+            result = idx.get_latest_indexed_payments(operations_path, parameters, count, is_rub)
+            assert list(result) == expected
+
+
+def test_index_iter(operations_path, parameters):
+    with idx.open_index(operations_path, parameters) as index:
+        assert [checked.pay for checked in index] == list(u.get_payments(operations_path, parameters))
+
+
+def test_index_saved(operations_path, parameters):
+    assert idx.load_index(operations_path, parameters) is None
+
+    idx.build_index(operations_path, parameters).close()
+    assert os.path.exists(operations_path + idx.INDEX_SUFFIX)
+
+    with idx.load_index(operations_path, parameters) as index:
+        assert len(index) == len(list(u.get_payments(operations_path, parameters)))
+
+
+def test_index_stale(operations_path, parameters):
+    idx.build_index(operations_path, parameters).close()
+
+    assert idx.load_index(operations_path, parameters - {"to"}) is None
+
+    with open(operations_path, "r+b") as file:
+        file.seek(20)
+        file.write(b" ")
+    assert idx.load_index(operations_path, parameters) is None
+
+
+def test_index_aware_dates(tmp_path, operations_path, parameters):
+    # Даты с часовым поясом упорядочены по UTC: 22:46 +03:00 раньше 20:00 UTC
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)[:3]
+    dates = ["2019-01-08T22:46:21.935582+03:00", "2019-01-08T20:00:00+00:00",
+             "2019-01-08T10:00:00-05:00"]
+    operations = [dict(pay, state="EXECUTED", date=date) for pay, date in zip(operations, dates)]
+    path = tmp_path / "aware.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+    path = str(path)
+
+    expected = list(u.get_latest_checked_payments(path, parameters, 3))
+    assert [checked.pay["date"] for checked in expected] == [dates[1], dates[0], dates[2]]
+    for _ in range(2):
+        assert list(idx.get_latest_indexed_payments(path, parameters, 3)) == expected
+
+
+def test_index_incorrect_path(parameters):
+    with pytest.raises(FileNotFoundError):
+        idx.get_latest_indexed_payments("ksu/sources/operations.json", parameters, 5)
+
+
+def append_operations(path, operations):
+    with open(path, encoding="utf-8") as json_file:
+        text = json_file.read().rstrip()
+    added = ",\n".join(json.dumps(pay, ensure_ascii=False) for pay in operations)
+    with open(path, "w", encoding="utf-8") as json_file:
+        json_file.write(text[:-1].rstrip() + ",\n" + added + "\n]\n")
+
+
+@pytest.mark.parametrize("date", ["2020-01-01T00:00:00.000001", "2018-01-01T00:00:00.000001"])
+def test_update_index_appended(operations_path, parameters, date):
+    idx.build_index(operations_path, parameters).close()
+    size = os.path.getsize(operations_path + idx.INDEX_SUFFIX)
+
+    with open(operations_path, encoding="utf-8") as json_file:
+        pay = json.load(json_file)[0]
+    append_operations(operations_path, [dict(pay, id=1001, state="EXECUTED", date=date),
+                                        dict(pay, id=1002, state="CANCELED", date=date)])
+
+    assert idx.load_index(operations_path, parameters) is None
+    with idx.update_index(operations_path, parameters) as index:
+        assert [checked.pay for checked in index] == list(u.get_payments(operations_path, parameters))
+    assert os.path.getsize(operations_path + idx.INDEX_SUFFIX) == size + 24
+
+    expected = list(u.get_latest_checked_payments(operations_path, parameters, 5))
+    assert list(idx.get_latest_indexed_payments(operations_path, parameters, 5)) == expected
+
+
+def test_update_index_rewritten(operations_path, parameters):
+    idx.build_index(operations_path, parameters).close()
+
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations[:100], json_file, ensure_ascii=False, indent=2)
+    assert idx.update_index(operations_path, parameters) is None
+
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations[1:], json_file, ensure_ascii=False, indent=2)
+    assert idx.update_index(operations_path, parameters) is None
+
+    expected = list(u.get_latest_checked_payments(operations_path, parameters, 5))
+    assert list(idx.get_latest_indexed_payments(operations_path, parameters, 5)) == expected
+
+
+def test_update_index_edited_in_place(tmp_path, operations_path, parameters):
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    # Файл больше нескольких блоков по 64 КиБ, запись исправляется в середине
+    operations = [dict(operations[i % 300], id=i) for i in range(1, 3001)]
+    operations[1500]["state"] = "EXECUTED"
+    path = tmp_path / "large.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    path = str(path)
+    idx.build_index(path, parameters).close()
+
+    with open(path, "rb") as file:
+        data = file.read()
+    position = data.index(b'"state": "EXECUTED"', data.index(b'"id": 1501,'))
+    assert 200 << 10 < position < len(data) - (200 << 10)
+    with open(path, "r+b") as file:
+        file.seek(position)
+        file.write(b'"state": "CANCELED"')
+    append_operations(path, [dict(operations[0], id=3001)])
+
+    assert idx.update_index(path, parameters) is None
+    with idx.open_index(path, parameters) as index:
+        result = [checked.pay for checked in index]
+    assert 1501 not in [pay["id"] for pay in result]
+    assert result == list(u.get_payments(path, parameters))
+
+
+def test_index_profile_counts(operations_path, parameters):
+    # Счётчики в отчёте одинаковые при построении, повторном использовании
+    # и дополнении индекса — как при разборе всего файла
+    def report(function):
+        profiler = Profiler(memory=False)
+        previous = u.set_profiler(profiler)
+        try:
+            function(operations_path, parameters).close()
+        finally:
+            u.set_profiler(previous)
+        return profiler.report()
+
+    expected = report(idx.build_index)
+    assert expected["records"]["read"] == 300
+    assert report(idx.open_index) == expected
+
+    with open(operations_path, encoding="utf-8") as json_file:
+        pay = json.load(json_file)[0]
+    append_operations(operations_path, [dict(pay, id=1001, state="EXECUTED"),
+                                        dict(pay, id=1002, state="CANCELED")])
+    updated = report(idx.open_index)
+    assert updated == report(idx.build_index)
+    assert updated["records"]["read"] == 302
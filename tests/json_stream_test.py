@@ -0,0 +1,76 @@
+import json
+import scr.json_stream as js
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def operations_path():
+    return u.get_path_to_file("operations.json", "sources")
+
+
+def test_iter_json_array_correct(operations_path):
+    with open(operations_path, encoding="utf-8") as json_file:
+        expected = json.load(json_file)
+
+    for chunk_size in (1, 7, 64, 4096, js.CHUNK_SIZE):
+        assert list(js.iter_json_array(operations_path, chunk_size)) == expected
+
+
+def test_iter_json_items_split_values():
+    text = '[12345, -1.5e3, "текст", {"a": [1, 2]}, true, null]'
+    for size in range(1, len(text) + 1):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert list(js.iter_json_items(chunks)) == json.loads(text)
+
+
+def test_iter_json_items_empty():
+    assert list(js.iter_json_items(["[", " ", "]"])) == []
+    assert list(js.iter_json_items([" [\n]\n"])) == []
+
+
+def test_iter_json_items_lazy():
+    items = js.iter_json_items(['[{"id": 1}, ', '{"id": 2}, ', 'broken'])
+    assert next(items) == {"id": 1}
+    assert next(items) == {"id": 2}
+    with pytest.raises(json.JSONDecodeError):
+        next(items)
+
+
+def test_iter_json_items_incorrect():
+    for text in ('', '{"id": 1}', '[1, 2', '[1 2]', '[1,]', '[1] 2', '[{"id": 1]'):
+        with pytest.raises(json.JSONDecodeError):
+            list(js.iter_json_items([text]))
+
+
+def test_iter_json_items_malformed_in_large_file(tmp_path):
+    # Некорректная запись посередине большого файла: дочитывается не больше
+    # max_item_size символов, а не весь оставшийся файл
+    records = [json.dumps({"id": number, "description": "Перевод организации"}) for number in range(50000)]
+    records[1000] = '{"id": 1000, "description": "Перевод" "организации"}'
+    path = tmp_path / "operations.json"
+    path.write_text("[" + ",\n".join(records) + "]", encoding="utf-8")
+
+    with open(path, "rb") as json_file:
+        items = js.iter_json_items(js.read_chunks(json_file, 4096), max_item_size=1 << 16)
+        with pytest.raises(json.JSONDecodeError, match="delimiter"):
+            for number, item in enumerate(items):
+                assert item["id"] == number
+        assert number == 999
+        assert json_file.tell() < path.stat().st_size // 10
+
+
+def test_iter_json_array_incorrect_path():
+    with pytest.raises(FileNotFoundError):
+        list(js.iter_json_array("ksu/sources/operations.json"))
+
+
+def test_iter_json_array_offsets(operations_path):
+    with open(operations_path, "rb") as json_file:
+        data = json_file.read()
+
+    for chunk_size in (5, 333, js.CHUNK_SIZE):
+        items = list(js.iter_json_array(operations_path, chunk_size, offsets=True))
+        assert len(items) == 101
+        for start, end, item in items:
+            assert json.loads(data[start:end]) == item
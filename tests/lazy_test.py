@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+from class_payment.lazy import LazyPayment
+from class_payment.payment import Payment
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def operations():
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def test_lazy_payment_same_as_create_payment(operations):
+    for pay in operations:
+        payment = u.create_payment(pay, lazy=True)
+        assert isinstance(payment, Payment)
+        assert repr(payment) == repr(u.create_payment(pay))
+
+
+def test_lazy_payment_fields(operations):
+    pay = operations[0]
+    payment = LazyPayment(json.dumps(pay, ensure_ascii=False).encode("utf-8"))
+    expected = u.create_payment(pay)
+    assert payment.amount_pay == expected.amount_pay
+    assert payment.currency_pay == expected.currency_pay
+    assert payment.to_pay == expected.to_pay
+    assert str(payment) == str(expected)
+    assert u.format_payment(payment) == u.format_payment(expected)
+
+
+def test_lazy_payment_only_accessed_fields():
+    # Некорректные поля не разбираются, пока к ним не обратились
+    pay = {"id": 7, "date": "2019-08-26T10:50:58.294041", "operationAmount": object()}
+    payment = LazyPayment(pay)
+    assert payment.id_pay == 7
+    assert payment.date_pay == datetime(2019, 8, 26, 10, 50, 58, 294041)
+    assert payment.to_pay is None
+
+
+def test_lazy_payment_date_and_setters():
+    date = datetime(2020, 1, 1)
+    payment = LazyPayment({"id": 1, "date": "нет даты", "state": "EXECUTED"}, date)
+    assert payment.date_pay == date
+
+    payment.state_pay = "canceled"
+    assert payment.state_pay == "CANCELED"
+    payment.id_pay = "не число"
+    assert payment.id_pay == 1
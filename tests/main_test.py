@@ -14,4 +14,19 @@ def test_main_incorrect_path():
 
 def test_main_break():
     main.PATH = "sources/reduced_for_test.json"
-    assert main.main() is None
\ No newline at end of file
+    assert main.main() is None
+
+def test_main_no_colour(capsys, monkeypatch):
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    main.main([])
+    coloured = capsys.readouterr().out
+    assert "\033[" in coloured
+
+    main.main(["--no-colour"])
+    plain = capsys.readouterr().out
+    assert "\033[" not in plain
+    assert plain.count("\n\n") == coloured.count("\n\n") == main.COUNT_TRANSFERS
+
+    main.main(["--no-colour", "account", "--prefix", "5999"])
+    output = capsys.readouterr().out
+    assert output and "\033[" not in output
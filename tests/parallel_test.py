@@ -0,0 +1,82 @@
+import json
+import random
+import scr.parallel as par
+import scr.utils as u
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations():
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    # Много записей с повторяющимися датами, чтобы проверить порядок при равных датах
+    rnd = random.Random(0)
+    return [dict(rnd.choice(operations), id=i) for i in range(1, 1001)]
+
+
+@pytest.fixture
+def operations_path(tmp_path, operations):
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def is_usd(checked):
+    return checked.pay["operationAmount"]["currency"]["code"] == "USD"
+
+
+def test_split_json_array(operations_path):
+    bounds = par.split_json_array(operations_path, 8)
+    assert len(bounds) == 8
+    with open(operations_path, "rb") as file:
+        data = file.read()
+    assert all(data[bound:bound + 1] == b"{" for bound in bounds)
+
+
+def test_split_json_array_empty(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text(" [ ] ")
+    assert par.split_json_array(str(path), 4) == []
+    assert list(par.get_payments_parallel(str(path), set(), 5, workers=2, min_shard_size=1)) == []
+
+
+def test_get_payments_parallel_latest(operations_path, parameters):
+    expected = list(u.get_latest_checked_payments(operations_path, parameters, 5, is_usd))
+    result = par.get_payments_parallel(operations_path, parameters, 5, is_usd,
+                                       workers=4, min_shard_size=1024)
+    assert list(result) == expected
+
+
+def test_get_payments_parallel_all(operations_path, parameters):
+    expected = list(u.get_payments(operations_path, parameters))
+    result = par.get_payments_parallel(operations_path, parameters, workers=3, min_shard_size=1024)
+    assert [checked.pay for checked in result] == expected
+
+
+def test_get_payments_parallel_files(tmp_path, operations, parameters):
+    for number in range(4):
+        part = operations[number * 250:(number + 1) * 250]
+        (tmp_path / f"part_{number}.json").write_text(json.dumps(part), encoding="utf-8")
+    (tmp_path / "all.json.bak").write_text(json.dumps(operations), encoding="utf-8")
+
+    expected = sorted(u.check_payments(operations, parameters), key=lambda c: c.date, reverse=True)
+    result = par.get_payments_parallel(str(tmp_path), parameters, workers=2)
+    assert list(result) == expected
+
+
+def test_get_payments_parallel_false_boundary(tmp_path, operations, parameters):
+    # Разделитель ", {" внутри строки: часть начнётся не с записи, и нужен откат
+    operations = [dict(pay, description='Перевод, {"x": 1}, {"y": 2}') for pay in operations]
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+
+    expected = list(u.get_latest_checked_payments(str(path), parameters, 10))
+    result = par.get_payments_parallel(str(path), parameters, 10, workers=4, min_shard_size=1024)
+    assert list(result) == expected
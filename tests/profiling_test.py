@@ -0,0 +1,101 @@
+import json
+import programs.main as main
+import scr.utils as u
+from scr.profiling import Profiler
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    previous = u.set_profiler(profiler)
+    yield profiler
+    u.set_profiler(previous)
+
+
+@pytest.mark.parametrize("pay, reason", [
+    ({"id": 1, "date": "2019-08-26T10:50:58.294041", "description": "Перевод", "to": "Счет 1",
+      "operationAmount": {}}, u.REJECT_NO_STATE),
+    ({"id": 1, "state": "CANCELED", "date": "2019-08-26T10:50:58.294041", "description": "Перевод",
+      "to": "Счет 1", "operationAmount": {}}, u.REJECT_NOT_EXECUTED),
+    ({"id": 1, "state": "EXECUTED", "date": "2019-08-26T10:50:58.294041", "description": "Перевод",
+      "operationAmount": {}}, u.REJECT_MISSING_FIELDS),
+    ({"id": 1, "state": "EXECUTED", "date": "2019-08-26T10:50:58.294041", "description": "",
+      "to": "Счет 1", "operationAmount": {"amount": "1"}}, u.REJECT_EMPTY_FIELDS),
+    ({"id": 1, "state": "EXECUTED", "date": "2019-08-26 10:50:58.294041", "description": "Перевод",
+      "to": "Счет 1", "operationAmount": {"amount": "1"}}, u.REJECT_BAD_DATE),
+    ({"id": 1, "state": "EXECUTED", "date": "2019-08-26T10:50:58.294041", "description": "Перевод",
+      "to": "Счет 1", "operationAmount": {"amount": "1"}}, None),
+])
+def test_rejection_reason(pay, reason, parameters):
+    assert u.rejection_reason(pay, parameters) == reason
+    assert (reason is None) == u.check_payment(pay, parameters)
+
+
+def test_profiler_counts(profiler, parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    payments = list(u.get_payments(path, parameters))
+
+    report = profiler.report()
+    assert report["records"]["read"] == 101
+    assert report["records"]["accepted"] == len(payments)
+    assert sum(report["rejected"].values()) == 101 - len(payments)
+
+
+def test_profiler_stage(profiler):
+    for _ in range(2):
+        with u.profile_stage("sort"):
+            sorted(range(1000), reverse=True)
+    u.count_records("displayed", 5)
+
+    report = profiler.report()
+    assert set(report["stages"]) == {"sort"}
+    assert report["stages"]["sort"]["seconds"] >= 0
+    assert report["stages"]["sort"]["peak_bytes"] > 0
+    assert report["records"] == {"displayed": 5}
+
+    prometheus = profiler.dump("prometheus")
+    assert 'show_pays_records_total{kind="displayed"} 5' in prometheus
+    assert json.loads(profiler.dump("json")) == report
+    with pytest.raises(ValueError):
+        profiler.dump("xml")
+
+
+def test_profiler_nested_stages():
+    # Вложенный этап не сбрасывает пик памяти внешнего
+    profiler = Profiler()
+    with profiler.stage("outer"):
+        data = bytearray(4 << 20)
+        del data
+        with profiler.stage("inner"):
+            small = bytearray(1 << 10)
+        del small
+
+    peaks = {name: stage["peak_bytes"] for name, stage in profiler.report()["stages"].items()}
+    assert peaks["outer"] >= 4 << 20
+    assert peaks["inner"] < 1 << 20
+
+
+def test_profiler_disabled():
+    assert u.get_profiler() is None
+    with u.profile_stage("sort"):
+        u.count_records("displayed")
+
+
+def test_main_profile(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    output = tmp_path / "profile.json"
+    main.main(["--profile", "--profile-output", str(output)])
+    report = json.loads(output.read_text(encoding="utf-8"))
+
+    assert set(report["stages"]) == {"index", "select", "show"}
+    assert report["records"]["displayed"] == main.COUNT_TRANSFERS
+    assert u.get_profiler() is None
+
+    main.main()
+    assert capsys.readouterr().err == ""
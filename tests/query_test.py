@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+import scr.cache as c
+import scr.index as idx
+import scr.utils as u
+from scr.query import Query, combine
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+QUERIES = [
+    Query(),
+    Query(currency="USD"),
+    Query(currency="RUB"),
+    Query(currency="руб."),
+    Query(date_from=datetime(2019, 3, 1), date_to=datetime(2019, 4, 1)),
+    Query(date_from=datetime(2018, 6, 30, 2, 8, 58, 425572)),
+    Query(date_to=datetime(2018, 1, 1)),
+    Query(date_from=datetime(2019, 4, 1), date_to=datetime(2019, 3, 1)),
+    Query(description="Перевод организации", currency="RUB"),
+    Query(from_account="Maestro 1596837868705199"),
+    Query(to_account="64686473678894779589"),
+    Query(amount_min=5000000, amount_max=8000000),
+    Query(amount_max=100000, date_from=datetime(2018, 1, 1)),
+]
+
+
+def naive(path, parameters, query):
+    """Все проверенные платежи в порядке get_payments, отфильтрованные после загрузки"""
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+
+    result = []
+    for pay in operations:
+        if not u.check_payment(pay, parameters):
+            continue
+        date = u.parse_date(pay["date"])
+        amount = pay["operationAmount"]
+        minor = round(float(amount["amount"]) * 100)
+        if any((query.date_from and date < query.date_from,
+                query.date_to and date >= query.date_to,
+                query.currency and query.currency not in (amount["currency"]["code"],
+                                                          amount["currency"]["name"]),
+                query.description and pay["description"] != query.description,
+                query.from_account and not pay.get("from", "").endswith(query.from_account),
+                query.to_account and not pay["to"].endswith(query.to_account),
+                query.amount_min is not None and minor < query.amount_min,
+                query.amount_max is not None and minor > query.amount_max)):
+            continue
+        result.append((date, pay))
+
+    result.sort(key=lambda item: item[0], reverse=True)
+    return [pay for _, pay in result]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_get_payments_query(operations_path, parameters, query):
+    assert list(u.get_payments(operations_path, parameters, query)) == naive(operations_path, parameters, query)
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_get_latest_payments_query(operations_path, parameters, query):
+    expected = naive(operations_path, parameters, query)[:5]
+    assert list(u.get_latest_payments(operations_path, parameters, 5, query=query)) == expected
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_indexed_payments_query(operations_path, parameters, query):
+    expected = naive(operations_path, parameters, query)
+    with idx.open_index(operations_path, parameters) as index:
+        assert [checked.pay for checked in index.select(query)] == expected
+        assert [checked.pay for checked in index.latest(3, query=query)] == expected[:3]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_cached_payments_query(operations_path, parameters, query):
+    cache_path = c.build_cache(operations_path, parameters)
+    assert list(u.get_payments(cache_path, parameters, query)) == naive(operations_path, parameters, query)
+
+
+def test_index_date_range(operations_path, parameters):
+    with idx.open_index(operations_path, parameters) as index:
+        assert index.date_range() == (0, len(index))
+        start, stop = index.date_range(datetime(2019, 3, 1), datetime(2019, 4, 1))
+        expected = naive(operations_path, parameters, Query(date_from=datetime(2019, 3, 1),
+                                                            date_to=datetime(2019, 4, 1)))
+        assert stop - start == len(expected)
+        assert index.date_range(datetime(2030, 1, 1)) == (len(index), len(index))
+
+
+def test_combine():
+    assert combine(None, None) is None
+    assert combine(Query(), len) is len
+    accept = combine(Query(currency="USD"), lambda checked: checked.pay["id"] > 1)
+    usd = {"id": 2, "operationAmount": {"currency": {"name": "USD", "code": "USD"}}}
+    assert accept(u.CheckedPayment(usd, datetime.now()))
+    assert not accept(u.CheckedPayment(dict(usd, id=1), datetime.now()))
+    assert not Query(currency="EUR").matches(u.CheckedPayment(usd, datetime.now()))
+    assert not Query(amount_min=1).matches(u.CheckedPayment(usd, datetime.now()))
+
+
+def test_main_query(capsys, monkeypatch):
+    import programs.main as main
+    monkeypatch.setattr(main, "PATH", "sources/operations.json")
+    main.main(["--currency", "USD", "--date-from", "2019-01-01", "--amount-min", "10000"])
+    output = capsys.readouterr().out
+
+    assert output.count("USD\n") == main.COUNT_TRANSFERS
+    assert "руб." not in output
+    assert ".2018" not in output
+
+    # Даты с часовым поясом не сравниваются с датами платежей
+    for date in ("2019-01-01T00:00:00+03:00", "01.01.2019"):
+        with pytest.raises(SystemExit):
+            main.main(["--date-from", date])
+    assert "часового пояса" in capsys.readouterr().err
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+import scr.server as srv
+import scr.utils as u
+from scr.query import Query
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def operations_path(tmp_path):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(operations, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def expected(path, parameters, count, query=None):
+    import programs.main as main
+    accept = lambda checked: main.check_transfer(checked) and (query is None or query.matches(checked))
+    return [checked.pay for checked in u.get_latest_checked_payments(path, parameters, count, accept)]
+
+
+def test_store_latest(operations_path, parameters):
+    store = srv.PaymentStore(operations_path, parameters)
+    assert [json.loads(pay) for pay in store.latest(5)] == expected(operations_path, parameters, 5)
+    assert store.latest(0) == []
+
+    for query in (Query(currency="USD"), Query(date_from=datetime(2019, 3, 1)),
+                  Query(date_from=datetime(2018, 1, 1), date_to=datetime(2019, 1, 1), amount_min=5000000)):
+        result = [json.loads(pay) for pay in store.latest(20, query)]
+        assert result == expected(operations_path, parameters, 20, query)
+
+
+def test_store_refresh(operations_path, parameters):
+    store = srv.PaymentStore(operations_path, parameters)
+    assert not store.refresh()
+
+    with open(operations_path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    with open(operations_path, "w", encoding="utf-8") as json_file:
+        json.dump(operations[:10], json_file)
+    os.utime(operations_path, ns=(0, 0))
+
+    assert store.refresh()
+    assert len(store) == len(expected(operations_path, parameters, 100))
+
+
+def test_parse_request():
+    count, query = srv.parse_request("count=3&currency=USD&amount_min=10.5&date_to=2019-01-01")
+    assert count == 3
+    assert query == Query(currency="USD", amount_min=1050, date_to=datetime(2019, 1, 1))
+    assert srv.parse_request("") == (srv.COUNT, Query())
+    for wrong in ("count=-1", "unknown=1", "amount_max=abc", "date_from=вчера", "count=x",
+                  "date_from=2019-01-01T00:00:00%2B03:00", "amount_min=1e400", "amount_max=-1e400"):
+        with pytest.raises(ValueError):
+            srv.parse_request(wrong)
+
+
+def test_server(operations_path, parameters):
+    server = srv.PaymentServer(srv.PaymentStore(operations_path, parameters), ("127.0.0.1", 0), 0.05)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(url + "/payments?count=2&currency=USD") as response:
+            assert json.load(response) == expected(operations_path, parameters, 2, Query(currency="USD"))
+        with urllib.request.urlopen(url + "/health") as response:
+            assert json.load(response)["payments"] > 0
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + "/payments?count=x")
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
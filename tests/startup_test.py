@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import programs.main as main
+import scr.accounts as accounts
+import scr.aggregate as aggregate
+import scr.decoder as decoder
+import scr.dedup as dedup
+import scr.profiling as profiling
+import scr.utils as u
+
+HELP_IMPORT_BUDGET = 40000  # суммарное время импорта для --help, мкс (python -X importtime)
+
+# Модули, которые не нужны для вывода последних платежей из одного файла
+NOT_FOR_LATEST = ("asyncio", "http.server", "concurrent.futures", "multiprocessing", "tracemalloc")
+
+
+def import_times(*args):
+    """
+    Модули, импортированные при запуске programs/main.py, и время их импорта (мкс)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", u.get_path_to_file("main.py", "programs"),
+                             *args], capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_time, _, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = int(self_time)
+    return modules
+
+
+def test_cli_choices():
+    assert main.GROUPS == tuple(aggregate.GROUPS)
+    assert main.ROLES == tuple(accounts.ROLES)
+    assert main.PROFILE_FORMATS == profiling.PROFILE_FORMATS
+    assert main.PROFILE_ENV == profiling.PROFILE_ENV
+    assert main.DEDUP_POLICIES == dedup.POLICIES
+    assert main.DECODER_ENV == decoder.DECODER_ENV
+    assert main.DECODERS == decoder.BACKENDS
+
+
+def test_help_import_budget():
+    modules = min((import_times("--help") for _ in range(3)), key=lambda times: sum(times.values()))
+    assert not [name for name in modules if name.startswith(("scr", "class_payment"))]
+    assert "typing" not in modules and "json" not in modules
+    assert sum(modules.values()) < HELP_IMPORT_BUDGET
+
+
+def test_empty_source_imports(tmp_path):
+    path = tmp_path / "operations.json"
+    path.write_text(" [\n] ")
+    modules = import_times("--source", str(path))
+    assert not [name for name in modules if name.startswith(("scr", "class_payment"))]
+
+
+def test_latest_imports():
+    modules = import_times()
+    assert "scr.index" in modules
+    assert not [name for name in modules if name.startswith(NOT_FOR_LATEST)]
@@ -1,3 +1,7 @@
+import io
+import itertools
+import json
+import random
 import scr.utils as u
 import pytest
 from datetime import datetime
@@ -534,4 +538,131 @@ def test_hide_incorrect():
 
     assert u.hide("727319661091477044720") is None
 
-    assert u.hide("599941422842353") is None
\ No newline at end of file
+    assert u.hide("599941422842353") is None
+
+
+def test_get_latest_payments_correct(parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    for count in (0, 1, 5, 100, 1000):
+        expected = list(itertools.islice(u.get_payments(path, parameters), count))
+        assert list(u.get_latest_payments(path, parameters, count)) == expected
+
+
+def test_get_latest_payments_same_date(tmp_path, correct_dict, parameters):
+    payments = [dict(correct_dict, id=i) for i in range(1, 11)]
+    path = tmp_path / "operations.json"
+    path.write_text(json.dumps(payments), encoding="utf-8")
+
+    latest = u.get_latest_payments(str(path), parameters, 3)
+    assert [pay["id"] for pay in latest] == [1, 2, 3]
+
+
+def test_get_latest_payments_accept(parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    usd = lambda pay: pay["operationAmount"]["currency"]["code"] == "USD"
+    expected = [pay for pay in u.get_payments(path, parameters) if usd(pay)][:5]
+    assert list(u.get_latest_payments(path, parameters, 5, usd)) == expected
+
+
+def test_get_latest_payments_incorrect(parameters):
+    with pytest.raises(FileNotFoundError):
+        u.get_latest_payments("ksu/sources/operations.json", parameters, 5)
+
+
+def test_validate_payment_correct(correct_dict, parameters):
+    assert u.validate_payment(correct_dict, parameters) == datetime(2019, 12, 8, 22, 46, 21, 935582)
+
+
+def test_validate_payment_incorrect(correct_dict, parameters):
+    assert u.validate_payment(dict(correct_dict, state="CANCELED"), parameters) is None
+    assert u.validate_payment(dict(correct_dict, date="2019-12-32T22:46:21.935582"), parameters) is None
+
+
+def test_check_payments(data_list, parameters):
+    checked = list(u.check_payments(data_list, parameters))
+    assert checked == [
+        u.CheckedPayment(data_list[0], datetime(2018, 7, 11, 2, 26, 18, 671407)),
+        u.CheckedPayment(data_list[1], datetime(2018, 4, 4, 17, 33, 34, 701093)),
+    ]
+
+
+def test_parse_date():
+    assert u.parse_date("2018-10-14T08:21:33.419441") == datetime(2018, 10, 14, 8, 21, 33, 419441)
+    assert u.parse_date("2018-10-14") is None
+    assert u.parse_date("2013-02-29T08:21:33.419441") is None
+    assert u.parse_date(None) is None
+
+
+def test_create_payment_with_date(correct_dict):
+    date = datetime(2020, 1, 1)
+    pay = u.create_payment(correct_dict, date)
+    assert pay.date_pay is date
+    assert pay.to_pay == ("Счет", "90424923579946435907")
+
+
+def test_create_payment_slots(correct_dict):
+    pay = u.create_payment(correct_dict)
+    assert not hasattr(pay, "__dict__")
+    with pytest.raises(AttributeError):
+        pay.comment = "комментарий"
+
+
+def test_format_payment():
+    pay = u.create_payment({
+        "id": 716496732,
+        "state": "EXECUTED",
+        "date": "2018-04-04T17:33:34.701093",
+        "operationAmount": {"amount": "40701.91", "currency": {"name": "USD", "code": "USD"}},
+        "description": "Перевод организации",
+        "from": "Visa Gold 5999414228426353",
+        "to": "Счет 72731966109147704472"
+    })
+    assert u.format_payment(pay) == "\033[31m04.04\033[0m.2018 Перевод организации\n" \
+                                    "Visa Gold \033[34m5999 41** **** 6353 \033[0m-\033[33m>\033[0m " \
+                                    "Счет \033[34m**4472\n" \
+                                    "\033[31m40701.91\033[0m USD\n\n"
+    assert u.format_payment(pay, colour=False) == "04.04.2018 Перевод организации\n" \
+                                                  "Visa Gold 5999 41** **** 6353 -> Счет **4472\n" \
+                                                  "40701.91 USD\n\n"
+
+
+def test_show_payments_same_as_show_payment(capsys, parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    payments = [u.create_payment(*checked) for checked in
+                u.get_latest_checked_payments(path, parameters, 50)]
+
+    for pay in payments:
+        u.show_payment(pay)
+    expected = capsys.readouterr().out
+
+    u.show_payments(payments, colour=True, chunk_size=7)
+    assert capsys.readouterr().out == expected
+
+
+def test_show_payments_not_tty(correct_dict):
+    output = io.StringIO()
+    u.show_payments([u.create_payment(correct_dict)] * 3, file=output)
+    assert output.getvalue() == "08.12.2019 Открытие вклада\nСчет **5907\n41096.24 USD\n\n" * 3
+
+
+def test_hide_numbers():
+    rnd = random.Random(0)
+    numbers = [str(rnd.randrange(10 ** (length - 1), 10 ** length)) for length in (16, 20) * 50]
+    numbers += ["00000000000000000000", "0000000000000000", "", "123", None, 12]
+    expected = [u.hide(number) for number in numbers]
+    assert u.hide_numbers(numbers) == expected
+    assert u.hide_numbers([number.encode() for number in numbers if type(number) is str]) == expected[:-2]
+
+
+def test_hide_numbers_correct():
+    assert u.hide_numbers(["72731966109147704472", b"5999414228426353"]) == ["**4472", "5999 41** **** 6353"]
+
+
+def test_create_payment_amount_minor(correct_dict):
+    pay = u.create_payment(correct_dict)
+    assert pay.amount_pay == 4109624
+    assert pay.currency_pay == "USD"
+    assert pay.operation_amount_pay == ("41096.24", "USD")
+
+    correct_dict["operationAmount"]["amount"] = "92233720368547758.07"
+    assert u.create_payment(correct_dict).operation_amount_pay == ("92233720368547758.07", "USD")
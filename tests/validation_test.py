@@ -0,0 +1,107 @@
+import json
+import random
+from collections import Counter
+import scr.utils as u
+import scr.validation as v
+import pytest
+
+
+@pytest.fixture
+def parameters():
+    return {"id", "date", "state", "operationAmount", "description", "to"}
+
+
+@pytest.fixture
+def correct_dict():
+    return {
+        "id": 863064926,
+        "state": "EXECUTED",
+        "date": "2019-12-08T22:46:21.935582",
+        "operationAmount": {
+            "amount": "41096.24",
+            "currency": {
+                "name": "USD",
+                "code": "USD"
+            }
+        },
+        "description": "Открытие вклада",
+        "from": "Visa Gold 5999414228426353",
+        "to": "Счет 90424923579946435907"
+    }
+
+
+def old_validation(pay, parameters):
+    """Прежний путь: check_payment, затем создание Payment и проверка всех полей"""
+    if not u.check_payment(pay, parameters):
+        return None
+    payment = u.create_payment(pay)
+    if all((payment.id_pay, payment.state_pay, payment.date_pay, payment.operation_amount_pay,
+            payment.description_pay, payment.to_pay)):
+        return payment
+    return None
+
+
+def spoiled(rnd, pay):
+    pay = json.loads(json.dumps(pay))
+    key = rnd.choice(("id", "operationAmount", "description", "from", "to"))
+    pay[key] = rnd.choice(("", "x", 0, 1.5, True, "Счет 123", "Maestro 1596837868705199",
+                           {"amount": "сто", "currency": {"name": "USD"}},
+                           {"amount": "10", "currency": {}}))
+    return pay
+
+
+def test_validate_record_same_as_create_payment(correct_dict, parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    with open(path, encoding="utf-8") as json_file:
+        operations = json.load(json_file)
+    rnd = random.Random(0)
+    operations += [spoiled(rnd, correct_dict) for _ in range(300)]
+
+    for pay in operations:
+        expected = old_validation(pay, parameters)
+        result = v.validate_record(pay, parameters)
+        if expected is None:
+            assert type(result) is str
+        else:
+            assert repr(result) == repr(expected)
+
+
+@pytest.mark.parametrize("key, value, reason", [
+    ("state", "CANCELED", u.REJECT_NOT_EXECUTED),
+    ("date", "2019-12-08 22:46:21", u.REJECT_BAD_DATE),
+    ("id", "863064926", v.REJECT_BAD_ID),
+    ("operationAmount", {"amount": "сто", "currency": {"name": "USD"}}, v.REJECT_BAD_AMOUNT),
+    ("description", 15, v.REJECT_BAD_DESCRIPTION),
+    ("to", "Счет 9042492357994643590", v.REJECT_BAD_TO),
+])
+def test_validate_record_reason(correct_dict, parameters, key, value, reason):
+    counters = Counter()
+    assert v.validate_record(dict(correct_dict, **{key: value}), parameters, counters) == reason
+    assert counters == {reason: 1}
+
+
+def test_validate_record_bad_from(correct_dict, parameters):
+    payment = v.validate_record(dict(correct_dict, **{"from": "Visa 123"}), parameters)
+    assert payment.from_pay is None
+    assert payment.to_pay == ("Счет", "90424923579946435907")
+
+
+def test_validate_records(correct_dict, parameters):
+    counters = Counter()
+    payments = [correct_dict, dict(correct_dict, state="CANCELED"), dict(correct_dict, id=None),
+                dict(correct_dict, to="Счет 1")]
+    result = list(v.validate_records(payments, parameters, counters))
+
+    assert [payment.id_pay for payment in result] == [correct_dict["id"]]
+    assert counters == {u.REJECT_NOT_EXECUTED: 1, u.REJECT_EMPTY_FIELDS: 1, v.REJECT_BAD_TO: 1}
+
+
+def test_build_payments(correct_dict, parameters):
+    path = u.get_path_to_file("operations.json", "sources")
+    checked = list(u.get_latest_checked_payments(path, parameters, 200))
+    counters = Counter()
+    payments = list(v.build_payments(checked, counters))
+
+    assert len(payments) + sum(counters.values()) == len(checked)
+    assert [repr(payment) for payment in payments] == \
+        [repr(u.create_payment(*pay)) for pay in checked if type(v.complete_payment(*pay)) is not str]